@@ -107,3 +107,511 @@ UPDATE staff SET subjects = 'Mathematics,Physical Sciences' WHERE subjects LIKE
 UPDATE staff SET subjects = 'Mathematics' WHERE subjects = 'Mathematics';
 UPDATE staff SET subjects = 'Physical Sciences' WHERE subjects = 'Physical Sciences';
 -- etc. for others
+
+-- Materialized class roster: accepted learners per grade
+-- (status = 'Accepted', Decision_mail = 'Yes', first_mail = 'Yes')
+CREATE TABLE IF NOT EXISTS `class_roster` (
+  `grade` INT NOT NULL,
+  `user_id` INT NOT NULL,
+  `full_names` VARCHAR(255) NOT NULL,
+  `school` VARCHAR(255) NULL,
+  `email` VARCHAR(255) NULL,
+  `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`grade`, `user_id`),
+  INDEX `idx_roster_grade_name` (`grade`, `full_names`),
+  INDEX `idx_roster_user` (`user_id`)
+);
+
+-- Backfill from current decisions
+INSERT IGNORE INTO class_roster (grade, user_id, full_names, school, email)
+SELECT a.grade, u.id, u.full_names, u.school, u.email
+FROM applications a
+JOIN users u ON u.id = a.user_id
+WHERE a.status = 'Accepted'
+  AND a.Decision_mail = 'Yes'
+  AND a.first_mail = 'Yes';
+
+-- Keep the roster in step with application decisions.
+-- Bulk jobs can SET @roster_sync_disabled = 1 and refresh once at the end.
+DROP TRIGGER IF EXISTS trg_applications_roster_ai;
+DROP TRIGGER IF EXISTS trg_applications_roster_au;
+DROP TRIGGER IF EXISTS trg_applications_roster_ad;
+DROP TRIGGER IF EXISTS trg_users_roster_au;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_applications_roster_ai AFTER INSERT ON applications
+FOR EACH ROW
+BEGIN
+  IF @roster_sync_disabled IS NULL
+     AND NEW.status = 'Accepted' AND NEW.Decision_mail = 'Yes' AND NEW.first_mail = 'Yes' THEN
+    INSERT INTO class_roster (grade, user_id, full_names, school, email)
+    SELECT NEW.grade, u.id, u.full_names, u.school, u.email
+    FROM users u WHERE u.id = NEW.user_id
+    ON DUPLICATE KEY UPDATE
+      full_names = VALUES(full_names), school = VALUES(school), email = VALUES(email);
+  END IF;
+END$$
+
+CREATE TRIGGER trg_applications_roster_au AFTER UPDATE ON applications
+FOR EACH ROW
+BEGIN
+  IF @roster_sync_disabled IS NULL THEN
+    IF OLD.status = 'Accepted' AND OLD.Decision_mail = 'Yes' AND OLD.first_mail = 'Yes' THEN
+      DELETE FROM class_roster
+      WHERE grade = OLD.grade AND user_id = OLD.user_id
+        AND NOT EXISTS (
+          SELECT 1 FROM applications a
+          WHERE a.user_id = OLD.user_id AND a.grade = OLD.grade
+            AND a.status = 'Accepted' AND a.Decision_mail = 'Yes' AND a.first_mail = 'Yes'
+        );
+    END IF;
+    IF NEW.status = 'Accepted' AND NEW.Decision_mail = 'Yes' AND NEW.first_mail = 'Yes' THEN
+      INSERT INTO class_roster (grade, user_id, full_names, school, email)
+      SELECT NEW.grade, u.id, u.full_names, u.school, u.email
+      FROM users u WHERE u.id = NEW.user_id
+      ON DUPLICATE KEY UPDATE
+        full_names = VALUES(full_names), school = VALUES(school), email = VALUES(email);
+    END IF;
+  END IF;
+END$$
+
+CREATE TRIGGER trg_applications_roster_ad AFTER DELETE ON applications
+FOR EACH ROW
+BEGIN
+  IF @roster_sync_disabled IS NULL
+     AND OLD.status = 'Accepted' AND OLD.Decision_mail = 'Yes' AND OLD.first_mail = 'Yes' THEN
+    DELETE FROM class_roster
+    WHERE grade = OLD.grade AND user_id = OLD.user_id
+      AND NOT EXISTS (
+        SELECT 1 FROM applications a
+        WHERE a.user_id = OLD.user_id AND a.grade = OLD.grade
+          AND a.status = 'Accepted' AND a.Decision_mail = 'Yes' AND a.first_mail = 'Yes'
+      );
+  END IF;
+END$$
+
+CREATE TRIGGER trg_users_roster_au AFTER UPDATE ON users
+FOR EACH ROW
+BEGIN
+  IF NOT (NEW.full_names <=> OLD.full_names)
+     OR NOT (NEW.school <=> OLD.school)
+     OR NOT (NEW.email <=> OLD.email) THEN
+    UPDATE class_roster
+    SET full_names = NEW.full_names, school = NEW.school, email = NEW.email
+    WHERE user_id = NEW.id;
+  END IF;
+END$$
+
+DELIMITER ;
+
+-- Monthly payroll rollups per staff member, maintained from staff_time_logs
+CREATE TABLE IF NOT EXISTS `staff_payroll_monthly` (
+  `staff_id` INT NOT NULL,
+  `period_year` INT NOT NULL,
+  `period_month` TINYINT NOT NULL,
+  `hours` DECIMAL(10,2) NOT NULL DEFAULT 0,
+  `disputed_hours` DECIMAL(10,2) NOT NULL DEFAULT 0,
+  `log_count` INT NOT NULL DEFAULT 0,
+  `amount_due` DECIMAL(12,2) NOT NULL DEFAULT 0,   -- (hours - disputed_hours) * hourly_rate
+  `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`period_year`, `period_month`, `staff_id`),
+  INDEX `idx_payroll_staff` (`staff_id`, `period_year`, `period_month`),
+  FOREIGN KEY (`staff_id`) REFERENCES `staff`(`id`) ON DELETE CASCADE
+);
+
+DROP PROCEDURE IF EXISTS payroll_apply;
+DROP TRIGGER IF EXISTS trg_time_logs_payroll_ai;
+DROP TRIGGER IF EXISTS trg_time_logs_payroll_au;
+DROP TRIGGER IF EXISTS trg_time_logs_payroll_ad;
+DROP TRIGGER IF EXISTS trg_staff_payroll_rate_au;
+
+DELIMITER $$
+
+-- Add (or subtract, with negative deltas) one log's contribution to its month.
+-- Hours are rounded per log, as in LOG_HOURS in app/payroll.py's rebuild
+CREATE PROCEDURE payroll_apply(
+  IN p_staff INT, IN p_date DATE,
+  IN p_hours DECIMAL(10,2), IN p_disputed DECIMAL(10,2), IN p_logs INT
+)
+BEGIN
+  DECLARE v_rate DECIMAL(10,2);
+  IF p_date IS NOT NULL THEN
+    SELECT hourly_rate INTO v_rate FROM staff WHERE id = p_staff;
+    INSERT INTO staff_payroll_monthly
+      (staff_id, period_year, period_month, hours, disputed_hours, log_count, amount_due)
+    VALUES
+      (p_staff, YEAR(p_date), MONTH(p_date), p_hours, p_disputed, p_logs,
+       (p_hours - p_disputed) * COALESCE(v_rate, 0))
+    ON DUPLICATE KEY UPDATE
+      hours = hours + VALUES(hours),
+      disputed_hours = disputed_hours + VALUES(disputed_hours),
+      log_count = log_count + VALUES(log_count),
+      amount_due = (hours - disputed_hours) * COALESCE(v_rate, 0);
+  END IF;
+END$$
+
+CREATE TRIGGER trg_time_logs_payroll_ai AFTER INSERT ON staff_time_logs
+FOR EACH ROW
+BEGIN
+  DECLARE v_hours DECIMAL(10,2) DEFAULT ROUND(COALESCE(TIMESTAMPDIFF(MINUTE, NEW.time_in, NEW.time_out) / 60.0, 0), 2);
+  CALL payroll_apply(NEW.staff_id, NEW.attendance_date, v_hours,
+                     IF(NEW.disputed = 1, v_hours, 0), 1);
+END$$
+
+-- Covers edits and dispute resolution (disputed 1 -> 0)
+CREATE TRIGGER trg_time_logs_payroll_au AFTER UPDATE ON staff_time_logs
+FOR EACH ROW
+BEGIN
+  DECLARE v_old DECIMAL(10,2) DEFAULT ROUND(COALESCE(TIMESTAMPDIFF(MINUTE, OLD.time_in, OLD.time_out) / 60.0, 0), 2);
+  DECLARE v_new DECIMAL(10,2) DEFAULT ROUND(COALESCE(TIMESTAMPDIFF(MINUTE, NEW.time_in, NEW.time_out) / 60.0, 0), 2);
+  CALL payroll_apply(OLD.staff_id, OLD.attendance_date, -v_old,
+                     IF(OLD.disputed = 1, -v_old, 0), -1);
+  CALL payroll_apply(NEW.staff_id, NEW.attendance_date, v_new,
+                     IF(NEW.disputed = 1, v_new, 0), 1);
+END$$
+
+CREATE TRIGGER trg_time_logs_payroll_ad AFTER DELETE ON staff_time_logs
+FOR EACH ROW
+BEGIN
+  DECLARE v_hours DECIMAL(10,2) DEFAULT ROUND(COALESCE(TIMESTAMPDIFF(MINUTE, OLD.time_in, OLD.time_out) / 60.0, 0), 2);
+  CALL payroll_apply(OLD.staff_id, OLD.attendance_date, -v_hours,
+                     IF(OLD.disputed = 1, -v_hours, 0), -1);
+END$$
+
+-- A rate change reprices the current and previous (not yet paid) month
+CREATE TRIGGER trg_staff_payroll_rate_au AFTER UPDATE ON staff
+FOR EACH ROW
+BEGIN
+  IF NOT (NEW.hourly_rate <=> OLD.hourly_rate) THEN
+    UPDATE staff_payroll_monthly
+    SET amount_due = (hours - disputed_hours) * NEW.hourly_rate
+    WHERE staff_id = NEW.id
+      AND (period_year * 12 + period_month) >= (YEAR(CURDATE()) * 12 + MONTH(CURDATE()) - 1);
+  END IF;
+END$$
+
+DELIMITER ;
+
+-- Full-text search over session reports (InnoDB FULLTEXT)
+ALTER TABLE `staff_session_reports`
+ADD FULLTEXT INDEX `ft_session_reports_all` (`topic`, `description`, `positives`, `negatives`, `comments`),
+ADD FULLTEXT INDEX `ft_session_reports_topic` (`topic`),
+ADD FULLTEXT INDEX `ft_session_reports_negatives` (`negatives`),
+ADD FULLTEXT INDEX `ft_session_reports_positives` (`positives`),
+ADD INDEX `idx_session_reports_date` (`session_date`);
+
+-- Sent-message history keyed by sender id, with read-receipt rollups
+ALTER TABLE `notifications`
+ADD COLUMN `sender_id` INT NULL,
+ADD INDEX `idx_notifications_sender` (`sender_id`, `created_at`);
+
+-- Backfill sender_id for staff broadcasts sent before the column existed
+UPDATE notifications n
+JOIN staff s ON CONCAT(s.names, ' ', s.surname) = n.sender_name
+SET n.sender_id = s.id
+WHERE n.sender_id IS NULL
+  AND n.sender_type IN ('Admin', 'Teacher', 'Tutor');
+
+CREATE TABLE IF NOT EXISTS `notification_stats` (
+  `notification_id` INT PRIMARY KEY,
+  `recipients` INT NOT NULL DEFAULT 0,     -- roster size of the target grades at send time
+  `read_count` INT NOT NULL DEFAULT 0,     -- maintained from notification_reads
+  `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  FOREIGN KEY (`notification_id`) REFERENCES `notifications`(`id`) ON DELETE CASCADE
+);
+
+-- Backfill stats for existing broadcasts
+INSERT INTO notification_stats (notification_id, recipients, read_count)
+SELECT
+  n.id,
+  (SELECT COUNT(*) FROM class_roster r WHERE FIND_IN_SET(r.grade, n.target_grades)),
+  (SELECT COUNT(*) FROM notification_reads nr WHERE nr.notification_id = n.id AND nr.is_read = TRUE)
+FROM notifications n
+WHERE n.sender_id IS NOT NULL
+ON DUPLICATE KEY UPDATE recipients = VALUES(recipients), read_count = VALUES(read_count);
+
+DROP TRIGGER IF EXISTS trg_notification_reads_ai;
+DROP TRIGGER IF EXISTS trg_notification_reads_au;
+DROP TRIGGER IF EXISTS trg_notification_reads_ad;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_notification_reads_ai AFTER INSERT ON notification_reads
+FOR EACH ROW
+BEGIN
+  IF NEW.is_read THEN
+    INSERT INTO notification_stats (notification_id, read_count)
+    VALUES (NEW.notification_id, 1)
+    ON DUPLICATE KEY UPDATE read_count = read_count + 1;
+  END IF;
+END$$
+
+CREATE TRIGGER trg_notification_reads_au AFTER UPDATE ON notification_reads
+FOR EACH ROW
+BEGIN
+  IF NEW.is_read AND NOT OLD.is_read THEN
+    INSERT INTO notification_stats (notification_id, read_count)
+    VALUES (NEW.notification_id, 1)
+    ON DUPLICATE KEY UPDATE read_count = read_count + 1;
+  ELSEIF OLD.is_read AND NOT NEW.is_read THEN
+    UPDATE notification_stats SET read_count = GREATEST(read_count - 1, 0)
+    WHERE notification_id = NEW.notification_id;
+  END IF;
+END$$
+
+CREATE TRIGGER trg_notification_reads_ad AFTER DELETE ON notification_reads
+FOR EACH ROW
+BEGIN
+  IF OLD.is_read THEN
+    UPDATE notification_stats SET read_count = GREATEST(read_count - 1, 0)
+    WHERE notification_id = OLD.notification_id;
+  END IF;
+END$$
+
+DELIMITER ;
+
+-- Outbound email queue, delivered by the background outbox worker
+CREATE TABLE IF NOT EXISTS `email_outbox` (
+  `id` BIGINT AUTO_INCREMENT PRIMARY KEY,
+  `to_email` VARCHAR(255) NOT NULL,
+  `subject` VARCHAR(255) NOT NULL,
+  `html_body` MEDIUMTEXT NOT NULL,
+  `name` VARCHAR(255) NULL,
+  `reference` VARCHAR(100) NULL,
+  `status` ENUM('Pending', 'Sending', 'Sent', 'Failed') NOT NULL DEFAULT 'Pending',
+  `attempts` INT NOT NULL DEFAULT 0,
+  `next_attempt_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `claimed_at` DATETIME NULL,
+  `last_error` TEXT NULL,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  `sent_at` DATETIME NULL,
+  INDEX `idx_outbox_due` (`status`, `next_attempt_at`)
+);
+
+-- Cross-worker event log for the SSE broker (EVENTS_BACKEND=database)
+CREATE TABLE IF NOT EXISTS `event_log` (
+  `id` BIGINT AUTO_INCREMENT PRIMARY KEY,
+  `channel` VARCHAR(64) NOT NULL,
+  `event` VARCHAR(64) NOT NULL,
+  `payload` JSON NOT NULL,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  INDEX `idx_event_log_created` (`created_at`)
+);
+
+-- Per (user, resource) data version stamps for conditional GETs (ETag / 304).
+-- user_id 0 holds global stamps (e.g. 'term-settings').
+CREATE TABLE IF NOT EXISTS `data_versions` (
+  `user_id` INT NOT NULL,
+  `resource` VARCHAR(32) NOT NULL,
+  `version` BIGINT NOT NULL DEFAULT 1,
+  `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`user_id`, `resource`)
+);
+
+-- Profiles are edited outside the API, so bump from the table itself
+DROP TRIGGER IF EXISTS trg_users_version_au;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_users_version_au AFTER UPDATE ON users
+FOR EACH ROW
+BEGIN
+  INSERT INTO data_versions (user_id, resource, version)
+  VALUES (NEW.id, 'profile', 1)
+  ON DUPLICATE KEY UPDATE version = version + 1;
+END$$
+
+DELIMITER ;
+
+-- Early-warning engine: rule marks warnings it owns (NULL = issued by
+-- staff, never auto-resolved); each run records its watermark
+ALTER TABLE `learner_warnings`
+ADD COLUMN `rule` VARCHAR(32) NULL AFTER `severity`,
+ADD INDEX `idx_warnings_rule` (`learner_id`, `rule`, `status`);
+
+CREATE TABLE IF NOT EXISTS `early_warning_runs` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `started_at` DATETIME NOT NULL,
+  `finished_at` DATETIME NULL,
+  `full_run` TINYINT(1) NOT NULL DEFAULT 0,
+  `learners_scored` INT NOT NULL DEFAULT 0,
+  `raised` INT NOT NULL DEFAULT 0,
+  `updated` INT NOT NULL DEFAULT 0,
+  `resolved` INT NOT NULL DEFAULT 0,
+  INDEX `idx_early_warning_runs_finished` (`finished_at`)
+);
+
+-- Background jobs: queued/scheduled work with retries and timings
+CREATE TABLE IF NOT EXISTS `jobs` (
+  `id` BIGINT AUTO_INCREMENT PRIMARY KEY,
+  `name` VARCHAR(64) NOT NULL,
+  `payload` JSON NULL,
+  `status` ENUM('Pending', 'Running', 'Done', 'Failed') NOT NULL DEFAULT 'Pending',
+  `attempts` INT NOT NULL DEFAULT 0,
+  `max_attempts` INT NOT NULL DEFAULT 3,
+  `run_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `claimed_at` DATETIME NULL,
+  `claimed_by` VARCHAR(64) NULL,
+  `finished_at` DATETIME NULL,
+  `duration_ms` INT NULL,
+  `result` JSON NULL,
+  `last_error` TEXT NULL,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  INDEX `idx_jobs_due` (`status`, `run_at`),
+  INDEX `idx_jobs_name` (`name`, `created_at`)
+);
+
+-- Next due time per scheduled job; only the scheduler leader writes it
+CREATE TABLE IF NOT EXISTS `job_schedules` (
+  `name` VARCHAR(64) PRIMARY KEY,
+  `interval_seconds` INT NOT NULL,
+  `next_run_at` DATETIME NOT NULL,
+  `last_enqueued_at` DATETIME NULL
+);
+
+-- Attendance rollups: counts per learner per month and per grade per day,
+-- maintained by capture_attendance (rebuild: POST /api/staff/attendance/rollups/rebuild)
+CREATE TABLE IF NOT EXISTS `attendance_learner_monthly` (
+  `user_id` INT NOT NULL,
+  `period_year` SMALLINT NOT NULL,
+  `period_month` TINYINT NOT NULL,
+  `grade` INT NOT NULL,
+  `present` INT NOT NULL DEFAULT 0,
+  `absent` INT NOT NULL DEFAULT 0,
+  `apology` INT NOT NULL DEFAULT 0,
+  `total` INT NOT NULL DEFAULT 0,
+  `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`user_id`, `period_year`, `period_month`),
+  INDEX `idx_att_learner_monthly_grade` (`grade`, `period_year`, `period_month`)
+);
+
+CREATE TABLE IF NOT EXISTS `attendance_grade_daily` (
+  `grade` INT NOT NULL,
+  `class_date` DATE NOT NULL,
+  `present` INT NOT NULL DEFAULT 0,
+  `absent` INT NOT NULL DEFAULT 0,
+  `apology` INT NOT NULL DEFAULT 0,
+  `total` INT NOT NULL DEFAULT 0,
+  `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`grade`, `class_date`)
+);
+
+-- Idempotency-Key responses for write endpoints (app/idempotency.py).
+-- key_hash = sha256(caller + key); status NULL while the first request runs
+CREATE TABLE IF NOT EXISTS `idempotency_keys` (
+  `key_hash` BINARY(32) PRIMARY KEY,
+  `fingerprint` BINARY(32) NOT NULL,
+  `status` SMALLINT NULL,
+  `content_type` VARCHAR(100) NULL,
+  `body` MEDIUMBLOB NULL,
+  `locked_until` DATETIME NOT NULL,
+  `expires_at` DATETIME NOT NULL,
+  INDEX `idx_idempotency_expires` (`expires_at`)
+);
+
+-- Bulk admission decisions (app/admissions.py): one row per run, one per
+-- staged decision; progress is updated while the run's transaction is open
+CREATE TABLE IF NOT EXISTS `admission_runs` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `created_by` INT NOT NULL,
+  `status` ENUM('Pending', 'Running', 'Done', 'Failed') NOT NULL DEFAULT 'Pending',
+  `send_emails` TINYINT(1) NOT NULL DEFAULT 1,
+  `total` INT NOT NULL DEFAULT 0,
+  `processed` INT NOT NULL DEFAULT 0,
+  `changed` INT NOT NULL DEFAULT 0,
+  `unchanged` INT NOT NULL DEFAULT 0,
+  `not_found` INT NOT NULL DEFAULT 0,
+  `emails_queued` INT NOT NULL DEFAULT 0,
+  `error` TEXT NULL,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  `started_at` DATETIME NULL,
+  `finished_at` DATETIME NULL
+);
+
+CREATE TABLE IF NOT EXISTS `admission_decisions` (
+  `id` BIGINT AUTO_INCREMENT PRIMARY KEY,
+  `run_id` INT NOT NULL,
+  `app_id` VARCHAR(20) NOT NULL,
+  `status` VARCHAR(20) NOT NULL,
+  -- filled in when applied; changed NULL = no such application
+  `user_id` INT NULL,
+  `grade` INT NULL,
+  `previous_status` VARCHAR(20) NULL,
+  `changed` TINYINT(1) NULL,
+  INDEX `idx_admission_decisions_run` (`run_id`, `changed`),
+  FOREIGN KEY (`run_id`) REFERENCES `admission_runs`(`id`) ON DELETE CASCADE
+);
+
+-- Admissions scoring (app/application_scoring.py): per-grade weight and
+-- threshold overrides, and one score row per application
+CREATE TABLE IF NOT EXISTS `application_scoring_config` (
+  `grade` INT PRIMARY KEY,
+  `config` JSON NOT NULL,
+  `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS `application_scores` (
+  `application_id` INT PRIMARY KEY,
+  `app_id` VARCHAR(20) NOT NULL,
+  `user_id` INT NOT NULL,
+  `year` INT NOT NULL,
+  `grade` INT NOT NULL,
+  `score` DECIMAL(6,2) NOT NULL,
+  `eligible` TINYINT(1) NOT NULL,
+  `breakdown` JSON NOT NULL,
+  `reasons` JSON NOT NULL,
+  `config_hash` CHAR(16) NOT NULL,
+  `scored_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  INDEX `idx_application_scores_rank` (`year`, `grade`, `eligible`, `score`),
+  FOREIGN KEY (`application_id`) REFERENCES `applications`(`id`) ON DELETE CASCADE
+);
+
+-- Learner search index (app/learner_search.py) picks up changed users by
+-- updated_at
+ALTER TABLE `users`
+  ADD COLUMN `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  ADD INDEX `idx_users_updated` (`updated_at`);
+
+-- Term report cards (app/report_cards.py): one run per grade/term render,
+-- and the tutor comments printed on the cards
+CREATE TABLE IF NOT EXISTS `report_card_runs` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `created_by` INT NOT NULL,
+  `grade` INT NOT NULL,
+  `year` INT NOT NULL,
+  `term` INT NOT NULL,
+  `status` ENUM('Pending', 'Running', 'Done', 'Failed') NOT NULL DEFAULT 'Pending',
+  `total` INT NOT NULL DEFAULT 0,
+  `rendered` INT NOT NULL DEFAULT 0,
+  `failed` INT NOT NULL DEFAULT 0,
+  `error` TEXT NULL,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  `started_at` TIMESTAMP NULL,
+  `finished_at` TIMESTAMP NULL,
+  INDEX `idx_report_card_runs_grade` (`grade`, `year`, `term`)
+);
+
+CREATE TABLE IF NOT EXISTS `report_card_comments` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `learner_id` INT NOT NULL,
+  `year` INT NOT NULL,
+  `term` INT NOT NULL,
+  `subject` VARCHAR(100) NOT NULL DEFAULT '',   -- '' = general comment
+  `staff_id` INT NULL,
+  `comment` TEXT NOT NULL,
+  `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  UNIQUE KEY `uq_report_card_comment` (`learner_id`, `year`, `term`, `subject`),
+  FOREIGN KEY (`learner_id`) REFERENCES `users`(`id`) ON DELETE CASCADE,
+  FOREIGN KEY (`staff_id`) REFERENCES `staff`(`id`) ON DELETE SET NULL
+);
+
+-- Early warnings: grades a run was limited to (NULL = every grade); only
+-- all-grade runs set the incremental watermark
+ALTER TABLE `early_warning_runs`
+  ADD COLUMN `grades` VARCHAR(100) NULL AFTER `full_run`;
+
+-- Run progress goes to the requester's SSE channel: staff:<staff.id> or
+-- admin:<admins.id> (the two ids overlap, so created_by alone is ambiguous)
+ALTER TABLE `admission_runs` ADD COLUMN `channel` VARCHAR(64) NULL AFTER `created_by`;
+ALTER TABLE `report_card_runs` ADD COLUMN `channel` VARCHAR(64) NULL AFTER `created_by`;
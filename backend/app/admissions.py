@@ -0,0 +1,197 @@
+# app/admissions.py
+"""
+Bulk admission decisions. An admin submits (app_id, status) pairs; they
+are staged in admission_decisions and applied by the admissions-decide
+job in one transaction:
+
+    - applications.status / Decision_mail / first_mail set with two
+      set-based UPDATEs per chunk (row triggers off for the run)
+    - one decision email per changed application queued in bulk
+    - class_roster rebuilt once for the affected grades at the end
+
+Progress is written to admission_runs after every chunk (on its own
+connection, so it is visible while the transaction is still open) and
+pushed to the admin's SSE channel.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import text, bindparam
+from .database import engine
+from .roster import refresh_class_roster
+from .outbox import enqueue_emails, outbox_worker
+from .email_templates import render_email, merge_text
+from .events import publish
+from .cache import cache
+
+
+DECISIONS = ("Accepted", "Rejected", "Waitlisted")
+CHUNK_SIZE = 500
+
+# status -> (subject, title, message, theme); $learner_name and $grade merge
+DECISION_EMAILS = {
+    "Accepted": (
+        "Your application has been accepted",
+        "Congratulations!",
+        "<p>We are pleased to let you know that your application for Grade $grade "
+        "has been <strong>accepted</strong>. Log in to the learner portal for your "
+        "class schedule and next steps.</p>",
+        "positive",
+    ),
+    "Rejected": (
+        "Update on your application",
+        "Application outcome",
+        "<p>Thank you for applying for Grade $grade. Unfortunately we are unable to "
+        "offer you a place this year.</p>",
+        "negative",
+    ),
+    "Waitlisted": (
+        "Your application is on the waiting list",
+        "Waiting list",
+        "<p>Your application for Grade $grade has been placed on the "
+        "<strong>waiting list</strong>. We will contact you as soon as a place opens up.</p>",
+        "warning",
+    ),
+}
+
+
+def create_admission_run(db: Session, decisions: Iterable[Tuple[str, str]], created_by: int,
+                         channel: str, send_emails: bool = True) -> int:
+    """
+    Stage decisions for the admissions-decide job; progress goes to the
+    requester's SSE channel (principal_channel). A repeated app_id keeps
+    its last decision. Caller commits. Returns the run id.
+    """
+    staged: Dict[str, str] = {}
+    for app_id, status in decisions:
+        staged[app_id] = status
+
+    db.execute(text("""
+        INSERT INTO admission_runs (created_by, channel, send_emails, total)
+        VALUES (:by, :channel, :send, :total)
+    """), {"by": created_by, "channel": channel, "send": int(send_emails), "total": len(staged)})
+    run_id = db.execute(text("SELECT LAST_INSERT_ID()")).fetchone()[0]
+
+    db.execute(text("""
+        INSERT INTO admission_decisions (run_id, app_id, status)
+        VALUES (:run, :app_id, :status)
+    """), [{"run": run_id, "app_id": app_id, "status": status} for app_id, status in staged.items()])
+    return run_id
+
+
+def _progress(run_id: int, channel: Optional[str], **fields) -> None:
+    # Separate connection: readers see progress before the run commits
+    assignments = ", ".join(f"{name} = :{name}" for name in fields)
+    if fields.get("status") == "Running":
+        assignments += ", started_at = NOW()"
+    elif fields.get("status") in ("Done", "Failed"):
+        assignments += ", finished_at = NOW()"
+    with engine.begin() as conn:
+        conn.execute(text(f"UPDATE admission_runs SET {assignments} WHERE id = :id"), {"id": run_id, **fields})
+    if channel:
+        publish(channel, "admissions_progress", {"run_id": run_id, **fields})
+
+
+def _decision_messages(db: Session, ids: List[int], run_id: int) -> List[dict]:
+    rows = db.execute(text("""
+        SELECT d.status, d.grade, u.full_names, u.email
+        FROM admission_decisions d
+        JOIN users u ON u.id = d.user_id
+        WHERE d.id IN :ids AND d.changed = 1
+    """).bindparams(bindparam("ids", expanding=True)), {"ids": ids}).fetchall()
+
+    messages = []
+    for row in rows:
+        if not row.email:
+            continue
+        subject, title, message, theme = DECISION_EMAILS[row.status]
+        fields = {"name": row.full_names, "learner_name": row.full_names, "grade": row.grade}
+        messages.append({
+            "to_email": row.email,
+            "subject": merge_text(subject, fields, escape=False),
+            "html_body": render_email(fields, title, message, theme=theme),
+            "name": row.full_names,
+            "reference": f"admissions:{run_id}",
+        })
+    return messages
+
+
+def apply_admission_run(db: Session, run_id: int) -> dict:
+    """
+    Apply a staged run and commit. Decisions that match the application's
+    current state are left alone (no second email), so a retried or
+    re-submitted run is harmless.
+    """
+    run = db.execute(text("""
+        SELECT id, channel, send_emails, status FROM admission_runs WHERE id = :id
+    """), {"id": run_id}).fetchone()
+    if run is None:
+        raise ValueError(f"Unknown admission run {run_id}")
+
+    ids = [row.id for row in db.execute(text("""
+        SELECT id FROM admission_decisions WHERE run_id = :run ORDER BY id
+    """), {"run": run_id}).fetchall()]
+
+    _progress(run_id, run.channel, status="Running", processed=0, error=None)
+    summary = {"changed": 0, "unchanged": 0, "not_found": 0, "emails_queued": 0}
+
+    # @roster_sync_disabled lives on the connection: set and clear it on the
+    # one the session holds until commit/rollback returns it to the pool
+    conn = db.connection()
+    try:
+        # The roster triggers would rebuild per row; refreshed once below
+        conn.execute(text("SET @roster_sync_disabled = 1"))
+
+        for start in range(0, len(ids), CHUNK_SIZE):
+            chunk = ids[start:start + CHUNK_SIZE]
+            db.execute(text("""
+                UPDATE admission_decisions d
+                LEFT JOIN applications a ON a.app_id = d.app_id
+                SET d.user_id = a.user_id,
+                    d.grade = a.grade,
+                    d.previous_status = a.status,
+                    d.changed = CASE
+                        WHEN a.id IS NULL THEN NULL
+                        WHEN a.status = d.status AND a.Decision_mail = 'Yes' AND a.first_mail = 'Yes' THEN 0
+                        ELSE 1
+                    END
+                WHERE d.id IN :ids
+            """).bindparams(bindparam("ids", expanding=True)), {"ids": chunk})
+            db.execute(text("""
+                UPDATE applications a
+                JOIN admission_decisions d ON d.app_id = a.app_id
+                SET a.status = d.status, a.Decision_mail = 'Yes', a.first_mail = 'Yes', a.updated_at = NOW()
+                WHERE d.id IN :ids AND d.changed = 1
+            """).bindparams(bindparam("ids", expanding=True)), {"ids": chunk})
+
+            if run.send_emails:
+                summary["emails_queued"] += enqueue_emails(db, _decision_messages(db, chunk, run_id))
+
+            _progress(run_id, run.channel, processed=start + len(chunk))
+
+        for row in db.execute(text("""
+            SELECT changed, COUNT(*) AS n FROM admission_decisions WHERE run_id = :run GROUP BY changed
+        """), {"run": run_id}).fetchall():
+            summary[{1: "changed", 0: "unchanged", None: "not_found"}[row.changed]] = int(row.n)
+
+        grades = [row.grade for row in db.execute(text("""
+            SELECT DISTINCT grade FROM admission_decisions WHERE run_id = :run AND changed = 1
+        """), {"run": run_id}).fetchall()]
+        refresh_class_roster(db, grades)
+        conn.execute(text("SET @roster_sync_disabled = NULL"))
+        db.commit()
+    except Exception as e:
+        try:
+            conn.execute(text("SET @roster_sync_disabled = NULL"))
+        except Exception:
+            # Never hand a connection with the roster triggers off back to the pool
+            conn.invalidate()
+        db.rollback()
+        _progress(run_id, run.channel, status="Failed", error=f"{type(e).__name__}: {e}"[:2000])
+        raise
+
+    cache.invalidate(*(f"grade:{g}" for g in grades))
+    if summary["emails_queued"]:
+        outbox_worker.wake()
+
+    _progress(run_id, run.channel, status="Done", **summary)
+    return {"run_id": run_id, "grades": sorted(grades), **summary}
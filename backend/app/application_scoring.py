@@ -0,0 +1,337 @@
+# app/application_scoring.py
+"""
+Admissions scoring: a year's applications for a grade are unpacked from
+applications.data once into columns (one array per feature), every score
+component and eligibility rule is computed column by column, and the
+results land in application_scores with their breakdown. Rankings are
+read back in score order.
+
+    python -m app.application_scoring --grade 11 [--year 2026]
+
+create_application rescores just the new row; a config change or the
+application-scores job rescores a whole grade.
+"""
+import argparse
+import hashlib
+import json
+import math
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import orjson
+from sqlalchemy.orm import Session
+from sqlalchemy import text, bindparam
+from .cache import cached
+
+
+# ── CONFIG ─────────────────────────────────────────────────────────────────
+# Weights apply to Term 4 marks (0-100); improvement is the Term 2 -> Term 4
+# change in average over the subjects with both marks, clamped to
+# +/-MAX_IMPROVEMENT. The gates match the
+# application form (MIN_TERM4_MARK / MIN_AVERAGE_PERCENT in
+# ManageApplicationModal.jsx).
+DEFAULT_CONFIG = {
+    "weights": {
+        "mathematics": 0.35,
+        "science": 0.25,
+        "english": 0.15,
+        "average": 0.20,
+        "improvement": 0.05,
+    },
+    "english_home_language_bonus": 0.0,
+    "min_subject_t4": 30.0,
+    "min_average_t4": 42.0,
+    "min_mathematics_t4": 0.0,
+}
+COMPONENTS = tuple(DEFAULT_CONFIG["weights"])
+MAX_IMPROVEMENT = 20.0
+SCIENCE_SUBJECTS = ("Physical Sciences", "Natural Science")
+
+
+def load_scoring_config(db: Session, grade: int) -> dict:
+    """
+    DEFAULT_CONFIG with the grade's saved overrides on top, read fresh.
+    Scoring uses this: a rescore queued by a save may run on a worker
+    whose cached copy predates it.
+    """
+    row = db.execute(text("SELECT config FROM application_scoring_config WHERE grade = :g"),
+                     {"g": grade}).fetchone()
+    saved = (json.loads(row.config) if isinstance(row.config, str) else row.config) if row else {}
+    config = {**DEFAULT_CONFIG, **{k: v for k, v in saved.items() if k != "weights"}}
+    config["weights"] = {**DEFAULT_CONFIG["weights"], **saved.get("weights", {})}
+    return config
+
+
+@cached("scoring-config", ttl=300, tags=lambda grade: ["scoring-config"])
+def get_scoring_config(db: Session, grade: int) -> dict:
+    """load_scoring_config, cached for the settings GET."""
+    return load_scoring_config(db, grade)
+
+
+def save_scoring_config(db: Session, grade: int, config: dict) -> None:
+    """Store a grade's overrides (unknown keys rejected). Caller commits."""
+    unknown = (set(config) - set(DEFAULT_CONFIG)) | (set(config.get("weights", {})) - set(COMPONENTS))
+    if unknown:
+        raise ValueError(f"Unknown scoring settings: {', '.join(sorted(unknown))}")
+    db.execute(text("""
+        INSERT INTO application_scoring_config (grade, config) VALUES (:g, :config)
+        ON DUPLICATE KEY UPDATE config = VALUES(config)
+    """), {"g": grade, "config": json.dumps(config)})
+
+
+def _config_hash(config: dict) -> str:
+    return hashlib.blake2b(orjson.dumps(config, option=orjson.OPT_SORT_KEYS), digest_size=8).hexdigest()
+
+
+# ── COLUMNS ────────────────────────────────────────────────────────────────
+def _floats() -> array:
+    return array("d")
+
+
+def _ints() -> array:
+    return array("q")
+
+
+@dataclass
+class ApplicantColumns:
+    """One entry per application, same index in every column. NaN = mark not given."""
+    application_id: array = field(default_factory=_ints)
+    user_id: array = field(default_factory=_ints)
+    year: array = field(default_factory=_ints)
+    grade: array = field(default_factory=_ints)
+    app_id: List[str] = field(default_factory=list)
+    mathematics: array = field(default_factory=_floats)
+    science: array = field(default_factory=_floats)
+    english: array = field(default_factory=_floats)
+    average_t4: array = field(default_factory=_floats)
+    change_t2_t4: array = field(default_factory=_floats)  # over subjects with both marks
+    lowest_t4: array = field(default_factory=_floats)
+    english_home: array = field(default_factory=_ints)
+
+    def __len__(self) -> int:
+        return len(self.application_id)
+
+
+def _mark(value) -> float:
+    try:
+        mark = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return mark if 0.0 <= mark <= 100.0 else math.nan
+
+
+def _mean(values: List[float]) -> float:
+    values = [v for v in values if v == v]
+    return sum(values) / len(values) if values else math.nan
+
+
+def build_columns(rows: Iterable) -> ApplicantColumns:
+    """Rows with id, app_id, user_id, year, grade, data -> columns."""
+    cols = ApplicantColumns()
+    for row in rows:
+        data = row.data
+        data = orjson.loads(data) if isinstance(data, (str, bytes)) else (data or {})
+        subjects = data.get("subjects") or {}
+        t4 = {name: _mark(marks.get("t4")) for name, marks in subjects.items() if isinstance(marks, dict)}
+        t2 = {name: _mark(marks.get("t2")) for name, marks in subjects.items() if isinstance(marks, dict)}
+        # Same subjects on both sides, or a missing mark skews the change
+        paired = [name for name in t4 if t4[name] == t4[name] and t2[name] == t2[name]]
+
+        cols.application_id.append(row.id)
+        cols.user_id.append(row.user_id)
+        cols.year.append(row.year)
+        cols.grade.append(row.grade)
+        cols.app_id.append(row.app_id)
+        cols.mathematics.append(t4.get("Mathematics", math.nan))
+        cols.science.append(next((t4[s] for s in SCIENCE_SUBJECTS if s in t4), math.nan))
+        cols.english.append(t4.get("English", math.nan))
+        cols.average_t4.append(_mean(list(t4.values())))
+        cols.change_t2_t4.append(
+            _mean([t4[n] for n in paired]) - _mean([t2[n] for n in paired]) if paired else math.nan)
+        given = [v for v in t4.values() if v == v]
+        cols.lowest_t4.append(min(given) if given else math.nan)
+        cols.english_home.append(1 if data.get("englishLevel") == "Home Language" else 0)
+    return cols
+
+
+def load_columns(db: Session, year: Optional[int] = None, grade: Optional[int] = None,
+                 application_ids: Optional[List[int]] = None) -> ApplicantColumns:
+    where, params = [], {}
+    if year is not None:
+        where.append("year = :year")
+        params["year"] = year
+    if grade is not None:
+        where.append("grade = :grade")
+        params["grade"] = grade
+    query = "SELECT id, app_id, user_id, year, grade, data FROM applications"
+    if application_ids is not None:
+        where.append("id IN :ids")
+        params["ids"] = list(application_ids)
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    statement = text(query)
+    if application_ids is not None:
+        statement = statement.bindparams(bindparam("ids", expanding=True))
+    return build_columns(db.execute(statement, params))
+
+
+# ── SCORING ────────────────────────────────────────────────────────────────
+def _zero_nan(column: array) -> List[float]:
+    return [v if v == v else 0.0 for v in column]
+
+
+def score_columns(cols: ApplicantColumns, config: dict) -> Dict[str, list]:
+    """
+    Scores for every applicant, computed a column at a time: each
+    component is one pass over one column, the total is one pass over the
+    zipped components. Missing marks score 0 and fail eligibility.
+    """
+    w = config["weights"]
+    improvement = [
+        max(-MAX_IMPROVEMENT, min(MAX_IMPROVEMENT, change)) if change == change else 0.0
+        for change in cols.change_t2_t4
+    ]
+    components = {
+        "mathematics": [w["mathematics"] * v for v in _zero_nan(cols.mathematics)],
+        "science": [w["science"] * v for v in _zero_nan(cols.science)],
+        "english": [w["english"] * v for v in _zero_nan(cols.english)],
+        "average": [w["average"] * v for v in _zero_nan(cols.average_t4)],
+        "improvement": [w["improvement"] * v for v in improvement],
+    }
+    bonus = config["english_home_language_bonus"]
+    components["english_home_language"] = [bonus * v for v in cols.english_home]
+    scores = [round(sum(parts), 2) for parts in zip(*components.values())]
+
+    # Eligibility: each rule is a column of failure messages (None = pass)
+    min_subject, min_average, min_math = (
+        config["min_subject_t4"], config["min_average_t4"], config["min_mathematics_t4"])
+    rules = [
+        [None if v == v else "No Mathematics Term 4 mark" for v in cols.mathematics],
+        [f"Mathematics below {min_math:g}%" if v == v and v < min_math else None for v in cols.mathematics],
+        [None if v == v else "No Term 4 marks" for v in cols.average_t4],
+        [f"A subject below {min_subject:g}%" if v == v and v < min_subject else None for v in cols.lowest_t4],
+        [f"Average below {min_average:g}%" if v == v and v < min_average else None for v in cols.average_t4],
+    ]
+    reasons = [[r for r in failed if r] for failed in zip(*rules)]
+
+    names = list(components)
+    return {
+        "score": scores,
+        "eligible": [not r for r in reasons],
+        "reasons": reasons,
+        "breakdown": [dict(zip(names, (round(p, 2) for p in parts))) for parts in zip(*components.values())],
+    }
+
+
+def _persist(db: Session, cols: ApplicantColumns, result: Dict[str, list], config_hash: str) -> int:
+    rows = [{
+        "aid": cols.application_id[i],
+        "app_id": cols.app_id[i],
+        "uid": cols.user_id[i],
+        "year": cols.year[i],
+        "grade": cols.grade[i],
+        "score": result["score"][i],
+        "eligible": int(result["eligible"][i]),
+        "breakdown": orjson.dumps(result["breakdown"][i]).decode(),
+        "reasons": orjson.dumps(result["reasons"][i]).decode(),
+        "hash": config_hash,
+    } for i in range(len(cols))]
+    if not rows:
+        return 0
+    db.execute(text("""
+        INSERT INTO application_scores
+            (application_id, app_id, user_id, year, grade, score, eligible, breakdown, reasons, config_hash)
+        VALUES (:aid, :app_id, :uid, :year, :grade, :score, :eligible, :breakdown, :reasons, :hash)
+        ON DUPLICATE KEY UPDATE
+            year = VALUES(year), grade = VALUES(grade), score = VALUES(score),
+            eligible = VALUES(eligible), breakdown = VALUES(breakdown),
+            reasons = VALUES(reasons), config_hash = VALUES(config_hash), scored_at = NOW()
+    """), rows)
+    return len(rows)
+
+
+def score_grade(db: Session, year: int, grade: int) -> dict:
+    """Rescore every application for a year and grade. Caller commits."""
+    config = load_scoring_config(db, grade)
+    cols = load_columns(db, year=year, grade=grade)
+    scored = _persist(db, cols, score_columns(cols, config), _config_hash(config))
+    # Scores whose application was deleted or moved grade
+    removed = db.execute(text("""
+        DELETE s FROM application_scores s
+        LEFT JOIN applications a ON a.id = s.application_id AND a.year = s.year AND a.grade = s.grade
+        WHERE s.year = :year AND s.grade = :grade AND a.id IS NULL
+    """), {"year": year, "grade": grade}).rowcount
+    return {"year": year, "grade": grade, "scored": scored, "removed": removed}
+
+
+def score_applications(db: Session, application_ids: Iterable[int]) -> int:
+    """Rescore just these applications (new or edited). Caller commits."""
+    cols = load_columns(db, application_ids=sorted({int(i) for i in application_ids}))
+    scored = 0
+    for grade in sorted(set(cols.grade)):
+        idx = [i for i, g in enumerate(cols.grade) if g == grade]
+        subset = ApplicantColumns(**{
+            name: (type(col)(col.typecode, (col[i] for i in idx)) if isinstance(col, array)
+                   else [col[i] for i in idx])
+            for name, col in vars(cols).items()
+        })
+        config = load_scoring_config(db, grade)
+        scored += _persist(db, subset, score_columns(subset, config), _config_hash(config))
+    return scored
+
+
+# ── RANKINGS ───────────────────────────────────────────────────────────────
+def rankings(db: Session, year: int, grade: int, eligible_only: bool = False,
+             limit: int = 100, offset: int = 0) -> dict:
+    """Eligible applicants first, then by score; ties share a rank."""
+    eligible = "AND s.eligible = 1" if eligible_only else ""
+    rows = db.execute(text(f"""
+        SELECT *
+        FROM (
+            SELECT s.application_id, s.app_id, s.user_id, u.full_names, u.school,
+                   a.status, s.score, s.eligible, s.breakdown, s.reasons, s.scored_at,
+                   RANK() OVER (ORDER BY s.eligible DESC, s.score DESC) AS ranking
+            FROM application_scores s
+            JOIN applications a ON a.id = s.application_id
+            JOIN users u ON u.id = s.user_id
+            WHERE s.year = :year AND s.grade = :grade {eligible}
+        ) ranked
+        ORDER BY ranking, app_id
+        LIMIT :limit OFFSET :offset
+    """), {"year": year, "grade": grade, "limit": limit, "offset": offset}).fetchall()
+
+    totals = db.execute(text("""
+        SELECT COUNT(*) AS applicants, COALESCE(SUM(eligible), 0) AS eligible
+        FROM application_scores WHERE year = :year AND grade = :grade
+    """), {"year": year, "grade": grade}).fetchone()
+
+    return {
+        "year": year,
+        "grade": grade,
+        "applicants": int(totals.applicants),
+        "eligible": int(totals.eligible),
+        "results": [{
+            **row._mapping,
+            "eligible": bool(row.eligible),
+            "breakdown": orjson.loads(row.breakdown) if isinstance(row.breakdown, (str, bytes)) else row.breakdown,
+            "reasons": orjson.loads(row.reasons) if isinstance(row.reasons, (str, bytes)) else row.reasons,
+        } for row in rows],
+    }
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rescore applications for a grade")
+    parser.add_argument("--grade", type=int, required=True)
+    parser.add_argument("--year", type=int, default=datetime.now().year)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = score_grade(db, args.year, args.grade)
+        db.commit()
+        print(result)
+    finally:
+        db.close()
@@ -0,0 +1,159 @@
+# app/attendance_rollup.py
+from datetime import date, timedelta
+from typing import Iterable, List, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import text, bindparam
+
+
+COUNTS = """
+    SUM(status = 'Present') AS present,
+    SUM(status = 'Absent') AS absent,
+    SUM(status = 'Apology') AS apology,
+    COUNT(*) AS total
+"""
+
+
+# ── MAINTENANCE ────────────────────────────────────────────────────────────
+def refresh_attendance_rollups(db: Session, grade: int, class_date: str, learner_ids: Iterable[int]) -> None:
+    """
+    Recompute the rollup rows one capture touched: (grade, class_date) and
+    (learner, month of class_date) for the given learners. Recomputing the
+    touched keys from attendance_classes (instead of applying deltas)
+    stays correct when a capture overwrites earlier statuses.
+    Call inside the capture's transaction; caller commits.
+    """
+    ids = sorted({int(lid) for lid in learner_ids})
+    day = date.fromisoformat(str(class_date)[:10])
+
+    db.execute(text(f"""
+        INSERT INTO attendance_grade_daily (grade, class_date, present, absent, apology, total)
+        SELECT grade, class_date, {COUNTS}
+        FROM attendance_classes
+        WHERE grade = :grade AND class_date = :day
+        GROUP BY grade, class_date
+        ON DUPLICATE KEY UPDATE
+            present = VALUES(present), absent = VALUES(absent),
+            apology = VALUES(apology), total = VALUES(total)
+    """), {"grade": grade, "day": day})
+
+    if not ids:
+        return
+
+    first = day.replace(day=1)
+    db.execute(text(f"""
+        INSERT INTO attendance_learner_monthly
+            (user_id, period_year, period_month, grade, present, absent, apology, total)
+        SELECT user_id, :year, :month, MAX(grade), {COUNTS}
+        FROM attendance_classes
+        WHERE user_id IN :ids AND class_date >= :first AND class_date < :next
+        GROUP BY user_id
+        ON DUPLICATE KEY UPDATE
+            grade = VALUES(grade), present = VALUES(present), absent = VALUES(absent),
+            apology = VALUES(apology), total = VALUES(total)
+    """).bindparams(bindparam("ids", expanding=True)), {
+        "ids": ids,
+        "year": day.year,
+        "month": day.month,
+        "first": first,
+        "next": (first + timedelta(days=32)).replace(day=1),
+    })
+
+
+def rebuild_attendance_rollups(db: Session, date_from: date, date_to: date) -> dict:
+    """
+    Recompute both rollups for whole months covering date_from..date_to in
+    two set-based passes (backfill / repair). Caller commits.
+    """
+    start = date_from.replace(day=1)
+    end = (date_to.replace(day=1) + timedelta(days=32)).replace(day=1)  # exclusive
+    params = {"start": start, "end": end}
+
+    db.execute(text("""
+        DELETE FROM attendance_grade_daily WHERE class_date >= :start AND class_date < :end
+    """), params)
+    daily = db.execute(text(f"""
+        INSERT INTO attendance_grade_daily (grade, class_date, present, absent, apology, total)
+        SELECT grade, class_date, {COUNTS}
+        FROM attendance_classes
+        WHERE class_date >= :start AND class_date < :end
+        GROUP BY grade, class_date
+    """), params).rowcount
+
+    db.execute(text("""
+        DELETE FROM attendance_learner_monthly
+        WHERE (period_year * 100 + period_month) >= :ym_start
+          AND (period_year * 100 + period_month) < :ym_end
+    """), {"ym_start": start.year * 100 + start.month, "ym_end": end.year * 100 + end.month})
+    monthly = db.execute(text(f"""
+        INSERT INTO attendance_learner_monthly
+            (user_id, period_year, period_month, grade, present, absent, apology, total)
+        SELECT user_id, YEAR(class_date), MONTH(class_date), MAX(grade), {COUNTS}
+        FROM attendance_classes
+        WHERE class_date >= :start AND class_date < :end
+        GROUP BY user_id, YEAR(class_date), MONTH(class_date)
+    """), params).rowcount
+
+    return {"from": start, "to": end - timedelta(days=1), "grade_days": daily, "learner_months": monthly}
+
+
+# ── QUERIES ────────────────────────────────────────────────────────────────
+def _rate(row) -> Optional[float]:
+    # Apologies are excused, so they don't count against the rate
+    counted = int(row.total) - int(row.apology)
+    return round(int(row.present) / counted * 100, 1) if counted else None
+
+
+def _counts(row) -> dict:
+    return {
+        "present": int(row.present),
+        "absent": int(row.absent),
+        "apology": int(row.apology),
+        "total": int(row.total),
+        "rate": _rate(row),
+    }
+
+
+def grade_heatmap(db: Session, grade: int, date_from: date, date_to: date) -> List[dict]:
+    """One cell per captured class day."""
+    rows = db.execute(text("""
+        SELECT class_date, present, absent, apology, total
+        FROM attendance_grade_daily
+        WHERE grade = :grade AND class_date BETWEEN :start AND :end
+        ORDER BY class_date
+    """), {"grade": grade, "start": date_from, "end": date_to}).fetchall()
+    return [{"date": row.class_date, **_counts(row)} for row in rows]
+
+
+def grade_trend(db: Session, grade: int, period: str, date_from: date, date_to: date) -> List[dict]:
+    """Totals per ISO week (period='week', keyed by Monday) or per month."""
+    if period == "week":
+        bucket = "DATE_SUB(class_date, INTERVAL WEEKDAY(class_date) DAY)"
+    else:
+        bucket = "DATE_FORMAT(class_date, '%Y-%m-01')"
+    rows = db.execute(text(f"""
+        SELECT {bucket} AS period_start, COUNT(*) AS class_days,
+               SUM(present) AS present, SUM(absent) AS absent,
+               SUM(apology) AS apology, SUM(total) AS total
+        FROM attendance_grade_daily
+        WHERE grade = :grade AND class_date BETWEEN :start AND :end
+        GROUP BY period_start
+        ORDER BY period_start
+    """), {"grade": grade, "start": date_from, "end": date_to}).fetchall()
+    return [{"period_start": str(row.period_start), "class_days": int(row.class_days), **_counts(row)}
+            for row in rows]
+
+
+def learner_months(db: Session, learner_id: int, year: int) -> dict:
+    """Per-month counts for one learner plus the year's total."""
+    rows = db.execute(text("""
+        SELECT period_month, present, absent, apology, total
+        FROM attendance_learner_monthly
+        WHERE user_id = :lid AND period_year = :year
+        ORDER BY period_month
+    """), {"lid": learner_id, "year": year}).fetchall()
+
+    months = [{"month": row.period_month, **_counts(row)} for row in rows]
+    totals = {key: sum(m[key] for m in months) for key in ("present", "absent", "apology", "total")}
+    counted = totals["total"] - totals["apology"]
+    totals["rate"] = round(totals["present"] / counted * 100, 1) if counted else None
+    return {"year": year, "months": months, "year_to_date": totals}
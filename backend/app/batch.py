@@ -0,0 +1,136 @@
+# app/batch.py
+# One round trip for a page's independent GETs. Sub-requests are
+# dispatched in-process straight to the router (no HTTP, no middleware)
+# with the caller's token already decoded.
+import asyncio
+from contextlib import AsyncExitStack
+from typing import List, Optional
+from urllib.parse import urlsplit
+import orjson
+from fastapi import APIRouter, Depends, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from .auth.dependencies import get_current_user, get_current_staff
+from .database import read_session
+
+router = APIRouter(prefix="/api", tags=["batch"])
+
+BATCH_MAX_REQUESTS = 20
+BATCH_TIMEOUT_SECONDS = 30
+# Streams and exports never finish into one buffer, and batches don't nest
+BLOCKED_PREFIXES = ("/api/batch", "/api/events", "/api/staff/export/", "/api/staff/payroll/run")
+
+
+class SubRequest(BaseModel):
+    id: Optional[str] = None
+    path: str = Field(..., min_length=2)  # e.g. "/api/learner/profile" or with ?query
+
+
+class BatchRequest(BaseModel):
+    requests: List[SubRequest] = Field(..., min_length=1, max_length=BATCH_MAX_REQUESTS)
+    # Concurrent sub-requests each get their own session (a session is not
+    # thread-safe); sequential ones share one
+    concurrent: bool = True
+
+
+async def _dispatch(request: Request, path: str, shared: dict) -> tuple:
+    url = urlsplit(path)
+    if not url.path.startswith("/api/") or url.path.startswith(BLOCKED_PREFIXES):
+        return 400, "application/json", orjson.dumps({"detail": "Path not allowed in a batch"})
+
+    headers = [(k, v) for k, v in request.scope["headers"] if k in (b"authorization", b"accept-language")]
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": "GET",
+        "scheme": request.scope.get("scheme", "http"),
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": "",
+        "path": url.path,
+        "raw_path": url.path.encode(),
+        "query_string": url.query.encode(),
+        "headers": headers,
+        "app": request.app,
+        "state": {},
+        **shared,
+    }
+
+    status, content_type, chunks = 500, b"application/json", []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status, content_type
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            for k, v in message.get("headers", []):
+                if k == b"content-type":
+                    content_type = v
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        # The exit stack FastAPI's own middleware would provide
+        async with AsyncExitStack() as stack:
+            scope["fastapi_middleware_astack"] = stack
+            await asyncio.wait_for(request.app.router(scope, receive, send), BATCH_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        return 504, "application/json", orjson.dumps({"detail": "Sub-request timed out"})
+    except HTTPException as e:
+        return e.status_code, "application/json", orjson.dumps({"detail": e.detail})
+    except RequestValidationError as e:
+        return 422, "application/json", orjson.dumps({"detail": e.errors()}, default=str)
+    except Exception as e:
+        print(f"Batch sub-request {url.path} failed: {e}")
+        return 500, "application/json", orjson.dumps({"detail": "Internal Server Error"})
+
+    return status, content_type.decode("latin-1"), b"".join(chunks)
+
+
+@router.post("/batch")
+async def batch(
+    body: BatchRequest,
+    request: Request,
+    user: dict = Depends(get_current_user),
+):
+    """
+    Run several GETs for the same caller in one request:
+
+        {"requests": [{"id": "profile", "path": "/api/learner/profile"},
+                      {"id": "marks", "path": "/api/learner/assessments"}]}
+
+    Returns {"responses": [{"id", "status", "body"}, ...]} in request order.
+    JSON bodies are spliced in as-is, not decoded and re-encoded.
+    """
+    shared = {"batch_user": user}
+    if user.get("role") in ("Admin", "Staff"):
+        db = read_session(request.headers.get("authorization", ""))
+        try:
+            shared["batch_staff"] = await run_in_threadpool(get_current_staff, request, db, user)
+        finally:
+            db.close()
+
+    if body.concurrent:
+        results = await asyncio.gather(*(_dispatch(request, sub.path, shared) for sub in body.requests))
+    else:
+        db = read_session(request.headers.get("authorization", ""))
+        try:
+            shared["batch_session"] = db
+            results = [await _dispatch(request, sub.path, shared) for sub in body.requests]
+        finally:
+            db.close()
+
+    parts = []
+    for sub, (status, content_type, payload) in zip(body.requests, results):
+        if not content_type.startswith("application/json") or not payload:
+            payload = orjson.dumps(payload.decode("utf-8", "replace") if payload else None)
+        head = orjson.dumps({"id": sub.id or sub.path, "status": status})
+        parts.append(head[:-1] + b',"body":' + payload + b"}")
+
+    return Response(b'{"responses":[' + b",".join(parts) + b"]}", media_type="application/json")
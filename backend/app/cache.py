@@ -0,0 +1,251 @@
+# app/cache.py
+import functools
+import inspect
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from .config import CACHE_BACKEND, CACHE_URL, CACHE_MAX_ENTRIES
+from .metrics import cache_requests, cache_invalidations
+
+try:
+    import redis
+except ImportError:  # optional: only needed for CACHE_BACKEND=redis
+    redis = None
+
+
+MISS = object()
+
+
+# ── BACKENDS ───────────────────────────────────────────────────────────────
+class LocalBackend:
+    """
+    In-process LRU with per-entry expiry. Tag versions live here too, so
+    invalidation only reaches this worker.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._tags: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISS
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return MISS
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def tag_versions(self, tags: Tuple[str, ...]) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._tags.get(tag, 0) for tag in tags)
+
+    def bump_tags(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                self._tags[tag] = self._tags.get(tag, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+
+class RedisBackend:
+    """
+    Shared across workers. Values are pickled; tag versions are plain
+    counters so one worker's invalidation is seen by all.
+    """
+
+    def __init__(self, url: str = CACHE_URL, prefix: str = "nkateko:"):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis needs the redis package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str):
+        raw = self.client.get(self.prefix + key)
+        return MISS if raw is None else pickle.loads(raw)
+
+    def set(self, key: str, value, ttl: float) -> None:
+        self.client.set(self.prefix + key, pickle.dumps(value), px=int(ttl * 1000))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def tag_versions(self, tags: Tuple[str, ...]) -> Tuple[int, ...]:
+        if not tags:
+            return ()
+        raw = self.client.mget([f"{self.prefix}tag:{tag}" for tag in tags])
+        return tuple(int(v) if v is not None else 0 for v in raw)
+
+    def bump_tags(self, tags: Iterable[str]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for tag in tags:
+            pipe.incr(f"{self.prefix}tag:{tag}")
+        pipe.execute()
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+
+# ── CACHE ──────────────────────────────────────────────────────────────────
+class Cache:
+    """
+    Read-through cache with tag invalidation. Every entry remembers the
+    versions of its tags when it was stored; invalidate("grade:11") bumps
+    that tag, so any entry stored under an older version is a miss.
+    A shared backend gets a per-worker LRU in front of it.
+    """
+
+    def __init__(self, backend, local: Optional[LocalBackend] = None):
+        self.backend = backend
+        self.local = local
+
+    def get(self, key: str, tags: Iterable[str] = (), name: str = "default"):
+        tags = tuple(tags)
+        versions = self.backend.tag_versions(tags)
+
+        for layer in (self.local, self.backend):
+            if layer is None:
+                continue
+            entry = layer.get(key)
+            if entry is not MISS and entry[0] == versions:
+                if layer is self.backend and self.local is not None:
+                    self.local.set(key, entry, entry[1])
+                cache_requests.inc(name, "hit")
+                return entry[2]
+
+        cache_requests.inc(name, "miss")
+        return MISS
+
+    def set(self, key: str, value, ttl: float, tags: Iterable[str] = ()) -> None:
+        tags = tuple(tags)
+        entry = (self.backend.tag_versions(tags), ttl, value)
+        self.backend.set(key, entry, ttl)
+        if self.local is not None:
+            self.local.set(key, entry, ttl)
+
+    def get_or_set(self, key: str, loader: Callable[[], Any], ttl: float,
+                   tags: Iterable[str] = (), name: str = "default"):
+        tags = tuple(tags)
+        value = self.get(key, tags, name)
+        if value is MISS:
+            value = loader()
+            self.set(key, value, ttl, tags)
+        return value
+
+    def delete(self, key: str) -> None:
+        self.backend.delete(key)
+        if self.local is not None:
+            self.local.delete(key)
+
+    def invalidate(self, *tags: str) -> None:
+        """Drop every entry carrying any of these tags. Call after commit."""
+        tags = sorted(set(tags))
+        if not tags:
+            return
+        try:
+            self.backend.bump_tags(tags)
+        except Exception as e:
+            # A stale entry still expires on its TTL
+            print(f"Cache invalidation failed ({', '.join(tags[:5])}): {e}")
+            return
+        for tag in tags:
+            cache_invalidations.inc(tag.split(":", 1)[0])
+
+    def clear(self) -> None:
+        self.backend.clear()
+        if self.local is not None:
+            self.local.clear()
+
+
+def _build_cache() -> Cache:
+    if CACHE_BACKEND == "redis":
+        # Short local TTLs are not tracked separately: the local copy keeps
+        # the entry's own TTL and is checked against the shared tag versions
+        return Cache(RedisBackend(CACHE_URL), local=LocalBackend(CACHE_MAX_ENTRIES))
+    return Cache(LocalBackend(CACHE_MAX_ENTRIES))
+
+
+cache = _build_cache()
+
+
+def get_cache() -> Cache:
+    """FastAPI dependency: cache: Cache = Depends(get_cache)."""
+    return cache
+
+
+def is_replica(db) -> bool:
+    return isinstance(db, Session) and db.info.get("replica", False)
+
+
+def on_primary(db, load: Callable[[Any], Any]) -> Callable[[], Any]:
+    """
+    Loader for a cache miss that runs load(db) on the primary when db is a
+    replica session. A lagging replica read cached under a freshly bumped
+    tag version would pin pre-write data for the whole TTL.
+    """
+    if not is_replica(db):
+        return lambda: load(db)
+
+    def load_from_primary():
+        from .database import SessionLocal  # database -> replica -> cache
+        with SessionLocal() as primary:
+            return load(primary)
+    return load_from_primary
+
+
+def cached(name: str, ttl: float, tags: Optional[Callable[..., Iterable[str]]] = None):
+    """
+    Cache a helper's result. The key is the name plus the helper's
+    arguments, leaving out the DB session/connection; tags receives the
+    same arguments by name, e.g.
+
+        @cached("roster", ttl=60, tags=lambda grade: [f"grade:{grade}"])
+        def get_grade_roster(db, grade): ...
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items()
+                      if k not in ("db", "conn") and not isinstance(v, (Session, Connection))}
+            key = ":".join([name] + [str(v) for v in params.values()])
+            entry_tags = tags(**params) if tags else ()
+            replica = next((k for k, v in bound.arguments.items() if is_replica(v)), None)
+            if replica is None:
+                return cache.get_or_set(key, lambda: fn(*args, **kwargs), ttl, entry_tags, name)
+
+            def load(primary):
+                bound.arguments[replica] = primary
+                return fn(*bound.args, **bound.kwargs)
+            return cache.get_or_set(key, on_primary(bound.arguments[replica], load), ttl, entry_tags, name)
+
+        wrapper.uncached = fn
+        return wrapper
+
+    return decorator
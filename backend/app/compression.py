@@ -0,0 +1,168 @@
+# app/compression.py
+import gzip
+import zlib
+from typing import List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only without it
+    brotli = None
+
+
+# Only text-like bodies; uploads (PDF, images) and XLSX are already compressed
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "text/csv",
+    "text/html",
+    "text/plain",
+    "application/javascript",
+)
+# Push streams must reach the client unbuffered
+NEVER_COMPRESS = ("text/event-stream",)
+
+
+def _accepted(header: str) -> dict:
+    """Accept-Encoding -> {coding: q}."""
+    codings = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[name] = q
+    return codings
+
+
+def negotiate(header: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, or None."""
+    codings = _accepted(header)
+    wildcard = codings.get("*", 0.0)
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for coding in offered:
+        q = codings.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class _Compressor:
+    def __init__(self, coding: str, gzip_level: int, brotli_quality: int):
+        self.coding = coding
+        if coding == "br":
+            self._obj = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._obj = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.coding == "br":
+            return self._obj.process(data)
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        if self.coding == "br":
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+def compress_body(body: bytes, coding: str, gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def _with_headers(headers: List[Tuple[bytes, bytes]], coding: str, drop_length: bool) -> list:
+    out = [
+        (k, v) for k, v in headers
+        if not (drop_length and k.lower() == b"content-length") and k.lower() != b"vary"
+    ]
+    vary = [v for k, v in headers if k.lower() == b"vary"]
+    out.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+    out.append((b"content-encoding", coding.encode()))
+    return out
+
+
+class CompressionMiddleware:
+    """
+    Compresses JSON/CSV/text responses with brotli (if installed) or gzip,
+    whichever the client prefers. Bodies under minimum_size go out as-is;
+    streamed bodies (exports) are compressed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+
+        accept = ""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        coding = negotiate(accept)
+        if coding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                ctype = headers.get(b"content-type", b"").decode("latin-1")
+                passthrough = (
+                    message["status"] < 200 or message["status"] in (204, 304)
+                    or b"content-encoding" in headers
+                    or ctype.startswith(NEVER_COMPRESS)
+                    or not ctype.startswith(COMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message  # held until we see the first body chunk
+                return
+
+            if passthrough:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+
+            if compressor is None:
+                headers = list(start.get("headers", []))
+                if not more:
+                    # Whole body in one message: compress it or send as-is
+                    if len(body) < self.minimum_size:
+                        await send(start)
+                        return await send(message)
+                    compressed = compress_body(body, coding, self.gzip_level, self.brotli_quality)
+                    headers = _with_headers(headers, coding, drop_length=True)
+                    headers.append((b"content-length", str(len(compressed)).encode()))
+                    await send({**start, "headers": headers})
+                    return await send({"type": "http.response.body", "body": compressed})
+
+                compressor = _Compressor(coding, self.gzip_level, self.brotli_quality)
+                await send({**start, "headers": _with_headers(headers, coding, drop_length=True)})
+
+            chunk = compressor.compress(body)
+            if not more:
+                chunk += compressor.flush()
+            if chunk or not more:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
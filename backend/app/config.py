@@ -18,10 +18,86 @@ DATABASE_URL = (
     f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}"
     f"@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
+# Optional read replica for GET routes. Unset DB_REPLICA_HOST = primary
+# only. To try it locally, run a second MySQL replicating from the first
+# (e.g. on port 3307) and set DB_REPLICA_HOST=127.0.0.1 DB_REPLICA_PORT=3307.
+# Needs CACHE_BACKEND=redis: read-your-writes stickiness must be shared by
+# every worker, so the replica stays off with the per-worker memory cache.
+DB_REPLICA_HOST = os.getenv("DB_REPLICA_HOST", "")
+DB_REPLICA_PORT = os.getenv("DB_REPLICA_PORT", DB_PORT)
+DB_REPLICA_USER = os.getenv("DB_REPLICA_USER", DB_USER)
+DB_REPLICA_PASSWORD = quote_plus(os.getenv("DB_REPLICA_PASSWORD", "")) or DB_PASSWORD
+REPLICA_URL = (
+    f"mysql+pymysql://{DB_REPLICA_USER}:{DB_REPLICA_PASSWORD}"
+    f"@{DB_REPLICA_HOST}:{DB_REPLICA_PORT}/{DB_NAME}"
+) if DB_REPLICA_HOST else None
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "2"))
+# After a user writes, their reads stay on the primary this long
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "15"))
+
 UPLOAD_DIR = "uploads/learner_documents"  # relative to project root
 BASE_URL = "http://localhost:8000"  # change to https://yourdomain.com in production
 
 # JWT
 SECRET_KEY = os.getenv("SECRET_KEY", "change-this-in-production-to-a-very-long-random-string")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
\ No newline at end of file
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+# Email outbox
+OUTBOX_WORKER_ENABLED = os.getenv("OUTBOX_WORKER_ENABLED", "1") == "1"
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "50"))
+MAIL_RATE_PER_SECOND = float(os.getenv("MAIL_RATE_PER_SECOND", "10"))  # provider limit
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "6"))
+MAIL_POLL_SECONDS = float(os.getenv("MAIL_POLL_SECONDS", "2"))
+
+# Server push (SSE): "memory" for a single worker, "database" to fan out
+# across workers through event_log
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "memory")
+EVENTS_POLL_SECONDS = float(os.getenv("EVENTS_POLL_SECONDS", "1"))
+
+# Response compression (gzip, or brotli when installed)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# Metrics: statements slower than this go to LOG/Slowqueries. Set
+# METRICS_TOKEN to require "Authorization: Bearer <token>" on /metrics.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Caching: "memory" keeps an LRU per worker; "redis" shares entries and
+# tag invalidations across workers (needs the redis package)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_URL = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "5000"))
+
+# Background jobs: every worker runs queued jobs; one elected leader
+# (MySQL GET_LOCK) enqueues the scheduled ones
+JOBS_ENABLED = os.getenv("JOBS_ENABLED", "1") == "1"
+JOBS_MAX_WORKERS = int(os.getenv("JOBS_MAX_WORKERS", "4"))
+JOBS_POLL_SECONDS = float(os.getenv("JOBS_POLL_SECONDS", "2"))
+
+# Upload GC: orphaned files go to a quarantine dir outside the /uploads
+# mount and are purged after a while
+UPLOAD_QUARANTINE_DIR = os.getenv("UPLOAD_QUARANTINE_DIR", "uploads_quarantine")
+UPLOAD_GC_GRACE_HOURS = float(os.getenv("UPLOAD_GC_GRACE_HOURS", "24"))
+UPLOAD_GC_QUARANTINE_DAYS = float(os.getenv("UPLOAD_GC_QUARANTINE_DAYS", "14"))
+
+# Idempotency-Key on writes: responses kept for TTL hours; a duplicate
+# waits up to WAIT seconds for the first to finish (then 409); an owner
+# silent for LOCK seconds is presumed dead. Larger responses aren't kept.
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "120"))
+IDEMPOTENCY_MAX_RESPONSE = int(os.getenv("IDEMPOTENCY_MAX_RESPONSE", str(256 * 1024)))  # bytes
+
+# Staff learner search: per-worker index, topped up from users.updated_at
+# at most every REFRESH seconds and rebuilt every FULL seconds
+SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "30"))
+SEARCH_INDEX_FULL_SECONDS = float(os.getenv("SEARCH_INDEX_FULL_SECONDS", "3600"))
+
+# Term report cards: rendered in a process pool of WORKERS processes
+# (0 = one per CPU); PDF needs WeasyPrint, otherwise cards are HTML
+REPORT_CARD_WORKERS = int(os.getenv("REPORT_CARD_WORKERS", "0"))
+REPORT_CARD_PDF = os.getenv("REPORT_CARD_PDF", "1") == "1"
@@ -1,12 +1,75 @@
 # app/database.py
-from sqlalchemy import create_engine, text
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
-from .config import DATABASE_URL
+from .config import DATABASE_URL, REPLICA_URL, CACHE_BACKEND
+from .metrics import instrument_engine, session_routes
+from .replica import ReplicaMonitor, READ_METHODS, is_sticky, user_key
 
 engine = create_engine(DATABASE_URL)
+instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db():
+# Optional replica for reads (see REPLICA_URL in config)
+replica_engine = None
+if REPLICA_URL and CACHE_BACKEND != "redis":
+    # Stickiness in a per-worker cache: a user's next GET on another worker
+    # would read the lagging replica right after their write
+    print("Read replica disabled: DB_REPLICA_HOST needs CACHE_BACKEND=redis")
+elif REPLICA_URL:
+    replica_engine = create_engine(REPLICA_URL, pool_pre_ping=True)
+ReplicaSessionLocal = None
+replica_monitor = None
+if replica_engine is not None:
+    instrument_engine(replica_engine, "replica")
+    # info["replica"] lets cache loaders tell replica sessions apart (app/cache.py)
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine,
+                                       info={"replica": True})
+    replica_monitor = ReplicaMonitor(replica_engine)
+
+    @event.listens_for(replica_engine, "connect")
+    def _read_only(dbapi_connection, connection_record):
+        # A write that slips through on a GET fails instead of diverging
+        cursor = dbapi_connection.cursor()
+        cursor.execute("SET SESSION TRANSACTION READ ONLY")
+        cursor.close()
+
+
+def replica_available() -> bool:
+    return replica_monitor is not None and replica_monitor.healthy()
+
+
+def read_session(authorization: str = ""):
+    """
+    Session for read-only work: the replica when it is healthy and the
+    caller hasn't written recently, otherwise the primary.
+    """
+    if replica_available() and not is_sticky(user_key(authorization)):
+        session_routes.inc("replica")
+        return ReplicaSessionLocal()
+    session_routes.inc("primary")
+    return SessionLocal()
+
+
+def get_db(request: Request):
+    shared = request.scope.get("batch_session")
+    if shared is not None:
+        # Sequential /api/batch sub-requests share the batch's session
+        yield shared
+        return
+    if request.method in READ_METHODS:
+        db = read_session(request.headers.get("authorization", ""))
+    else:
+        session_routes.inc("primary")
+        db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_primary_db():
+    """For the rare GET that has to see the primary (or writes)."""
     db = SessionLocal()
     try:
         yield db
@@ -19,4 +82,4 @@ try:
         conn.execute(text("SELECT 1"))
     print("Database connection OK")
 except Exception as e:
-    print(f"Database connection FAILED: {e}")
\ No newline at end of file
+    print(f"Database connection FAILED: {e}")
@@ -0,0 +1,363 @@
+# app/early_warning.py
+"""
+Early-warning engine: scores learners from attendance, assessment marks
+and term marks and keeps rule-owned learner_warnings in step.
+
+    python -m app.early_warning [--full] [--grade 11]
+"""
+import argparse
+import json
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import text, bindparam
+from .versioning import bump_versions
+from .events import publish
+from .cache import cache
+
+
+# ── RULES ──────────────────────────────────────────────────────────────────
+ATTENDANCE_WINDOW_DAYS = 60
+ATTENDANCE_MIN_CLASSES = 5
+ATTENDANCE_RED, ATTENDANCE_YELLOW = 60.0, 80.0  # % present, apologies excluded
+
+MARKS_WINDOW_DAYS = 120
+MARKS_RECENT_DAYS = 30
+MARKS_MIN_COUNT = 2
+MARKS_RED, MARKS_YELLOW = 40.0, 50.0            # average %
+DROP_RED, DROP_YELLOW = 20.0, 10.0              # recent vs earlier average, points
+
+TERM_RED, TERM_YELLOW = 40.0, 50.0              # latest term average %
+
+SEVERITY = {"Yellow": "medium", "Red": "high"}
+
+# Resources whose data_versions stamps mean "scores may have changed"
+SOURCE_RESOURCES = ("attendance", "assessments", "term-marks")
+
+Verdict = Tuple[str, str]  # (warning_type, reason)
+
+
+def _level(value: float, red: float, yellow: float, below: bool = True) -> Optional[str]:
+    if below:
+        return "Red" if value < red else "Yellow" if value < yellow else None
+    return "Red" if value >= red else "Yellow" if value >= yellow else None
+
+
+def evaluate(f: dict) -> Dict[str, Verdict]:
+    """Rule -> (type, reason) for one learner's features. Missing rules don't apply."""
+    verdicts = {}
+
+    attended = f["present"] + f["absent"]
+    if attended >= ATTENDANCE_MIN_CLASSES:
+        rate = f["present"] / attended * 100
+        level = _level(rate, ATTENDANCE_RED, ATTENDANCE_YELLOW)
+        if level:
+            verdicts["attendance"] = (level, (
+                f"Attendance {rate:.0f}% over the last {ATTENDANCE_WINDOW_DAYS} days "
+                f"({f['absent']} unexcused absences in {attended} classes)"))
+
+    if f["mark_count"] >= MARKS_MIN_COUNT and f["overall_avg"] is not None:
+        level = _level(f["overall_avg"], MARKS_RED, MARKS_YELLOW)
+        if level:
+            verdicts["marks-low"] = (level, (
+                f"Assessment average {f['overall_avg']:.0f}% over {f['mark_count']} assessments"))
+
+    if f["recent_avg"] is not None and f["prior_avg"] is not None:
+        drop = f["prior_avg"] - f["recent_avg"]
+        level = _level(drop, DROP_RED, DROP_YELLOW, below=False)
+        if level:
+            verdicts["marks-drop"] = (level, (
+                f"Marks dropped {drop:.0f} points: {f['recent_avg']:.0f}% in the last "
+                f"{MARKS_RECENT_DAYS} days vs {f['prior_avg']:.0f}% before"))
+
+    if f["term_avg"] is not None:
+        level = _level(f["term_avg"], TERM_RED, TERM_YELLOW)
+        if level:
+            verdicts["term-marks"] = (level, (
+                f"Term {f['term']} average {f['term_avg']:.0f}% "
+                f"({f['term_failing']} subject(s) below {TERM_RED:.0f}%)"))
+
+    return verdicts
+
+
+# ── FEATURES ───────────────────────────────────────────────────────────────
+FEATURES_SQL = text("""
+    SELECT
+        r.user_id,
+        COALESCE(att.present, 0) AS present,
+        COALESCE(att.absent, 0) AS absent,
+        mk.overall_avg,
+        mk.recent_avg,
+        mk.prior_avg,
+        COALESCE(mk.mark_count, 0) AS mark_count
+    FROM class_roster r
+    LEFT JOIN (
+        SELECT user_id,
+               SUM(status = 'Present') AS present,
+               SUM(status = 'Absent') AS absent
+        FROM attendance_classes
+        WHERE grade = :grade AND class_date >= :att_from
+        GROUP BY user_id
+    ) att ON att.user_id = r.user_id
+    LEFT JOIN (
+        SELECT am.learner_id,
+               AVG(am.percentage) AS overall_avg,
+               AVG(CASE WHEN a.date_written >= :recent_from THEN am.percentage END) AS recent_avg,
+               AVG(CASE WHEN a.date_written < :recent_from THEN am.percentage END) AS prior_avg,
+               COUNT(am.percentage) AS mark_count
+        FROM assessments a
+        JOIN assessment_marks am ON am.assessment_id = a.id
+        WHERE a.grade = :grade AND a.date_written >= :marks_from
+        GROUP BY am.learner_id
+    ) mk ON mk.learner_id = r.user_id
+    WHERE r.grade = :grade AND r.user_id IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+TERM_MARKS_SQL = text("""
+    SELECT t.user_id, t.term, t.marks
+    FROM learner_term_marks t
+    JOIN (
+        SELECT user_id, MAX(term) AS term
+        FROM learner_term_marks
+        WHERE user_id IN :ids
+        GROUP BY user_id
+    ) latest ON latest.user_id = t.user_id AND latest.term = t.term
+""").bindparams(bindparam("ids", expanding=True))
+
+
+def _num(value) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+def grade_features(db: Session, grade: int, learner_ids: List[int], today: date) -> List[dict]:
+    """
+    Features for the given learners of one grade: two aggregate queries
+    for the whole set, no per-learner round trips.
+    """
+    if not learner_ids:
+        return []
+
+    rows = db.execute(FEATURES_SQL, {
+        "grade": grade,
+        "ids": learner_ids,
+        "att_from": today - timedelta(days=ATTENDANCE_WINDOW_DAYS),
+        "marks_from": today - timedelta(days=MARKS_WINDOW_DAYS),
+        "recent_from": today - timedelta(days=MARKS_RECENT_DAYS),
+    }).fetchall()
+
+    terms = {}
+    for row in db.execute(TERM_MARKS_SQL, {"ids": learner_ids}).fetchall():
+        marks = json.loads(row.marks) if isinstance(row.marks, str) else (row.marks or {})
+        values = []
+        for value in marks.values():
+            try:
+                values.append(float(value))
+            except (TypeError, ValueError):
+                continue
+        if values:
+            terms[row.user_id] = (row.term, sum(values) / len(values),
+                                  sum(1 for v in values if v < TERM_RED))
+
+    features = []
+    for row in rows:
+        term, term_avg, failing = terms.get(row.user_id, (None, None, 0))
+        features.append({
+            "learner_id": row.user_id,
+            "present": int(row.present),
+            "absent": int(row.absent),
+            "overall_avg": _num(row.overall_avg),
+            "recent_avg": _num(row.recent_avg),
+            "prior_avg": _num(row.prior_avg),
+            "mark_count": int(row.mark_count),
+            "term": term,
+            "term_avg": term_avg,
+            "term_failing": failing,
+        })
+    return features
+
+
+# ── CHANGE TRACKING ────────────────────────────────────────────────────────
+def _last_watermark(db: Session):
+    # Only runs over every grade: a --grade run says nothing about the others
+    return db.execute(text("""
+        SELECT started_at FROM early_warning_runs
+        WHERE finished_at IS NOT NULL AND grades IS NULL
+        ORDER BY started_at DESC LIMIT 1
+    """)).scalar()
+
+
+def changed_learners(db: Session, since) -> Set[int]:
+    """Learners with new attendance, marks or term marks, or who joined a roster, since the watermark."""
+    rows = db.execute(text("""
+        SELECT user_id FROM data_versions
+        WHERE updated_at >= :since AND resource IN :resources AND user_id > 0
+        UNION
+        SELECT user_id FROM class_roster WHERE updated_at >= :since
+    """).bindparams(bindparam("resources", expanding=True)),
+        {"since": since, "resources": list(SOURCE_RESOURCES)}).fetchall()
+    return {row.user_id for row in rows}
+
+
+# ── RECONCILE ──────────────────────────────────────────────────────────────
+def reconcile(db: Session, learner_ids: List[int], verdicts: Dict[int, Dict[str, Verdict]]) -> dict:
+    """
+    Make the rule-owned warnings of these learners match verdicts: insert
+    new ones, update type/reason in place (re-activating on a type change)
+    and resolve the ones that no longer apply. Staff-issued warnings
+    (rule IS NULL) are never touched. Caller commits.
+    """
+    existing = db.execute(text("""
+        SELECT id, learner_id, rule, warning_type, reason
+        FROM learner_warnings
+        WHERE learner_id IN :ids AND rule IS NOT NULL
+          AND status IN ('Active', 'Acknowledged')
+    """).bindparams(bindparam("ids", expanding=True)), {"ids": learner_ids}).fetchall()
+    current = {(row.learner_id, row.rule): row for row in existing}
+
+    inserts, retypes, rewords, resolves = [], [], [], []
+    changes: Dict[int, List[dict]] = {}
+    touched: Set[int] = set()
+
+    for lid in learner_ids:
+        for rule, (wtype, reason) in verdicts.get(lid, {}).items():
+            row = current.pop((lid, rule), None)
+            params = {"lid": lid, "rule": rule, "type": wtype, "reason": reason, "severity": SEVERITY[wtype]}
+            if row is None:
+                inserts.append(params)
+            elif row.warning_type != wtype:
+                retypes.append({**params, "id": row.id})
+            elif row.reason != reason:
+                rewords.append({"id": row.id, "reason": reason})
+                touched.add(lid)
+                continue
+            else:
+                continue
+            changes.setdefault(lid, []).append({"rule": rule, "type": wtype, "severity": SEVERITY[wtype], "status": "Active"})
+
+    for (lid, rule), row in current.items():
+        resolves.append({"id": row.id})
+        changes.setdefault(lid, []).append({"rule": rule, "type": row.warning_type, "status": "Resolved"})
+
+    if inserts:
+        db.execute(text("""
+            INSERT INTO learner_warnings (learner_id, warning_type, reason, severity, rule)
+            VALUES (:lid, :type, :reason, :severity, :rule)
+        """), inserts)
+    if retypes:
+        db.execute(text("""
+            UPDATE learner_warnings
+            SET warning_type = :type, reason = :reason, severity = :severity,
+                status = 'Active', acknowledged_at = NULL, issued_at = NOW()
+            WHERE id = :id
+        """), retypes)
+    if rewords:
+        db.execute(text("UPDATE learner_warnings SET reason = :reason WHERE id = :id"), rewords)
+    if resolves:
+        db.execute(text("""
+            UPDATE learner_warnings SET status = 'Resolved', resolved_at = NOW() WHERE id = :id
+        """), resolves)
+
+    return {
+        "raised": len(inserts),
+        "updated": len(retypes) + len(rewords),
+        "resolved": len(resolves),
+        "changes": changes,
+        "touched": touched | set(changes),
+    }
+
+
+# ── RUN ────────────────────────────────────────────────────────────────────
+def _commit_reconciled(db: Session, result: dict) -> dict:
+    """Bump, commit, then invalidate and push what reconcile changed."""
+    touched = result["touched"]
+    bump_versions(db, "warnings", touched)
+    db.commit()
+
+    cache.invalidate(*(f"learner:{lid}" for lid in touched))
+    for lid, changes in result["changes"].items():
+        for change in changes:
+            publish(f"learner:{lid}", "warning", change)
+    return result
+
+
+def run_early_warnings(db: Session, full: bool = False, grades: Optional[Iterable[int]] = None) -> dict:
+    """
+    Score learners and reconcile their warnings, one grade at a time.
+    Incremental by default: only learners whose source data changed since
+    the last finished all-grade run. Time windows slide even without new
+    data, so schedule an occasional full run too; full all-grade runs also
+    resolve the rule warnings of learners no longer on any roster.
+    Commits per grade.
+    """
+    started = time.perf_counter()
+    now = db.execute(text("SELECT NOW()")).scalar()
+    since = None if full else _last_watermark(db)
+    full = since is None
+
+    wanted = sorted({int(g) for g in grades}) if grades is not None else None
+    db.execute(text("""
+        INSERT INTO early_warning_runs (started_at, full_run, grades) VALUES (:now, :full, :grades)
+    """), {"now": now, "full": full, "grades": ",".join(map(str, wanted)) if wanted is not None else None})
+    run_id = db.execute(text("SELECT LAST_INSERT_ID()")).scalar()
+    db.commit()
+
+    changed = None if full else changed_learners(db, since)
+
+    roster = db.execute(text("SELECT grade, user_id FROM class_roster")).fetchall()
+    by_grade: Dict[int, List[int]] = {}
+    for row in roster:
+        if wanted is not None and row.grade not in wanted:
+            continue
+        if changed is not None and row.user_id not in changed:
+            continue
+        by_grade.setdefault(row.grade, []).append(row.user_id)
+
+    totals = {"learners_scored": 0, "raised": 0, "updated": 0, "resolved": 0}
+    for grade, learner_ids in sorted(by_grade.items()):
+        features = grade_features(db, grade, learner_ids, now.date())
+        verdicts = {f["learner_id"]: evaluate(f) for f in features}
+        result = _commit_reconciled(db, reconcile(db, learner_ids, verdicts))
+
+        totals["learners_scored"] += len(learner_ids)
+        for key in ("raised", "updated", "resolved"):
+            totals[key] += result[key]
+
+    if full and grades is None:
+        # Learners who left every roster are never scored again; their rule
+        # warnings would stay Active for good
+        gone = [row.learner_id for row in db.execute(text("""
+            SELECT DISTINCT w.learner_id
+            FROM learner_warnings w
+            LEFT JOIN class_roster r ON r.user_id = w.learner_id
+            WHERE w.rule IS NOT NULL AND w.status IN ('Active', 'Acknowledged')
+              AND r.user_id IS NULL
+        """)).fetchall()]
+        if gone:
+            totals["resolved"] += _commit_reconciled(db, reconcile(db, gone, {}))["resolved"]
+
+    db.execute(text("""
+        UPDATE early_warning_runs
+        SET finished_at = NOW(), learners_scored = :learners_scored,
+            raised = :raised, updated = :updated, resolved = :resolved
+        WHERE id = :id
+    """), {**totals, "id": run_id})
+    db.commit()
+
+    return {"run_id": run_id, "full": full, **totals,
+            "seconds": round(time.perf_counter() - started, 2)}
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Score learners and update early warnings")
+    parser.add_argument("--full", action="store_true", help="score every learner, not only changed ones")
+    parser.add_argument("--grade", type=int, action="append", help="limit to a grade (repeatable)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(run_early_warnings(db, full=args.full, grades=args.grade))
+    finally:
+        db.close()
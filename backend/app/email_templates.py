@@ -0,0 +1,147 @@
+# app/email_templates.py
+# Server-side port of frontend/src/utils/email/buildEmailTemplate.js and
+# emailThemes.js, so bulk mail can be rendered without the browser.
+import html
+from datetime import datetime
+from functools import lru_cache
+from string import Template
+from typing import Dict, Optional
+
+
+EMAIL_THEMES = {
+    "positive": {
+        "color": "#28a745",
+        "gradient": "linear-gradient(135deg,#28a745,#7dd87d)"
+    },
+    "negative": {
+        "color": "#dc3545",
+        "gradient": "linear-gradient(135deg,#dc3545,#ff7b7b)"
+    },
+    "warning": {
+        "color": "#ffc107",
+        "gradient": "linear-gradient(135deg,#ffc107,#ffe082)"
+    },
+    "standard": {
+        "color": "#0d6efd",
+        "gradient": "linear-gradient(135deg,#0d6efd,#6ea8fe)"
+    }
+}
+
+# Fields staff can use in subject/title/message, e.g. "Hi $learner_name"
+MERGE_FIELDS = ["name", "learner_name", "grade", "school", "average_mark", "parent_name"]
+
+DEFAULT_REGARDS = "Best regards,<br><strong>Bokamoso Educational Trust</strong>"
+
+_LAYOUT = """
+<div style="max-width:600px;margin:auto;font-family:Poppins,Arial,sans-serif;background:#f4f4f4;padding:40px">
+
+<table width="100%" style="background:#ffffff;border-radius:18px;box-shadow:0 10px 30px rgba(0,0,0,0.1);overflow:hidden">
+
+<tr>
+<td style="background:{gradient};padding:50px;text-align:center;color:white">
+<h1 style="margin:0;font-size:32px;font-weight:700;">$$title</h1>
+<p style="margin:10px 0 0;font-size:18px;">$$subtitle</p>
+</td>
+</tr>
+
+<tr>
+<td style="padding:40px;color:#333;line-height:1.6;font-size:16px">
+
+<p>Hi <strong>$$name</strong>,</p>
+
+$$message
+
+$$button
+
+<p style="margin-top:30px;color:#555">
+  $$regards
+</p>
+
+</td>
+</tr>
+
+<tr>
+<td style="background:#f8f9fa;padding:20px;text-align:center;color:#555;font-size:14px">
+© $$year Bokamoso Educational Trust • All rights reserved
+</td>
+</tr>
+
+</table>
+
+</div>
+"""
+
+_BUTTON = """
+      <p style="text-align:center;margin:30px 0">
+        <a href="$$link"
+          style="display:inline-block;
+          background:{color};
+          color:white;
+          padding:14px 36px;
+          border-radius:50px;
+          text-decoration:none;
+          font-weight:bold;
+          box-shadow:0 4px 12px rgba(0,0,0,0.15)">
+          $$text
+        </a>
+      </p>
+"""
+
+
+@lru_cache(maxsize=None)
+def _layout(theme: str) -> Template:
+    colors = EMAIL_THEMES.get(theme, EMAIL_THEMES["standard"])
+    return Template(_LAYOUT.format(**colors).replace("$$", "$"))
+
+
+@lru_cache(maxsize=None)
+def _button(theme: str) -> Template:
+    colors = EMAIL_THEMES.get(theme, EMAIL_THEMES["standard"])
+    return Template(_BUTTON.format(**colors).replace("$$", "$"))
+
+
+@lru_cache(maxsize=256)
+def compile_text(source: str) -> Template:
+    """Staff-written subject/title/message, compiled once per distinct text."""
+    return Template(source)
+
+
+def merge_text(source: str, fields: Dict[str, object], escape: bool = True) -> str:
+    values = {
+        k: html.escape(str(v)) if escape else str(v)
+        for k, v in fields.items() if v is not None
+    }
+    return compile_text(source).safe_substitute(values)
+
+
+def render_email(
+    fields: Dict[str, object],
+    title: str,
+    message: str,
+    subtitle: str = "",
+    theme: str = "standard",
+    button_text: Optional[str] = None,
+    button_link: Optional[str] = None,
+    regards: Optional[str] = None,
+) -> str:
+    """
+    Full HTML email for one recipient. title/subtitle/message may contain
+    $merge fields; merged values are HTML-escaped, the staff-written
+    message HTML is not (same as the browser template).
+    """
+    button = ""
+    if button_link:
+        button = _button(theme).substitute(
+            link=html.escape(button_link, quote=True),
+            text=html.escape(button_text or "Open Link"),
+        )
+
+    return _layout(theme).substitute(
+        title=merge_text(title, fields),
+        subtitle=merge_text(subtitle or "", fields),
+        name=html.escape(str(fields.get("name") or "")),
+        message=merge_text(message, fields),
+        button=button,
+        regards=regards or DEFAULT_REGARDS,
+        year=datetime.now().year,
+    )
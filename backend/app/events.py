@@ -0,0 +1,252 @@
+# app/events.py
+import asyncio
+import json
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import text
+from .config import EVENTS_BACKEND, EVENTS_POLL_SECONDS
+from .database import SessionLocal, engine
+from .auth.dependencies import decode_token
+
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+HEARTBEAT_SECONDS = 15
+QUEUE_SIZE = 100  # per connection; a slow client drops events and refetches
+
+
+# ── BROKER ─────────────────────────────────────────────────────────────────
+# Channels:
+#   all              every signed-in user (e.g. term opened)
+#   grade:{g}        learners/parents of a grade (class messages)
+#   learner:{id}     one learner, and that learner's parents (warnings)
+#   staff:{id}       one staff member
+class EventBroker:
+    """
+    Fans events out to the SSE connections of this worker. publish() is
+    safe to call from sync route handlers (thread pool); delivery hops
+    onto the event loop. Cross-worker delivery goes through the backend.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self.backend = None
+
+    def set_backend(self, backend) -> None:
+        self.backend = backend
+
+    def publish(self, channel: str, event: str, data: dict) -> None:
+        message = {"channel": channel, "event": event, "data": data}
+        if self.backend is None:
+            self.deliver(message)
+        else:
+            self.backend.publish(message)
+
+    def deliver(self, message: dict) -> None:
+        """Hand a message to every local subscriber of its channel."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        with self._lock:
+            queues = list(self._subscribers.get(message["channel"], ()))
+        for queue in queues:
+            loop.call_soon_threadsafe(_offer, queue, message)
+
+    def subscribe(self, channels: Iterable[str]) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, channels: Iterable[str], queue: asyncio.Queue) -> None:
+        with self._lock:
+            for channel in channels:
+                subs = self._subscribers.get(channel)
+                if subs:
+                    subs.discard(queue)
+                    if not subs:
+                        del self._subscribers[channel]
+
+
+def _offer(queue: asyncio.Queue, message: dict) -> None:
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        pass
+
+
+class MemoryBackend:
+    """Single worker: deliver straight to local subscribers."""
+
+    def __init__(self, broker: EventBroker):
+        self.broker = broker
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def publish(self, message: dict) -> None:
+        self.broker.deliver(message)
+
+
+class DatabaseBackend:
+    """
+    Several workers: publish writes to event_log, and every worker polls
+    it for rows newer than the last one it saw.
+    """
+
+    def __init__(self, broker: EventBroker, poll_seconds: float = EVENTS_POLL_SECONDS):
+        self.broker = broker
+        self.poll_seconds = poll_seconds
+        self._last_id = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        with engine.connect() as conn:
+            self._last_id = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM event_log")).scalar()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="event-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
+
+    def publish(self, message: dict) -> None:
+        with engine.begin() as conn:
+            conn.execute(text("""
+                INSERT INTO event_log (channel, event, payload)
+                VALUES (:channel, :event, :payload)
+            """), {
+                "channel": message["channel"],
+                "event": message["event"],
+                "payload": json.dumps(message["data"], default=str),
+            })
+
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                with engine.connect() as conn:
+                    rows = conn.execute(text("""
+                        SELECT id, channel, event, payload
+                        FROM event_log
+                        WHERE id > :last
+                        ORDER BY id
+                        LIMIT 500
+                    """), {"last": self._last_id}).fetchall()
+            except Exception as e:
+                print(f"Event poll failed: {e}")
+                continue
+
+            for row in rows:
+                self._last_id = row.id
+                payload = json.loads(row.payload) if isinstance(row.payload, (str, bytes)) else row.payload
+                self.broker.deliver({"channel": row.channel, "event": row.event, "data": payload})
+
+
+broker = EventBroker()
+BACKENDS = {"memory": MemoryBackend, "database": DatabaseBackend}
+broker.set_backend(BACKENDS.get(EVENTS_BACKEND, MemoryBackend)(broker))
+
+
+def principal_channel(principal: dict) -> str:
+    """
+    The SSE channel of a staff principal. admins.id and staff.id overlap,
+    so accounts from the admins table get their own namespace.
+    """
+    if principal["staff_id"] is None:
+        return f"admin:{principal['id']}"
+    return f"staff:{principal['staff_id']}"
+
+
+def publish(channel: str, event: str, data: dict) -> None:
+    """
+    Publish after the write has committed. Never fails the caller: push is
+    a hint, clients still refetch the real data.
+    """
+    try:
+        broker.publish(channel, event, data)
+    except Exception as e:
+        print(f"Event publish failed ({channel} {event}): {e}")
+
+
+# ── SSE ENDPOINT ───────────────────────────────────────────────────────────
+def _channels_for(user: dict) -> List[str]:
+    role = user.get("role")
+    uid = int(user["sub"])
+    channels = ["all"]
+
+    db = SessionLocal()
+    try:
+        if role == "Learner":
+            grade = db.execute(text("SELECT grade FROM users WHERE id = :id"), {"id": uid}).scalar()
+            channels += [f"learner:{uid}", f"grade:{grade}"]
+        elif role == "Parent":
+            child = db.execute(text("""
+                SELECT u.id, u.grade FROM parents p JOIN users u ON u.id = p.user_id
+                WHERE p.id = :pid
+            """), {"pid": uid}).fetchone()
+            if child:
+                channels += [f"learner:{child.id}", f"grade:{child.grade}"]
+        elif role == "Admin":
+            # admins-table id; see principal_channel
+            channels.append(f"admin:{uid}")
+        else:
+            channels.append(f"staff:{uid}")
+    finally:
+        db.close()
+
+    return channels
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.get("/stream")
+async def event_stream(request: Request, token: Optional[str] = None):
+    """
+    Server-Sent Events for the signed-in user. EventSource can't send
+    headers, so the JWT may come as ?token= as well as Authorization.
+    """
+    auth = request.headers.get("authorization", "")
+    if not token and auth.lower().startswith("bearer "):
+        token = auth[7:]
+    if not token:
+        raise HTTPException(401, "Not authenticated")
+
+    user = decode_token(token)
+    channels = await run_in_threadpool(_channels_for, user)
+    queue = broker.subscribe(channels)
+
+    async def stream():
+        try:
+            yield _sse("ready", {"channels": channels, "at": datetime.now().isoformat()})
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                    yield _sse(message["event"], message["data"])
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+        finally:
+            broker.unsubscribe(channels, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,196 @@
+# app/exports.py
+import csv
+import io
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Iterable, Iterator, List, Sequence
+from xml.sax.saxutils import escape
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+from .database import read_session
+
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Rows are buffered up to roughly this many bytes before a chunk is sent
+CHUNK_SIZE = 64 * 1024
+
+
+def stream_query(sql, params: dict) -> Iterator[Any]:
+    """
+    Yield rows from a server-side cursor (stream_results) on a session of
+    its own, so the export keeps going after the request's session closes.
+    Reads from the replica when one is healthy.
+    sql is a string or a text() clause (e.g. with expanding bindparams).
+    """
+    statement = text(sql) if isinstance(sql, str) else sql
+    db = read_session()
+    try:
+        result = db.execute(statement.execution_options(stream_results=True, yield_per=1000), params)
+        for row in result:
+            yield row
+    finally:
+        db.close()
+
+
+def pivot_by_learner(
+    rows: Iterable[Any],
+    columns: Sequence[Any],
+    column_of: Callable[[Any], Any],
+    value_of: Callable[[Any], Any],
+    head_of: Callable[[Any], List[Any]],
+) -> Iterator[List[Any]]:
+    """
+    Turn long rows ordered by learner (one per learner/column pair) into one
+    wide row per learner. Only the current learner is held in memory.
+    """
+    position = {col: i for i, col in enumerate(columns)}
+    current_id = None
+    head: List[Any] = []
+    cells: List[Any] = []
+
+    for row in rows:
+        if row.learner_id != current_id:
+            if current_id is not None:
+                yield head + cells
+            current_id = row.learner_id
+            head = head_of(row)
+            cells = [None] * len(columns)
+        col = column_of(row)
+        if col in position:
+            cells[position[col]] = value_of(row)
+
+    if current_id is not None:
+        yield head + cells
+
+
+def _cell_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def csv_stream(header: Sequence[Any], rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+
+    for row in rows:
+        writer.writerow([_cell_text(v) for v in row])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    yield buffer.getvalue().encode("utf-8")
+
+
+# ── XLSX ───────────────────────────────────────────────────────────────────
+# Minimal SpreadsheetML package written straight into a zip stream. Strings
+# are inline (no shared-strings table), so nothing needs to be kept around
+# for the end of the file.
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+</Types>"""
+
+_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+</Relationships>"""
+
+_SHEET_START = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>"""
+
+_SHEET_END = "</sheetData></worksheet>"
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable file that collects what zipfile writes."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        self.size = 0
+        return data
+
+
+def _xlsx_cell(value: Any) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c t="n"><v>{value}</v></c>'
+    return f'<c t="inlineStr"><is><t>{escape(_cell_text(value))}</t></is></c>'
+
+
+def _xlsx_row(values: Sequence[Any]) -> str:
+    return "<row>" + "".join(_xlsx_cell(v) for v in values) + "</row>"
+
+
+def xlsx_stream(header: Sequence[Any], rows: Iterable[Sequence[Any]], sheet_name: str = "Sheet1") -> Iterator[bytes]:
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _ROOT_RELS)
+        zf.writestr("xl/workbook.xml", _WORKBOOK.format(name=escape(sheet_name[:31])))
+        zf.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write((_SHEET_START + _xlsx_row(header)).encode("utf-8"))
+            for row in rows:
+                sheet.write(_xlsx_row(row).encode("utf-8"))
+                if sink.size >= CHUNK_SIZE:
+                    yield sink.drain()
+            sheet.write(_SHEET_END.encode("utf-8"))
+
+    yield sink.drain()
+
+
+def export_response(fmt: str, filename: str, header: Sequence[Any], rows: Iterable[Sequence[Any]]) -> StreamingResponse:
+    """
+    Stream rows as CSV or XLSX. filename is given without extension.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(422, "Format must be csv or xlsx")
+
+    body = csv_stream(header, rows) if fmt == "csv" else xlsx_stream(header, rows, filename)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
@@ -0,0 +1,218 @@
+# app/idempotency.py
+# Idempotency-Key support for write requests. A client that retries a
+# submit with the same key gets the first response replayed instead of a
+# second row; a duplicate that arrives while the first is still running
+# waits for it. Keys live in idempotency_keys and expire after
+# IDEMPOTENCY_TTL_HOURS.
+import asyncio
+import hashlib
+import time
+import zlib
+from typing import Optional, Tuple
+import orjson
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+from .config import (
+    IDEMPOTENCY_TTL_HOURS, IDEMPOTENCY_LOCK_SECONDS, IDEMPOTENCY_WAIT_SECONDS, IDEMPOTENCY_MAX_RESPONSE,
+)
+from .database import engine
+from .metrics import idempotency_requests
+from .replica import user_key
+
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+MAX_KEY_LENGTH = 255
+POLL_SECONDS = 0.2
+
+
+def _key_hash(authorization: str, key: str) -> bytes:
+    # Scoped per caller, so two users can't collide on (or probe) a key
+    return hashlib.sha256(f"{user_key(authorization) or ''}\0{key}".encode()).digest()
+
+
+def _fingerprint(method: str, path: str, query: bytes, content_type: str, body: bytes) -> bytes:
+    if content_type.startswith("multipart/form-data"):
+        # The boundary is random per send, even for the same form
+        _, _, boundary = content_type.partition("boundary=")
+        if boundary:
+            body = body.replace(boundary.strip('"').encode("latin-1"), b"")
+    digest = hashlib.sha256(f"{method}\0{path}\0".encode())
+    digest.update(query)
+    digest.update(b"\0")
+    digest.update(body)
+    return digest.digest()
+
+
+# ── STORE ──────────────────────────────────────────────────────────────────
+def _claim(key_hash: bytes, fingerprint: bytes) -> Tuple[str, Optional[tuple]]:
+    """
+    One attempt at owning the key. Returns ("owner", None), ("done", row),
+    ("pending", None) or ("mismatch", None). An unfinished claim older
+    than IDEMPOTENCY_LOCK_SECONDS (its worker died) is taken over.
+    """
+    params = {"k": key_hash, "fp": fingerprint, "lock": IDEMPOTENCY_LOCK_SECONDS,
+              "ttl": int(IDEMPOTENCY_TTL_HOURS * 3600)}
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM idempotency_keys WHERE key_hash = :k AND expires_at < NOW()"), params)
+        inserted = conn.execute(text("""
+            INSERT IGNORE INTO idempotency_keys (key_hash, fingerprint, locked_until, expires_at)
+            VALUES (:k, :fp, NOW() + INTERVAL :lock SECOND, NOW() + INTERVAL :ttl SECOND)
+        """), params).rowcount
+        if inserted:
+            return "owner", None
+
+        row = conn.execute(text("""
+            SELECT fingerprint, status, content_type, body, locked_until < NOW() AS stale
+            FROM idempotency_keys WHERE key_hash = :k
+        """), params).fetchone()
+        if row is None:
+            return "pending", None  # expired and deleted between statements; try again
+        if bytes(row.fingerprint) != fingerprint:
+            return "mismatch", None
+        if row.status is not None:
+            return "done", (row.status, row.content_type, zlib.decompress(row.body))
+        if row.stale:
+            taken = conn.execute(text("""
+                UPDATE idempotency_keys SET locked_until = NOW() + INTERVAL :lock SECOND
+                WHERE key_hash = :k AND status IS NULL AND locked_until < NOW()
+            """), params).rowcount
+            if taken:
+                return "owner", None
+        return "pending", None
+
+
+def _store(key_hash: bytes, status: int, content_type: str, body: bytes) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE idempotency_keys
+            SET status = :status, content_type = :ctype, body = :body
+            WHERE key_hash = :k
+        """), {"k": key_hash, "status": status, "ctype": content_type, "body": zlib.compress(body)})
+
+
+def _release(key_hash: bytes) -> None:
+    """Forget an unfinished key so the client's retry runs again."""
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM idempotency_keys WHERE key_hash = :k AND status IS NULL"),
+                     {"k": key_hash})
+
+
+def prune_idempotency_keys(db) -> int:
+    return db.execute(text("DELETE FROM idempotency_keys WHERE expires_at < NOW()")).rowcount
+
+
+# ── MIDDLEWARE ─────────────────────────────────────────────────────────────
+async def _send_json(send, status: int, detail: str, extra_headers=()) -> None:
+    body = orjson.dumps({"detail": detail})
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        *extra_headers,
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """
+    For writes carrying an Idempotency-Key header: the first request with
+    a key runs and its response (status, content type, body; 5xx excepted)
+    is stored; repeats with the same key and body get it replayed with
+    "Idempotent-Replayed: true"; a repeat with a different body is a 422.
+    Requests without the header are untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+            return await self.app(scope, receive, send)
+
+        headers = {k: v for k, v in scope["headers"]}
+        key = headers.get(b"idempotency-key", b"").decode("latin-1").strip()
+        if not key:
+            return await self.app(scope, receive, send)
+        if len(key) > MAX_KEY_LENGTH:
+            return await _send_json(send, 400, "Idempotency-Key is too long")
+
+        # The body is part of the fingerprint, so read it all up front
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        key_hash = _key_hash(authorization, key)
+        fingerprint = _fingerprint(scope["method"], scope["path"], scope.get("query_string", b""),
+                                   headers.get(b"content-type", b"").decode("latin-1"), body)
+
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            state, stored = await run_in_threadpool(_claim, key_hash, fingerprint)
+            if state == "owner":
+                break
+            if state == "done":
+                idempotency_requests.inc("replayed")
+                status, content_type, payload = stored
+                await send({"type": "http.response.start", "status": status, "headers": [
+                    (b"content-type", (content_type or "application/json").encode("latin-1")),
+                    (b"content-length", str(len(payload)).encode()),
+                    (b"idempotent-replayed", b"true"),
+                ]})
+                await send({"type": "http.response.body", "body": payload})
+                return
+            if state == "mismatch":
+                idempotency_requests.inc("mismatch")
+                return await _send_json(send, 422, "Idempotency-Key was already used for a different request")
+            if time.monotonic() >= deadline:
+                idempotency_requests.inc("in_progress")
+                return await _send_json(send, 409, "A request with this Idempotency-Key is still in progress",
+                                        [(b"retry-after", b"1")])
+            await asyncio.sleep(POLL_SECONDS)
+
+        idempotency_requests.inc("executed")
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status, content_type, out, size = 500, "", [], 0
+
+        async def capture_send(message):
+            nonlocal status, content_type, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for k, v in message.get("headers", []):
+                    if k.lower() == b"content-type":
+                        content_type = v.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if size <= IDEMPOTENCY_MAX_RESPONSE:
+                    out.append(chunk)
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await run_in_threadpool(_release, key_hash)
+            raise
+
+        # Server errors and oversized bodies aren't kept: the retry runs again
+        if status >= 500 or size > IDEMPOTENCY_MAX_RESPONSE:
+            await run_in_threadpool(_release, key_hash)
+        else:
+            try:
+                await run_in_threadpool(_store, key_hash, status, content_type, b"".join(out))
+            except Exception as e:
+                # The response already went out; a retry will just run again
+                print(f"Idempotency store failed: {e}")
+                await run_in_threadpool(_release, key_hash)
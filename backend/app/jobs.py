@@ -0,0 +1,539 @@
+# app/jobs.py
+"""
+Background jobs: a persistent queue (jobs table) drained by every app
+worker through a bounded thread pool, plus interval schedules that only
+the elected leader enqueues.
+
+    python -m app.jobs list
+    python -m app.jobs run early-warnings --payload '{"full": true}'
+    python -m app.jobs enqueue payroll-rebuild --payload '{"year": 2026}'
+    python -m app.jobs worker
+"""
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Callable, Dict, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import text, bindparam
+from .config import JOBS_MAX_WORKERS, JOBS_POLL_SECONDS
+from .database import engine, SessionLocal
+from .metrics import job_duration
+from .cache import cache
+from .early_warning import run_early_warnings
+from .payroll import rebuild_payroll
+from .roster import refresh_class_roster
+from .outbox import deliver_pending
+from .upload_gc import sweep_uploads
+from .attendance_rollup import rebuild_attendance_rollups
+from .idempotency import prune_idempotency_keys
+from .admissions import apply_admission_run
+from .application_scoring import score_grade
+from .report_cards import generate_report_cards
+from utils.send_brevo_email import log_message
+
+
+LEADER_LOCK = "nkateko_job_scheduler"
+# Retry backoff: 30s, 1m, 2m ... capped at 30m
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 1800
+# Runners renew claimed_at on their running jobs every HEARTBEAT
+# seconds; a 'Running' row not renewed for STALE minutes belonged to a
+# worker that died
+HEARTBEAT_SECONDS = 60
+STALE_CLAIM_MINUTES = 5
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ── REGISTRY ───────────────────────────────────────────────────────────────
+@dataclass
+class JobSpec:
+    name: str
+    fn: Callable[..., Optional[dict]]
+    max_attempts: int = 3
+    every: Optional[int] = None  # seconds; None = only on demand
+    description: str = ""
+
+
+JOBS: Dict[str, JobSpec] = {}
+
+
+def job(name: str, max_attempts: int = 3, every: Optional[int] = None):
+    """
+    Register fn(db, **payload) as a job. The runner gives it its own
+    session and commits if it returns normally; the return value (a dict)
+    is stored as the job's result.
+    """
+    def decorator(fn):
+        doc = (fn.__doc__ or "").strip().splitlines()
+        JOBS[name] = JobSpec(name, fn, max_attempts, every, doc[0] if doc else "")
+        return fn
+    return decorator
+
+
+def enqueue_job(db: Session, name: str, payload: Optional[dict] = None, delay_seconds: int = 0) -> int:
+    """
+    Queue a registered job. Caller commits. Returns the job id.
+    """
+    spec = JOBS.get(name)
+    if spec is None:
+        raise KeyError(f"Unknown job: {name}")
+    db.execute(text("""
+        INSERT INTO jobs (name, payload, max_attempts, run_at)
+        VALUES (:name, :payload, :max, NOW() + INTERVAL :delay SECOND)
+    """), {"name": name, "payload": json.dumps(payload or {}), "max": spec.max_attempts, "delay": delay_seconds})
+    return db.execute(text("SELECT LAST_INSERT_ID()")).fetchone()[0]
+
+
+# ── EXECUTION ──────────────────────────────────────────────────────────────
+def run_job(name: str, payload: Optional[dict] = None) -> dict:
+    """Run a job inline in this process (CLI / tests). Raises on failure."""
+    spec = JOBS[name]
+    db = SessionLocal()
+    try:
+        result = spec.fn(db, **(payload or {})) or {}
+        db.commit()
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _claim(limit: int) -> list:
+    with engine.begin() as conn:
+        rows = conn.execute(text(f"""
+            SELECT id, name, payload, attempts, max_attempts
+            FROM jobs
+            WHERE (status = 'Pending' AND run_at <= NOW())
+               OR (status = 'Running' AND claimed_at < NOW() - INTERVAL {STALE_CLAIM_MINUTES} MINUTE)
+            ORDER BY run_at, id
+            LIMIT :n
+            FOR UPDATE SKIP LOCKED
+        """), {"n": limit}).fetchall()
+
+        if rows:
+            conn.execute(text("""
+                UPDATE jobs
+                SET status = 'Running', claimed_at = NOW(), claimed_by = :worker,
+                    attempts = attempts + 1
+                WHERE id = :id
+            """), [{"id": row.id, "worker": WORKER_ID} for row in rows])
+
+    return rows
+
+
+def _heartbeat(job_ids) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE jobs SET claimed_at = NOW()
+            WHERE id IN :ids AND status = 'Running' AND claimed_by = :worker
+        """).bindparams(bindparam("ids", expanding=True)), {"ids": sorted(job_ids), "worker": WORKER_ID})
+
+
+def _execute(row) -> None:
+    payload = json.loads(row.payload) if isinstance(row.payload, str) else (row.payload or {})
+    attempts = row.attempts + 1
+    started = time.perf_counter()
+    error = None
+    result = None
+
+    if row.name not in JOBS:
+        error = f"Unknown job: {row.name}"
+    else:
+        try:
+            result = run_job(row.name, payload)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+    elapsed = time.perf_counter() - started
+    ms = int(elapsed * 1000)
+
+    with engine.begin() as conn:
+        if error is None:
+            status = "Done"
+            conn.execute(text("""
+                UPDATE jobs
+                SET status = 'Done', finished_at = NOW(), duration_ms = :ms,
+                    result = :result, last_error = NULL
+                WHERE id = :id
+            """), {"id": row.id, "ms": ms, "result": json.dumps(result, default=str)})
+        elif attempts >= row.max_attempts or row.name not in JOBS:
+            status = "Failed"
+            conn.execute(text("""
+                UPDATE jobs
+                SET status = 'Failed', finished_at = NOW(), duration_ms = :ms, last_error = :err
+                WHERE id = :id
+            """), {"id": row.id, "ms": ms, "err": error[:2000]})
+        else:
+            status = "Retry"
+            delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+            conn.execute(text("""
+                UPDATE jobs
+                SET status = 'Pending', duration_ms = :ms, last_error = :err,
+                    run_at = NOW() + INTERVAL :delay SECOND
+                WHERE id = :id
+            """), {"id": row.id, "ms": ms, "err": error[:2000], "delay": delay})
+
+    job_duration.observe(elapsed, row.name, status)
+    line = f"job {row.name}#{row.id} {status} in {ms} ms (attempt {attempts}/{row.max_attempts})"
+    log_message(line if error is None else f"ERROR {line} | {error}")
+
+
+# ── SCHEDULER ──────────────────────────────────────────────────────────────
+def _sync_schedules(conn) -> None:
+    """Make job_schedules match the registry's intervals."""
+    for spec in JOBS.values():
+        if spec.every:
+            conn.execute(text("""
+                INSERT INTO job_schedules (name, interval_seconds, next_run_at)
+                VALUES (:name, :every, NOW())
+                ON DUPLICATE KEY UPDATE interval_seconds = VALUES(interval_seconds)
+            """), {"name": spec.name, "every": spec.every})
+
+
+def _enqueue_due(conn) -> int:
+    due = conn.execute(text("""
+        SELECT name FROM job_schedules WHERE next_run_at <= NOW()
+    """)).fetchall()
+    count = 0
+    for row in due:
+        spec = JOBS.get(row.name)
+        if spec is None or not spec.every:
+            continue
+        # Don't stack runs if the previous one is still queued or running
+        busy = conn.execute(text("""
+            SELECT 1 FROM jobs WHERE name = :name AND status IN ('Pending', 'Running') LIMIT 1
+        """), {"name": spec.name}).fetchone()
+        if not busy:
+            conn.execute(text("""
+                INSERT INTO jobs (name, payload, max_attempts) VALUES (:name, '{}', :max)
+            """), {"name": spec.name, "max": spec.max_attempts})
+            count += 1
+        conn.execute(text("""
+            UPDATE job_schedules
+            SET next_run_at = NOW() + INTERVAL interval_seconds SECOND, last_enqueued_at = NOW()
+            WHERE name = :name
+        """), {"name": spec.name})
+    conn.commit()
+    return count
+
+
+class JobRunner:
+    """
+    Background thread started from the app lifespan. Every worker claims
+    due jobs (SKIP LOCKED) into a bounded pool; the one holding the MySQL
+    GET_LOCK also enqueues scheduled jobs. The lock lives on a dedicated
+    connection, so a dead worker releases leadership with its connection.
+    """
+
+    def __init__(self, max_workers: int = JOBS_MAX_WORKERS, poll_seconds: float = JOBS_POLL_SECONDS):
+        self.max_workers = max_workers
+        self.poll_seconds = poll_seconds
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._leader_conn = None
+        self._running: set = set()
+        self._running_lock = threading.Lock()
+        self._beat = 0.0
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader_conn is not None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        self._thread = threading.Thread(target=self._run, name="job-runner", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if self._pool:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+        self._release_leadership()
+
+    def wake(self):
+        self._wake.set()
+
+    def _elect(self) -> None:
+        if self._leader_conn is not None:
+            try:
+                mine = self._leader_conn.execute(
+                    text("SELECT IS_USED_LOCK(:l) = CONNECTION_ID()"), {"l": LEADER_LOCK}).scalar()
+                if mine:
+                    return
+            except Exception:
+                pass
+            self._release_leadership()
+
+        conn = engine.connect()
+        try:
+            if conn.execute(text("SELECT GET_LOCK(:l, 0)"), {"l": LEADER_LOCK}).scalar() == 1:
+                self._leader_conn = conn
+                _sync_schedules(conn)
+                conn.commit()
+                log_message(f"job scheduler leader: {WORKER_ID}")
+                return
+        except Exception as e:
+            log_message(f"ERROR job leader election | {e}")
+        conn.close()
+
+    def _release_leadership(self) -> None:
+        conn, self._leader_conn = self._leader_conn, None
+        if conn is None:
+            return
+        try:
+            conn.execute(text("SELECT RELEASE_LOCK(:l)"), {"l": LEADER_LOCK})
+        except Exception:
+            pass
+        conn.close()
+
+    def _run_one(self, row) -> None:
+        try:
+            _execute(row)
+        finally:
+            with self._running_lock:
+                self._running.discard(row.id)
+            self._slots.release()
+            self._wake.set()
+
+    def _renew_claims(self) -> None:
+        """Keep long jobs (report cards, rollup rebuilds) from looking abandoned."""
+        now = time.monotonic()
+        if now - self._beat < HEARTBEAT_SECONDS:
+            return
+        with self._running_lock:
+            running = set(self._running)
+        if running:
+            try:
+                _heartbeat(running)
+            except Exception as e:
+                log_message(f"ERROR job heartbeat | {e}")
+                return
+        self._beat = now
+
+    def _tick(self) -> int:
+        self._elect()
+        if self._leader_conn is not None:
+            _enqueue_due(self._leader_conn)
+        self._renew_claims()
+
+        free = 0
+        while self._slots.acquire(blocking=False):
+            free += 1
+        if not free:
+            return 0
+
+        rows = []
+        try:
+            rows = _claim(free)
+        finally:
+            # Slots the claim didn't fill (all of them if it raised) go back
+            for _ in range(free - len(rows)):
+                self._slots.release()
+        for row in rows:
+            with self._running_lock:
+                self._running.add(row.id)
+            self._pool.submit(self._run_one, row)
+        return len(rows)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                claimed = self._tick()
+            except Exception as e:
+                log_message(f"ERROR job runner | {str(e)}")
+                self._release_leadership()
+                claimed = 0
+
+            if not claimed:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+
+job_runner = JobRunner()
+
+
+# ── JOBS ───────────────────────────────────────────────────────────────────
+@job("early-warnings", every=3600)
+def early_warnings_job(db: Session, full: bool = False, grades=None):
+    """Score learners whose data changed and update rule-based warnings."""
+    return run_early_warnings(db, full=full, grades=grades)
+
+
+@job("early-warnings-full", every=86400)
+def early_warnings_full_job(db: Session):
+    """Rescore every learner (time windows slide even without new data)."""
+    return run_early_warnings(db, full=True)
+
+
+@job("assessment-averages")
+def assessment_averages_job(db: Session, assessment_id: Optional[int] = None):
+    """Recompute assessments.average from assessment_marks."""
+    where = "WHERE a.id = :aid" if assessment_id is not None else ""
+    result = db.execute(text(f"""
+        UPDATE assessments a
+        LEFT JOIN (
+            SELECT assessment_id, AVG(percentage) AS avg_mark
+            FROM assessment_marks
+            GROUP BY assessment_id
+        ) m ON m.assessment_id = a.id
+        SET a.average = COALESCE(m.avg_mark, 0)
+        {where}
+    """), {"aid": assessment_id})
+    return {"assessments": result.rowcount}
+
+
+@job("payroll-rebuild")
+def payroll_rebuild_job(db: Session, year: Optional[int] = None, month: Optional[int] = None):
+    """Recompute staff_payroll_monthly for a year (or month)."""
+    return {"rows": rebuild_payroll(db, year or datetime.now().year, month)}
+
+
+@job("attendance-rollup-rebuild")
+def attendance_rollup_rebuild_job(db: Session, date_from: Optional[str] = None, date_to: Optional[str] = None):
+    """Recompute attendance rollups (default: the current year)."""
+    today = datetime.now().date()
+    start = date.fromisoformat(date_from) if date_from else today.replace(month=1, day=1)
+    end = date.fromisoformat(date_to) if date_to else today
+    return rebuild_attendance_rollups(db, start, end)
+
+
+@job("roster-refresh")
+def roster_refresh_job(db: Session, grades=None):
+    """Rebuild class_roster from applications."""
+    if not grades:
+        grades = [row.grade for row in db.execute(text("SELECT DISTINCT grade FROM applications")).fetchall()]
+    refresh_class_roster(db, grades)
+    db.commit()
+    cache.invalidate(*(f"grade:{g}" for g in grades))
+    return {"grades": sorted(int(g) for g in grades)}
+
+
+@job("admissions-decide")
+def admissions_decide_job(db: Session, run_id: int):
+    """Apply a staged bulk admissions run (see app/admissions.py)."""
+    return apply_admission_run(db, run_id)
+
+
+@job("application-scores")
+def application_scores_job(db: Session, grade: Optional[int] = None, year: Optional[int] = None):
+    """Rescore and rank applications for a grade (default: every grade this year)."""
+    year = year or datetime.now().year
+    if grade is not None:
+        return score_grade(db, year, grade)
+    grades = [row.grade for row in db.execute(text(
+        "SELECT DISTINCT grade FROM applications WHERE year = :year"), {"year": year}).fetchall()]
+    return {"grades": [score_grade(db, year, g) for g in grades]}
+
+
+@job("report-cards", max_attempts=1)
+def report_cards_job(db: Session, run_id: int):
+    """Render a grade's term report cards (see app/report_cards.py)."""
+    run = db.execute(text(
+        "SELECT grade, year, term, channel FROM report_card_runs WHERE id = :id"), {"id": run_id}).fetchone()
+    if not run:
+        return {"skipped": "run not found"}
+    return generate_report_cards(db, run.grade, run.year, run.term, run_id=run_id, channel=run.channel)
+
+
+@job("outbox-deliver", max_attempts=1)
+def outbox_deliver_job(db: Session, limit: int = 500):
+    """Send one batch of queued emails now."""
+    return deliver_pending(limit)
+
+
+@job("event-log-prune", every=3600)
+def event_log_prune_job(db: Session, keep_hours: int = 24):
+    """Delete SSE event_log rows older than keep_hours."""
+    result = db.execute(text("""
+        DELETE FROM event_log WHERE created_at < NOW() - INTERVAL :h HOUR
+    """), {"h": keep_hours})
+    return {"deleted": result.rowcount}
+
+
+@job("idempotency-prune", every=3600)
+def idempotency_prune_job(db: Session):
+    """Delete expired Idempotency-Key responses."""
+    return {"deleted": prune_idempotency_keys(db)}
+
+
+@job("upload-gc", every=86400, max_attempts=1)
+def upload_gc_job(db: Session, dry_run: bool = False, delete: bool = False, max_seconds: float = 300):
+    """Quarantine upload files no table references any more."""
+    return sweep_uploads(dry_run=dry_run, delete=delete, max_seconds=max_seconds)
+
+
+@job("jobs-prune", every=86400)
+def jobs_prune_job(db: Session, keep_days: int = 30):
+    """Delete finished job rows older than keep_days."""
+    result = db.execute(text("""
+        DELETE FROM jobs
+        WHERE status IN ('Done', 'Failed') AND finished_at < NOW() - INTERVAL :d DAY
+    """), {"d": keep_days})
+    return {"deleted": result.rowcount}
+
+
+# ── CLI ────────────────────────────────────────────────────────────────────
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.jobs", description="Run or queue background jobs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="show registered jobs")
+    for command, help_text in (("run", "run a job now, in this process"), ("enqueue", "queue a job for the workers")):
+        p = sub.add_parser(command, help=help_text)
+        p.add_argument("name", choices=sorted(JOBS))
+        p.add_argument("--payload", default="{}", help="JSON keyword arguments")
+        if command == "enqueue":
+            p.add_argument("--delay", type=int, default=0, help="seconds before it is due")
+    sub.add_parser("worker", help="run the job runner in the foreground")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for spec in sorted(JOBS.values(), key=lambda s: s.name):
+            every = f"every {spec.every}s" if spec.every else "on demand"
+            print(f"{spec.name:<22} {every:<14} {spec.description}")
+        return
+
+    if args.command == "worker":
+        job_runner.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            job_runner.stop()
+        return
+
+    payload = json.loads(args.payload)
+    if args.command == "run":
+        started = time.perf_counter()
+        result = run_job(args.name, payload)
+        print(json.dumps(result, default=str, indent=2))
+        print(f"{args.name} finished in {time.perf_counter() - started:.2f}s")
+    else:
+        db = SessionLocal()
+        try:
+            job_id = enqueue_job(db, args.name, payload, args.delay)
+            db.commit()
+        finally:
+            db.close()
+        print(f"Queued {args.name} as job {job_id}")
+
+
+if __name__ == "__main__":
+    main()
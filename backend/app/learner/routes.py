@@ -7,11 +7,16 @@ from jose import JWTError, jwt
 from ..config import SECRET_KEY, ALGORITHM, UPLOAD_DIR, BASE_URL
 from ..database import get_db
 from ..auth.dependencies import oauth2_scheme, get_current_user
+from ..versioning import bump_versions
+from ..responses import FastJSONResponse
+from ..cache import cache, cached
+from ..attendance_rollup import learner_months
+from ..application_scoring import score_applications
 import os
 import shutil
 from datetime import datetime
 from pydantic import BaseModel, Field
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import json
 import random
 import string
@@ -41,8 +46,9 @@ def get_learner_grade_from_db(
 
     return int(result)
 
-@router.get("/profile")
-def get_profile(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+# Not cached: /profile is ETag'd from data_versions, and a cached body
+# could outlive a change made by another worker under the new ETag
+def load_profile(db: Session, user_id: int) -> dict | None:
     query = text("""
         SELECT 
             full_names AS name,
@@ -57,13 +63,18 @@ def get_profile(db: Session = Depends(get_db), current_user: dict = Depends(get_
         FROM users
         WHERE id = :id
     """)
-    result = db.execute(query, {"id": current_user["sub"]}).fetchone()
-    
+    result = db.execute(query, {"id": user_id}).fetchone()
+    return dict(result._mapping) if result else None
+
+
+@router.get("/profile")
+def get_profile(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    result = load_profile(db, int(current_user["sub"]))
+
     if not result:
         raise HTTPException(status_code=404, detail="Learner profile not found")
-    
-    # # Convert row to dict using _mapping
-    return dict(result._mapping)
+
+    return FastJSONResponse(result)
 
 @router.get("/assessments")
 def get_assessments(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
@@ -80,7 +91,7 @@ def get_assessments(db: Session = Depends(get_db), current_user: dict = Depends(
     """)
     results = db.execute(query, {"id": current_user["sub"]}).fetchall()
     # Use _mapping for each row
-    return [dict(row._mapping) for row in results]
+    return FastJSONResponse(results)
 
 @router.get("/attendance")
 def get_attendance(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
@@ -95,7 +106,15 @@ def get_attendance(db: Session = Depends(get_db), current_user: dict = Depends(g
         ORDER BY class_date DESC
     """)
     results = db.execute(query, {"id": current_user["sub"]}).fetchall()
-    return [dict(row._mapping) for row in results]
+    return FastJSONResponse(results)
+
+@router.get("/attendance/summary")
+def get_attendance_summary(
+    year: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    return FastJSONResponse(learner_months(db, int(current_user["sub"]), year or datetime.now().year))
 
 @router.get("/notifications")
 def get_notifications(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
@@ -131,7 +150,7 @@ def get_notifications(db: Session = Depends(get_db), current_user: dict = Depend
     all_results.sort(key=lambda x: x.created_at, reverse=True)
 
     # Convert to dicts
-    return [dict(row._mapping) for row in all_results]
+    return FastJSONResponse(all_results)
 
 @router.post("/notifications/{notification_id}/read")
 def mark_notification_read(
@@ -174,7 +193,7 @@ def get_applications(db: Session = Depends(get_db), current_user: dict = Depends
         ORDER BY created_at DESC
     """)
     results = db.execute(query, {"id": current_user["sub"]}).fetchall()
-    return [dict(row._mapping) for row in results]
+    return FastJSONResponse(results)
 
 
     # ------------------- NEW: Check upload status -------------------
@@ -360,10 +379,20 @@ def create_application(
             "grade": grade,
             "data": data_json
         })
+        application_id = db.execute(text("SELECT LAST_INSERT_ID()")).scalar()
         db.commit()
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    cache.invalidate(f"learner:{user_id}")
+
+    # Ranking is for admissions staff; never fail the submission over it
+    try:
+        score_applications(db, [application_id])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Scoring application {app_id} failed: {e}")
 
     # Format submitted time like your PHP
     submitted_at = datetime.now().strftime("%d %B %Y at %H:%M")
@@ -376,6 +405,7 @@ def create_application(
     }
 
 
+@cached("learner-subjects", ttl=300, tags=lambda user_id: [f"learner:{user_id}"])
 def get_learner_subjects(db: Session, user_id: int) -> dict:
     row = db.execute(
         text("""
@@ -394,6 +424,7 @@ def get_learner_subjects(db: Session, user_id: int) -> dict:
     return data.get("subjects", {})
 
 
+# Not cached: read by the ETag'd term-marks GET and by the writes it gates
 def is_term_open(db: Session, term: int) -> bool:
     row = db.execute(
         text("SELECT is_open FROM term_settings WHERE term = :t"),
@@ -464,6 +495,29 @@ def get_term_marks(
     }
 
 
+@router.get("/report-cards")
+def get_report_cards(
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """The learner's term report cards, newest first."""
+    if current_user["role"] != "Learner":
+        raise HTTPException(403, "Only learners can view report cards")
+
+    rows = db.execute(text("""
+        SELECT file_type, file_path, uploaded_at
+        FROM learner_documents
+        WHERE user_id = :uid AND file_type LIKE 'report\\_card\\_%'
+        ORDER BY file_type DESC
+    """), {"uid": int(current_user["sub"])}).fetchall()
+
+    return [{
+        "type": row.file_type,
+        "url": f"{BASE_URL}/uploads/learner_documents/{row.file_path}",
+        "generated_at": row.uploaded_at,
+    } for row in rows]
+
+
 @router.post("/term-marks/{term}")
 async def update_term_marks(
     term: int,
@@ -518,7 +572,9 @@ async def update_term_marks(
         "report_path": report_path
     })
 
+    bump_versions(db, "term-marks", [user_id])
     db.commit()
+    cache.invalidate(f"learner:{user_id}")
 
     return {
         "success": True,
@@ -579,7 +635,9 @@ async def replace_term_report(
         "report_path": new_path
     })
 
+    bump_versions(db, "term-marks", [user_id])
     db.commit()
+    cache.invalidate(f"learner:{user_id}")
 
     # Return full public URL
     base_url = BASE_URL  # ← use your config BASE_URL
@@ -600,6 +658,7 @@ class ReviewCreate(BaseModel):
     comment: str | None = None
 
 # Check if reviews are open (hardcoded for now, later from DB)
+@cached("reviews-open", ttl=60, tags=lambda: ["review-settings"])
 def are_reviews_open(db: Session) -> bool:
     row = db.execute(text("SELECT is_open FROM review_settings WHERE id = 1")).fetchone()
     return row.is_open if row else True  # default open
@@ -612,6 +671,14 @@ def get_review_options(
     if current_user["role"] != "Learner":
         raise HTTPException(403, "Only learners can access review options")
 
+    return {
+        "reviews_open": are_reviews_open(db),
+        "teachers": get_review_teachers(db)
+    }
+
+
+@cached("review-teachers", ttl=300, tags=lambda: ["staff"])
+def get_review_teachers(db: Session) -> list:
     # Get active teachers/tutors (role = 'Teacher' or 'Tutor')
     query = text("""
         SELECT 
@@ -643,10 +710,7 @@ def get_review_options(
             "subjects": subjects_list
         })
 
-    return {
-        "reviews_open": are_reviews_open(db),
-        "teachers": teachers
-    }
+    return teachers
 
 @router.post("/teacher-reviews")
 def submit_review(
@@ -814,7 +878,9 @@ def acknowledge_warning(
         WHERE id = :wid
     """), {"wid": warning_id})
 
+    bump_versions(db, "warnings", [learner_id])
     db.commit()
+    cache.invalidate(f"learner:{learner_id}")
 
     return {"success": True, "message": "Warning acknowledged"}
 
@@ -0,0 +1,344 @@
+# app/learner_search.py
+"""
+In-memory learner search for staff: prefix matching on every word of the
+name, surname, school and email plus the Bokamoso number, with a trigram
+fallback for typos and swapped letters ("thabo mokoen", "BOK00012",
+"gmail", "thbao").
+
+Each worker keeps its own index. It is built on first use and then kept
+current lazily: at most every SEARCH_INDEX_REFRESH_SECONDS a search pulls
+users changed since the last pull (users.updated_at), and a row count
+mismatch (deleted users) or SEARCH_INDEX_FULL_SECONDS triggers a rebuild.
+"""
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy import text
+from .config import SEARCH_INDEX_REFRESH_SECONDS, SEARCH_INDEX_FULL_SECONDS
+from .database import engine
+
+
+MAX_RESULTS = 50
+FUZZY_MIN_LENGTH = 4       # shorter terms only prefix-match
+FUZZY_MIN_SIMILARITY = 0.35  # trigram Dice coefficient
+TRANSPOSED_SIMILARITY = 0.75  # one pair of adjacent letters swapped; trigrams undervalue it
+# Per-term scores; a learner must match every term of the query
+EXACT, PREFIX, FUZZY = 3.0, 2.0, 1.0
+NUMBER_BONUS = 5.0          # the query is a Bokamoso number
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+LEARNERS = """
+    SELECT u.id, u.bokamoso_number, u.full_names, u.surname, u.email, u.school, u.grade,
+           COALESCE(r.name = 'Learner', 0) AS is_learner
+    FROM users u
+    LEFT JOIN roles r ON r.id = u.role_id
+"""
+
+
+def normalize(value: Optional[str]) -> str:
+    """Lowercase ASCII: accents dropped so "Zoë" finds "zoe"."""
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKD", value)
+    return value.encode("ascii", "ignore").decode().lower()
+
+
+def tokens(value: Optional[str]) -> List[str]:
+    return _WORD.findall(normalize(value))
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def transposed(a: str, b: str) -> bool:
+    """a is b with one pair of adjacent letters swapped ("thbao"/"thabo")."""
+    if len(a) != len(b) or a == b:
+        return False
+    diff = [i for i in range(len(a)) if a[i] != b[i]]
+    return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+
+
+@dataclass
+class LearnerDoc:
+    id: int
+    bokamoso_number: str
+    full_names: str
+    surname: Optional[str]
+    email: Optional[str]
+    school: Optional[str]
+    grade: Optional[int]
+    sort_key: str = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.sort_key = normalize(self.full_names)
+
+    def terms(self) -> Set[str]:
+        words = set()
+        for value in (self.full_names, self.surname, self.school, self.email):
+            words.update(tokens(value))
+        number = normalize(self.bokamoso_number).replace(" ", "")
+        if number:
+            words.add(number)
+        if self.email:
+            words.add(normalize(self.email))
+        return words
+
+    def public(self) -> dict:
+        return {
+            "id": self.id,
+            "bokamoso_number": self.bokamoso_number,
+            "full_names": self.full_names,
+            "surname": self.surname,
+            "email": self.email,
+            "school": self.school,
+            "grade": self.grade,
+        }
+
+
+def _doc(row) -> LearnerDoc:
+    return LearnerDoc(row.id, row.bokamoso_number, row.full_names, row.surname,
+                      row.email, row.school, row.grade)
+
+
+class LearnerIndex:
+    """
+    docs by id; a sorted vocabulary for prefix lookups (bisect); term ->
+    learner ids; trigram -> terms for fuzzy matches. Writers hold the
+    lock; searches copy nothing and only read under it.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._clear()
+        self._built = 0.0
+        self._checked = 0.0
+        self._watermark: Optional[datetime] = None
+
+    def _clear(self) -> None:
+        self.docs: Dict[int, LearnerDoc] = {}
+        self.vocabulary: List[str] = []
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+        self.grams: Dict[str, Set[str]] = defaultdict(set)
+        self.doc_terms: Dict[int, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # ── maintenance ────────────────────────────────────────────────────────
+    def _add_term(self, term: str, learner_id: int) -> None:
+        ids = self.postings[term]
+        if not ids:
+            bisect.insort(self.vocabulary, term)
+            for gram in trigrams(term):
+                self.grams[gram].add(term)
+        ids.add(learner_id)
+
+    def _drop_term(self, term: str, learner_id: int) -> None:
+        ids = self.postings.get(term)
+        if ids is None:
+            return
+        ids.discard(learner_id)
+        if not ids:
+            del self.postings[term]
+            i = bisect.bisect_left(self.vocabulary, term)
+            if i < len(self.vocabulary) and self.vocabulary[i] == term:
+                del self.vocabulary[i]
+            for gram in trigrams(term):
+                self.grams[gram].discard(term)
+
+    def remove(self, learner_id: int) -> None:
+        with self._lock:
+            for term in self.doc_terms.pop(learner_id, ()):
+                self._drop_term(term, learner_id)
+            self.docs.pop(learner_id, None)
+
+    def upsert(self, doc: LearnerDoc) -> None:
+        with self._lock:
+            self.remove(doc.id)
+            terms = doc.terms()
+            self.docs[doc.id] = doc
+            self.doc_terms[doc.id] = terms
+            for term in terms:
+                self._add_term(term, doc.id)
+
+    def _apply(self, rows: Iterable) -> None:
+        for row in rows:
+            if row.is_learner:
+                self.upsert(_doc(row))
+            else:
+                self.remove(row.id)
+
+    def load(self, docs: Iterable[LearnerDoc]) -> None:
+        """
+        Replace the whole index. Built off to the side and swapped in, so
+        searches keep using the old one meanwhile.
+        """
+        by_id, doc_terms = {}, {}
+        postings: Dict[str, Set[int]] = defaultdict(set)
+        for doc in docs:
+            by_id[doc.id] = doc
+            doc_terms[doc.id] = doc.terms()
+            for term in doc_terms[doc.id]:
+                postings[term].add(doc.id)
+        grams: Dict[str, Set[str]] = defaultdict(set)
+        for term in postings:
+            for gram in trigrams(term):
+                grams[gram].add(term)
+        with self._lock:
+            self.docs, self.doc_terms, self.postings, self.grams = by_id, doc_terms, postings, grams
+            self.vocabulary = sorted(postings)
+
+    def rebuild(self) -> None:
+        with engine.connect() as conn:
+            now = conn.execute(text("SELECT NOW()")).scalar()
+            rows = conn.execute(text(LEARNERS)).fetchall()
+        self.load(_doc(row) for row in rows if row.is_learner)
+        self._watermark = now
+        self._built = self._checked = time.monotonic()
+
+    def refresh(self) -> None:
+        """Pull users changed since the last pull; rebuild if rows went missing."""
+        with engine.connect() as conn:
+            now = conn.execute(text("SELECT NOW()")).scalar()
+            # One second of overlap: updated_at has second precision
+            rows = conn.execute(text(LEARNERS + " WHERE u.updated_at >= :since"),
+                                {"since": self._watermark - timedelta(seconds=1)}).fetchall()
+            learners = conn.execute(text("""
+                SELECT COUNT(*) FROM users u JOIN roles r ON r.id = u.role_id WHERE r.name = 'Learner'
+            """)).scalar()
+        with self._lock:
+            self._apply(rows)
+            self._watermark = now
+            stale = len(self.docs) != learners
+        self._checked = time.monotonic()
+        if stale:
+            self.rebuild()
+
+    def ensure_fresh(self) -> None:
+        now = time.monotonic()
+        if not self._built:
+            with self._refresh_lock:
+                if not self._built:
+                    self.rebuild()
+            return
+        if now - self._checked < SEARCH_INDEX_REFRESH_SECONDS:
+            return
+        # One refresher at a time; everyone else searches the current index
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            if now - self._built >= SEARCH_INDEX_FULL_SECONDS:
+                self.rebuild()
+            else:
+                self.refresh()
+        except Exception as e:
+            print(f"Learner search refresh failed: {e}")
+            self._checked = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    # ── search ─────────────────────────────────────────────────────────────
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        i = bisect.bisect_left(self.vocabulary, prefix)
+        found = []
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(prefix):
+            found.append(self.vocabulary[i])
+            i += 1
+        return found
+
+    def _fuzzy_terms(self, term: str) -> Dict[str, float]:
+        grams = trigrams(term)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for candidate in self.grams.get(gram, ()):
+                shared[candidate] += 1
+        similar = {}
+        for candidate, count in shared.items():
+            dice = 2 * count / (len(grams) + len(trigrams(candidate)))
+            if transposed(term, candidate):
+                dice = max(dice, TRANSPOSED_SIMILARITY)
+            if dice >= FUZZY_MIN_SIMILARITY:
+                similar[candidate] = dice
+        return similar
+
+    def _term_scores(self, term: str) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        for candidate in self._prefix_terms(term):
+            # Shorter completions rank higher: "tha" -> "thabo" before "thandiwe"
+            score = EXACT if candidate == term else PREFIX + len(term) / len(candidate)
+            for learner_id in self.postings[candidate]:
+                if score > scores.get(learner_id, 0.0):
+                    scores[learner_id] = score
+        # Typo fallback only when nothing starts with the term; numbers are never fuzzy
+        if not scores and len(term) >= FUZZY_MIN_LENGTH and not any(c.isdigit() for c in term):
+            for candidate, similarity in self._fuzzy_terms(term).items():
+                score = FUZZY * similarity
+                for learner_id in self.postings[candidate]:
+                    if score > scores.get(learner_id, 0.0):
+                        scores[learner_id] = score
+        return scores
+
+    def search(self, query: str, grades: Optional[Set[int]] = None, limit: int = 20) -> List[dict]:
+        """
+        Learners matching every term of the query, best first. grades=None
+        means every grade.
+        """
+        terms = tokens(query)
+        if not terms:
+            return []
+        compact = normalize(query).replace(" ", "")
+
+        with self._lock:
+            total: Optional[Dict[int, float]] = None
+            # Rarest-looking (longest) term first keeps the intersection small
+            for term in sorted(set(terms), key=len, reverse=True):
+                scores = self._term_scores(term)
+                if total is None:
+                    total = scores
+                else:
+                    total = {lid: total[lid] + s for lid, s in scores.items() if lid in total}
+                if not total:
+                    return []
+
+            numbered = {lid for lid in self.postings.get(compact, ())
+                        if normalize(self.docs[lid].bokamoso_number) == compact}
+            hits = []
+            for learner_id, score in total.items():
+                doc = self.docs[learner_id]
+                if grades is not None and doc.grade not in grades:
+                    continue
+                if learner_id in numbered:
+                    score += NUMBER_BONUS
+                hits.append((score, doc))
+
+        best = heapq.nsmallest(min(limit, MAX_RESULTS), hits,
+                               key=lambda hit: (-hit[0], hit[1].sort_key, hit[1].id))
+        return [{**doc.public(), "score": round(score, 3)} for score, doc in best]
+
+
+learner_index = LearnerIndex()
+
+
+def search_learners(query: str, principal: dict, grade: Optional[int] = None, limit: int = 20) -> List[dict]:
+    """Staff search, limited to the grades the principal may view."""
+    learner_index.ensure_fresh()
+    if "all" in principal["grades"]:
+        grades = None
+    else:
+        grades = {int(g) for g in principal["grades"] if str(g).isdigit()}
+    if grade is not None:
+        if grades is not None and grade not in grades:
+            return []
+        grades = {grade}
+    return learner_index.search(query, grades, limit)
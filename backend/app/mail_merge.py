@@ -0,0 +1,79 @@
+# app/mail_merge.py
+from sqlalchemy.orm import Session
+from sqlalchemy import text, bindparam
+from typing import Iterator, List
+from .email_templates import render_email, merge_text
+
+
+AUDIENCES = ["grade_learners", "grade_parents"]
+
+# Learners on the roster with their year-to-date average and parent(s),
+# one row per (learner, parent) pair.
+AUDIENCE_QUERY = text("""
+    SELECT
+        r.user_id,
+        r.full_names AS learner_name,
+        r.grade,
+        r.school,
+        r.email AS learner_email,
+        m.average_mark,
+        CONCAT(p.parent_first_name, ' ', p.parent_surname) AS parent_name,
+        p.parent_email
+    FROM class_roster r
+    LEFT JOIN (
+        SELECT am.learner_id, ROUND(AVG(am.percentage), 1) AS average_mark
+        FROM assessment_marks am
+        JOIN assessments a ON a.id = am.assessment_id
+        WHERE a.grade IN :grades
+          AND a.date_written >= MAKEDATE(YEAR(CURDATE()), 1)
+        GROUP BY am.learner_id
+    ) m ON m.learner_id = r.user_id
+    LEFT JOIN parents p ON p.user_id = r.user_id
+    WHERE r.grade IN :grades
+    ORDER BY r.grade, r.full_names
+""").bindparams(bindparam("grades", expanding=True))
+
+
+def audience_recipients(db: Session, audience: str, grades: List[int]) -> Iterator[dict]:
+    """
+    Merge fields + recipient address for every learner or parent in the
+    grades, from one roster query.
+    """
+    seen = set()
+    for row in db.execute(AUDIENCE_QUERY, {"grades": grades}):
+        fields = {
+            "learner_name": row.learner_name,
+            "grade": row.grade,
+            "school": row.school or "",
+            "average_mark": row.average_mark if row.average_mark is not None else "N/A",
+            "parent_name": row.parent_name or "",
+        }
+
+        if audience == "grade_learners":
+            to_email, fields["name"] = row.learner_email, row.learner_name
+        else:
+            to_email, fields["name"] = row.parent_email, row.parent_name
+
+        # Learners with several parents appear once per parent
+        if not to_email or to_email.lower() in seen:
+            continue
+        seen.add(to_email.lower())
+
+        yield {"to_email": to_email, "user_id": row.user_id, "fields": fields}
+
+
+def build_messages(db: Session, audience: str, grades: List[int], subject: str,
+                   title: str, message: str, reference: str = "", **template) -> Iterator[dict]:
+    """
+    Rendered outbox rows (to_email, subject, html_body, name, reference),
+    one per recipient.
+    """
+    for recipient in audience_recipients(db, audience, grades):
+        fields = recipient["fields"]
+        yield {
+            "to_email": recipient["to_email"],
+            "subject": merge_text(subject, fields, escape=False),
+            "html_body": render_email(fields, title, message, **template),
+            "name": fields["name"],
+            "reference": reference,
+        }
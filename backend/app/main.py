@@ -1,15 +1,58 @@
 # app/main.py
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from .auth.routes import router as auth_router
 from .learner.routes import router as learner_router
 from .parent.routes  import router as parent_router
 from .staff.routes import router as staff_router
+from .config import (
+    OUTBOX_WORKER_ENABLED, COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY,
+    METRICS_TOKEN, JOBS_ENABLED,
+)
+from .outbox import outbox_worker
+from .jobs import job_runner
+from .events import router as events_router, broker
+from .batch import router as batch_router
+from .versioning import ConditionalGetMiddleware
+from .replica import ReplicaStickinessMiddleware
+from .idempotency import IdempotencyMiddleware
+from .compression import CompressionMiddleware
+from .responses import FastJSONResponse
+from . import metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background workers
+    broker.backend.start()
+    if OUTBOX_WORKER_ENABLED:
+        outbox_worker.start()
+    if JOBS_ENABLED:
+        job_runner.start()
+    yield
+    if JOBS_ENABLED:
+        job_runner.stop()
+    if OUTBOX_WORKER_ENABLED:
+        outbox_worker.stop()
+    broker.backend.stop()
+
+
+app = FastAPI(title="Nkateko API", lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# 304s for unchanged learner/parent data
+app.add_middleware(ConditionalGetMiddleware)
+
+# Client retries with the same Idempotency-Key replay the first response
+app.add_middleware(IdempotencyMiddleware)
 
-app = FastAPI(title="Nkateko API")
+# Reads stay on the primary for a while after a user writes
+app.add_middleware(ReplicaStickinessMiddleware)
 
-# Add CORS middleware
+# CORS outside the middleware that answers on its own (304s, idempotent
+# replays/409s) so those responses carry the CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -22,15 +65,36 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],               # allow GET, POST, OPTIONS, etc.
     allow_headers=["*"],               # allow Content-Type, Authorization, etc.
+    expose_headers=["ETag", "Idempotent-Replayed"],
 )
 
+# gzip/brotli for mobile clients; outermost so it sees the final body
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    gzip_level=COMPRESSION_GZIP_LEVEL,
+    brotli_quality=COMPRESSION_BROTLI_QUALITY,
+)
+
+# Latency/status per route and DB statements per request; outermost
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(learner_router)
 app.include_router(parent_router)
 app.include_router(staff_router)
+app.include_router(events_router)
+app.include_router(batch_router)
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
 @app.get("/")
 def root():
-    return {"message": "Nkateko API is running"}
\ No newline at end of file
+    return {"message": "Nkateko API is running"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(request: Request):
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(401, "Not authenticated")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
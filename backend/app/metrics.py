@@ -0,0 +1,286 @@
+# app/metrics.py
+# Request/query instrumentation in Prometheus text format. No client
+# library: a handful of counters and histograms guarded by one lock.
+import hashlib
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .config import SLOW_QUERY_MS
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+SLOW_LOG_DIR = "LOG/Slowqueries"
+os.makedirs(SLOW_LOG_DIR, exist_ok=True)
+SLOW_LOG_FILE = f"{SLOW_LOG_DIR}/slow_queries.log"
+
+_lock = threading.Lock()
+_slow_log_lock = threading.Lock()
+
+
+# ── PRIMITIVES ─────────────────────────────────────────────────────────────
+def _labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.label_names = name, help_text, labels
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with _lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with _lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.label_names, labels)} {value}"
+
+
+class Gauge(Counter):
+    def set(self, *labels, value: float) -> None:
+        with _lock:
+            self._values[labels] = value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        with _lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.label_names, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help_text, labels
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        i = bisect_left(self.buckets, value)
+        with _lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with _lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                le = _labels(self.label_names + ("le",), labels + (bound,))
+                yield f"{self.name}_bucket{le} {cumulative}"
+            base = _labels(self.label_names, labels)
+            yield f"{self.name}_sum{base} {series[-1]}"
+            yield f"{self.name}_count{base} {cumulative}"
+
+
+# ── METRICS ────────────────────────────────────────────────────────────────
+http_latency = Histogram(
+    "http_request_duration_seconds", "Request latency by route and status",
+    ("method", "route", "status"))
+http_in_progress = Gauge("http_requests_in_progress", "Requests being served", ("method",))
+http_queries = Histogram(
+    "http_request_db_queries", "Database statements per request",
+    ("route",), COUNT_BUCKETS)
+http_db_time = Histogram(
+    "http_request_db_seconds", "Time spent in the database per request", ("route",))
+query_latency = Histogram(
+    "db_query_duration_seconds", "Statement latency by fingerprint",
+    ("fingerprint",), QUERY_BUCKETS)
+query_errors = Counter("db_query_errors_total", "Statements that raised", ("fingerprint",))
+slow_queries = Counter("db_slow_queries_total", "Statements slower than SLOW_QUERY_MS", ("route",))
+statement_info = Gauge("db_statement_info", "Normalized SQL for each fingerprint", ("fingerprint", "statement"))
+pool_gauge = Gauge("db_pool_connections", "Connection pool state", ("engine", "state"))
+cache_requests = Counter("cache_requests_total", "Cache lookups by cache and result", ("cache", "result"))
+cache_invalidations = Counter("cache_invalidations_total", "Tag invalidations by tag kind", ("tag",))
+replica_lag = Gauge("db_replica_lag_seconds", "Replica lag at the last check (-1 = unavailable)")
+session_routes = Counter("db_session_routes_total", "Request sessions by target engine", ("target",))
+idempotency_requests = Counter(
+    "idempotency_requests_total", "Keyed writes by outcome", ("result",))
+job_duration = Histogram(
+    "job_duration_seconds", "Background job run time by job and outcome",
+    ("job", "status"), (0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600))
+
+_engines: Dict[str, Engine] = {}
+
+
+# ── STATEMENT FINGERPRINTS ─────────────────────────────────────────────────
+_STRINGS = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMS = re.compile(r"%\(\w+\)s|%s|\?")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUE_LISTS = re.compile(r"(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+")
+_SPACE = re.compile(r"\s+")
+
+_fingerprints: Dict[str, Tuple[str, str]] = {}  # raw SQL -> (id, normalized)
+FINGERPRINT_CACHE_MAX = 2000
+
+
+def fingerprint(statement: str) -> Tuple[str, str]:
+    """
+    (short id, normalized SQL) for a statement. Literals and parameters
+    become ?, and IN/VALUES lists of any length collapse to one form.
+    """
+    cached = _fingerprints.get(statement)
+    if cached:
+        return cached
+    sql = _SPACE.sub(" ", statement).strip()
+    sql = _STRINGS.sub("?", sql)
+    sql = _PARAMS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    sql = _VALUE_LISTS.sub(r"\1, ...", sql)
+    sql = _IN_LISTS.sub("(?, ...)", sql)
+    fid = hashlib.sha1(sql.encode()).hexdigest()[:12]
+    if len(_fingerprints) < FINGERPRINT_CACHE_MAX:
+        _fingerprints[statement] = (fid, sql)
+    statement_info.set(fid, sql[:300], value=1)
+    return fid, sql
+
+
+# ── PER-REQUEST CONTEXT ────────────────────────────────────────────────────
+# Mutable dict so sync routes (run in the thread pool with a copied
+# context) still add to the request's counters.
+_request: ContextVar[Optional[dict]] = ContextVar("metrics_request", default=None)
+
+
+def route_name(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Mounted apps (/uploads) only set root_path
+    return scope.get("root_path") or "unmatched"
+
+
+def _write_slow(line: str) -> None:
+    with _slow_log_lock:
+        with open(SLOW_LOG_FILE, "a") as f:
+            f.write(line + "\n")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    fid, sql = fingerprint(statement)
+    query_latency.observe(elapsed, fid)
+
+    request = _request.get()
+    if request is not None:
+        request["queries"] += 1
+        request["db_seconds"] += elapsed
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        route = route_name(request["scope"]) if request else "background"
+        method = request["scope"]["method"] if request else "-"
+        slow_queries.inc(route)
+        _write_slow(
+            f"{datetime.now():%Y-%m-%d %H:%M:%S} | {elapsed * 1000:.1f} ms | "
+            f"{method} {route} | {fid} | {'executemany ' if executemany else ''}{sql[:1000]}"
+        )
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+    if exception_context.statement:
+        query_errors.inc(fingerprint(exception_context.statement)[0])
+
+
+def instrument_engine(engine: Engine, name: str = "primary") -> None:
+    """Attach query timing hooks and report the engine's pool."""
+    if name in _engines:
+        return
+    _engines[name] = engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _collect_pools() -> None:
+    for name, engine in _engines.items():
+        pool = engine.pool
+        for state in ("size", "checkedin", "checkedout", "overflow"):
+            reading = getattr(pool, state, None)
+            if callable(reading):
+                pool_gauge.set(name, state, value=reading())
+
+
+def render() -> str:
+    _collect_pools()
+    lines = []
+    for metric in (http_latency, http_in_progress, http_queries, http_db_time,
+                   query_latency, query_errors, slow_queries, statement_info, pool_gauge,
+                   cache_requests, cache_invalidations, job_duration, replica_lag, session_routes,
+                   idempotency_requests):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ── MIDDLEWARE ─────────────────────────────────────────────────────────────
+class MetricsMiddleware:
+    """
+    Times every HTTP request, labelled by route template (not raw path, so
+    /learners/{learner_id} is one series), and counts its DB statements.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        request = {"scope": scope, "queries": 0, "db_seconds": 0.0}
+        token = _request.set(request)
+        status = 500
+        started = time.perf_counter()
+        http_in_progress.inc(method)
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_progress.inc(method, amount=-1)
+            _request.reset(token)
+            route = route_name(scope)
+            http_latency.observe(elapsed, method, route, status)
+            http_queries.observe(request["queries"], route)
+            http_db_time.observe(request["db_seconds"], route)
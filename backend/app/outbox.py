@@ -0,0 +1,204 @@
+# app/outbox.py
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import Session
+from sqlalchemy import text, bindparam
+from typing import Iterable, List, Optional
+from .config import (
+    MAIL_BATCH_SIZE, MAIL_RATE_PER_SECOND, MAIL_MAX_ATTEMPTS, MAIL_POLL_SECONDS,
+)
+from .database import engine
+from utils.send_brevo_email import smtp_pool, log_message
+
+
+# Retry backoff: 30s, 1m, 2m, 4m ... capped at 1h
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+# A 'Sending' row older than this belonged to a worker that died
+STALE_CLAIM_MINUTES = 10
+
+
+def enqueue_email(db: Session, to_email: str, subject: str, html_body: str,
+                  name: str = "", reference: str = "") -> int:
+    """
+    Queue one email. Caller commits. Returns the outbox id.
+    """
+    db.execute(text("""
+        INSERT INTO email_outbox (to_email, subject, html_body, name, reference)
+        VALUES (:to, :subject, :html, :name, :ref)
+    """), {"to": to_email, "subject": subject, "html": html_body, "name": name, "ref": reference})
+    return db.execute(text("SELECT LAST_INSERT_ID()")).fetchone()[0]
+
+
+def enqueue_emails(db: Session, messages: Iterable[dict]) -> int:
+    """
+    Queue many emails in one executemany. Each dict has to_email, subject,
+    html_body and optionally name/reference. Caller commits.
+    """
+    rows = [{
+        "to": m["to_email"],
+        "subject": m["subject"],
+        "html": m["html_body"],
+        "name": m.get("name", ""),
+        "ref": m.get("reference", ""),
+    } for m in messages]
+    if not rows:
+        return 0
+
+    db.execute(text("""
+        INSERT INTO email_outbox (to_email, subject, html_body, name, reference)
+        VALUES (:to, :subject, :html, :name, :ref)
+    """), rows)
+    return len(rows)
+
+
+class RateLimiter:
+    """Spaces sends evenly to stay under the provider's per-second limit."""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second > 0 else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_limiter = RateLimiter(MAIL_RATE_PER_SECOND)
+
+
+def _claim_batch(limit: int) -> List:
+    # SKIP LOCKED lets several app workers drain the outbox without
+    # double-sending.
+    with engine.begin() as conn:
+        rows = conn.execute(text(f"""
+            SELECT id, to_email, subject, html_body, name, reference, attempts
+            FROM email_outbox
+            WHERE (status = 'Pending' AND next_attempt_at <= NOW())
+               OR (status = 'Sending' AND claimed_at < NOW() - INTERVAL {STALE_CLAIM_MINUTES} MINUTE)
+            ORDER BY next_attempt_at, id
+            LIMIT :n
+            FOR UPDATE SKIP LOCKED
+        """), {"n": limit}).fetchall()
+
+        if rows:
+            conn.execute(text("""
+                UPDATE email_outbox
+                SET status = 'Sending', claimed_at = NOW(), attempts = attempts + 1
+                WHERE id IN :ids
+            """).bindparams(bindparam("ids", expanding=True)), {"ids": [r.id for r in rows]})
+
+    return rows
+
+
+def _send_one(row):
+    _limiter.wait()
+    try:
+        smtp_pool.send(row.to_email, row.subject, row.html_body)
+        log_message(f"SUCCESS: Email sent to {row.to_email} | Ref: {row.reference} | Name: {row.name}")
+        return row, None, False
+    except smtplib.SMTPRecipientsRefused as e:
+        log_message(f"ERROR sending to {row.to_email} | {str(e)}")
+        return row, str(e), True  # permanent, don't retry
+    except Exception as e:
+        log_message(f"ERROR sending to {row.to_email} | {str(e)}")
+        return row, str(e), False
+
+
+def deliver_pending(limit: int = MAIL_BATCH_SIZE) -> dict:
+    """
+    Claim and send one batch over the pooled SMTP connections, then record
+    per-message status. Returns counts.
+    """
+    rows = _claim_batch(limit)
+    if not rows:
+        return {"sent": 0, "retry": 0, "failed": 0}
+
+    with ThreadPoolExecutor(max_workers=smtp_pool.size) as pool:
+        results = list(pool.map(_send_one, rows))
+
+    sent = [row.id for row, error, _ in results if error is None]
+    counts = {"sent": len(sent), "retry": 0, "failed": 0}
+
+    with engine.begin() as conn:
+        if sent:
+            conn.execute(text("""
+                UPDATE email_outbox
+                SET status = 'Sent', sent_at = NOW(), last_error = NULL
+                WHERE id IN :ids
+            """).bindparams(bindparam("ids", expanding=True)), {"ids": sent})
+
+        for row, error, permanent in results:
+            if error is None:
+                continue
+            attempts = row.attempts + 1
+            if permanent or attempts >= MAIL_MAX_ATTEMPTS:
+                counts["failed"] += 1
+                conn.execute(text("""
+                    UPDATE email_outbox SET status = 'Failed', last_error = :err
+                    WHERE id = :id
+                """), {"id": row.id, "err": error[:2000]})
+            else:
+                counts["retry"] += 1
+                delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+                conn.execute(text("""
+                    UPDATE email_outbox
+                    SET status = 'Pending', last_error = :err,
+                        next_attempt_at = NOW() + INTERVAL :delay SECOND
+                    WHERE id = :id
+                """), {"id": row.id, "err": error[:2000], "delay": delay})
+
+    return counts
+
+
+class OutboxWorker:
+    """
+    Background thread that drains email_outbox. Started from the app
+    lifespan; wake() skips the poll wait right after something is queued.
+    """
+
+    def __init__(self, poll_seconds: float = MAIL_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        smtp_pool.close()
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                counts = deliver_pending()
+            except Exception as e:
+                log_message(f"ERROR outbox worker | {str(e)}")
+                counts = {"sent": 0, "retry": 0, "failed": 0}
+
+            # Keep going while there is a backlog, otherwise wait for work
+            if sum(counts.values()) == 0:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+
+outbox_worker = OutboxWorker()
@@ -7,11 +7,14 @@ from jose import JWTError, jwt
 from ..config import SECRET_KEY, ALGORITHM, UPLOAD_DIR, BASE_URL
 from ..database import get_db
 from ..auth.dependencies import oauth2_scheme, get_current_user
+from ..responses import FastJSONResponse
+from ..cache import cached
+from ..attendance_rollup import learner_months
 import os
 import shutil
 from datetime import datetime
 from pydantic import BaseModel, Field
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import json
 import random
 import string
@@ -20,6 +23,7 @@ router = APIRouter(prefix="/api/parent", tags=["parent"])
 
 
 # Get child's learner_id (from parents table)
+@cached("parent-child", ttl=300, tags=lambda parent_id: [f"parent:{parent_id}"])
 def get_child_learner_id(db: Session, parent_id: int) -> int:
     row = db.execute(text("""
         SELECT user_id FROM parents WHERE id = :pid
@@ -44,7 +48,7 @@ def get_child_assessments(db: Session = Depends(get_db), current_user: dict = De
         ORDER BY a.date_written DESC
     """)
     results = db.execute(query, {"lid": learner_id}).fetchall()
-    return [dict(row._mapping) for row in results]
+    return FastJSONResponse(results)
 
 @router.get("/attendance")
 def get_child_attendance(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
@@ -60,7 +64,18 @@ def get_child_attendance(db: Session = Depends(get_db), current_user: dict = Dep
         ORDER BY class_date DESC
     """)
     results = db.execute(query, {"lid": learner_id}).fetchall()
-    return [dict(row._mapping) for row in results]
+    return FastJSONResponse(results)
+
+@router.get("/attendance/summary")
+def get_child_attendance_summary(
+    year: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user["role"] != "Parent":
+        raise HTTPException(403)
+    learner_id = get_child_learner_id(db, int(current_user["sub"]))
+    return FastJSONResponse(learner_months(db, learner_id, year or datetime.now().year))
 
 @router.get("/notifications")
 def get_child_notifications(
@@ -117,7 +132,7 @@ def get_child_notifications(
     all_results.sort(key=lambda x: x.created_at, reverse=True)
 
     # Convert to dicts (no is_read field for parents)
-    return [dict(row._mapping) for row in all_results]
+    return FastJSONResponse(all_results)
 
 @router.get("/warnings")
 def get_child_warnings(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
@@ -133,7 +148,7 @@ def get_child_warnings(db: Session = Depends(get_db), current_user: dict = Depen
         ORDER BY issued_at DESC
     """)
     results = db.execute(query, {"lid": learner_id}).fetchall()
-    return [dict(row._mapping) for row in results]
+    return FastJSONResponse(results)
 
 # Apology Model
 class ApologyCreate(BaseModel):
@@ -188,7 +203,7 @@ def get_apology_history(db: Session = Depends(get_db), current_user: dict = Depe
         ORDER BY created_at DESC
     """)
     results = db.execute(query, {"pid": parent_id}).fetchall()
-    return [dict(row._mapping) for row in results]
+    return FastJSONResponse(results)
 
 
 @router.get("/profile")
@@ -218,7 +233,7 @@ def get_parent_profile(db: Session = Depends(get_db), current_user: dict = Depen
     if not result:
         raise HTTPException(status_code=404, detail="Parent profile not found")
 
-    return dict(result._mapping)
+    return FastJSONResponse(result)
 
 @router.get("/assessments")
 def get_child_assessments(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
@@ -235,7 +250,7 @@ def get_child_assessments(db: Session = Depends(get_db), current_user: dict = De
         ORDER BY a.date_written DESC
     """)
     results = db.execute(query, {"lid": learner_id}).fetchall()
-    return [dict(row._mapping) for row in results]
+    return FastJSONResponse(results)
 
 @router.get("/attendance")
 def get_child_attendance(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
@@ -251,6 +266,6 @@ def get_child_attendance(db: Session = Depends(get_db), current_user: dict = Dep
         ORDER BY class_date DESC
     """)
     results = db.execute(query, {"lid": learner_id}).fetchall()
-    return [dict(row._mapping) for row in results]
+    return FastJSONResponse(results)
 
 
@@ -0,0 +1,100 @@
+# app/payroll.py
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from typing import Iterator, Optional
+from .exports import stream_query
+
+
+# Hours for one log; open logs (no time_out yet) count as 0. Rounded per
+# log like the payroll triggers' DECIMAL(10,2), so rebuilt and incremental
+# totals agree
+LOG_HOURS = "ROUND(COALESCE(TIMESTAMPDIFF(MINUTE, l.time_in, l.time_out) / 60.0, 0), 2)"
+
+PAYROLL_COLUMNS = [
+    "staff_id", "staff_number", "name", "role", "email", "tax_number",
+    "hourly_rate", "logs", "hours", "disputed_hours", "payable_hours", "amount_due",
+]
+
+PAYROLL_RUN_SQL = """
+    SELECT
+        s.id AS staff_id,
+        s.staff_number,
+        CONCAT(s.names, ' ', s.surname) AS name,
+        s.role,
+        s.email,
+        s.tax_number,
+        s.hourly_rate,
+        p.log_count AS logs,
+        p.hours,
+        p.disputed_hours,
+        p.hours - p.disputed_hours AS payable_hours,
+        p.amount_due
+    FROM staff_payroll_monthly p
+    JOIN staff s ON s.id = p.staff_id
+    WHERE p.period_year = :year AND p.period_month = :month
+    ORDER BY s.surname, s.names
+"""
+
+
+def rebuild_payroll(db: Session, year: int, month: Optional[int] = None) -> int:
+    """
+    Recompute staff_payroll_monthly for a year (or one month) from the raw
+    logs in one set-based pass. The triggers keep it current afterwards.
+    Caller commits. Returns number of rollup rows written.
+    """
+    where = "YEAR(l.attendance_date) = :year"
+    params = {"year": year}
+    if month is not None:
+        where += " AND MONTH(l.attendance_date) = :month"
+        params["month"] = month
+
+    period = "period_year = :year" + (" AND period_month = :month" if month is not None else "")
+    db.execute(text(f"DELETE FROM staff_payroll_monthly WHERE {period}"), params)
+
+    result = db.execute(text(f"""
+        INSERT INTO staff_payroll_monthly
+            (staff_id, period_year, period_month, hours, disputed_hours, log_count, amount_due)
+        SELECT
+            l.staff_id,
+            YEAR(l.attendance_date),
+            MONTH(l.attendance_date),
+            SUM({LOG_HOURS}),
+            SUM(IF(l.disputed = 1, {LOG_HOURS}, 0)),
+            COUNT(*),
+            (SUM({LOG_HOURS}) - SUM(IF(l.disputed = 1, {LOG_HOURS}, 0))) * s.hourly_rate
+        FROM staff_time_logs l
+        JOIN staff s ON s.id = l.staff_id
+        WHERE {where}
+        GROUP BY l.staff_id, YEAR(l.attendance_date), MONTH(l.attendance_date), s.hourly_rate
+    """), params)
+
+    return result.rowcount
+
+
+def get_staff_payroll(db: Session, staff_id: int, year: int) -> list:
+    rows = db.execute(text("""
+        SELECT period_month AS month, hours, disputed_hours,
+               hours - disputed_hours AS payable_hours, log_count AS logs, amount_due
+        FROM staff_payroll_monthly
+        WHERE staff_id = :sid AND period_year = :year
+        ORDER BY period_month
+    """), {"sid": staff_id, "year": year}).fetchall()
+
+    return [dict(row._mapping) for row in rows]
+
+
+def payroll_rows(year: int, month: int) -> Iterator[list]:
+    """
+    Payroll run for every staff member with hours in the period, straight
+    from the rollups, followed by a TOTAL row.
+    """
+    totals = {"hours": 0, "disputed_hours": 0, "payable_hours": 0, "amount_due": 0}
+
+    for row in stream_query(PAYROLL_RUN_SQL, {"year": year, "month": month}):
+        for key in totals:
+            totals[key] += getattr(row, key) or 0
+        yield [getattr(row, col) for col in PAYROLL_COLUMNS]
+
+    yield ["TOTAL", "", "", "", "", "", "", "",
+           totals["hours"], totals["disputed_hours"],
+           totals["payable_hours"], totals["amount_due"]]
@@ -0,0 +1,114 @@
+# app/replica.py
+# Read-replica routing: which GETs may read from the replica, replica lag
+# tracking, and read-your-writes stickiness after a user writes.
+import threading
+import time
+from typing import Optional
+from jose import jwt, JWTError
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from .config import REPLICA_MAX_LAG_SECONDS, REPLICA_LAG_CHECK_SECONDS, REPLICA_STICKY_SECONDS
+from .cache import cache, MISS
+from .metrics import replica_lag
+
+READ_METHODS = ("GET", "HEAD")
+
+
+def user_key(authorization: str) -> Optional[str]:
+    """
+    "role:sub" from a bearer token, without verifying it: it only picks
+    which database serves the read, the route still authenticates.
+    """
+    if not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        claims = jwt.get_unverified_claims(authorization[7:])
+    except JWTError:
+        return None
+    return f"{claims.get('role')}:{claims.get('sub')}"
+
+
+# ── STICKINESS ─────────────────────────────────────────────────────────────
+# Kept in the shared cache so it holds across workers; the replica is only
+# enabled with CACHE_BACKEND=redis (app/database.py)
+def mark_write(key: Optional[str]) -> None:
+    if key:
+        cache.set(f"replica-sticky:{key}", True, REPLICA_STICKY_SECONDS)
+
+
+def is_sticky(key: Optional[str]) -> bool:
+    if not key:
+        return False
+    return cache.get(f"replica-sticky:{key}", name="replica-sticky") is not MISS
+
+
+# ── LAG ────────────────────────────────────────────────────────────────────
+class ReplicaMonitor:
+    """
+    Reads Seconds_Behind_Source from the replica at most every
+    check_seconds (lazily, by whichever request needs it). The replica is
+    used only while lag is known and under max_lag.
+    """
+
+    def __init__(self, engine: Engine, max_lag: float = REPLICA_MAX_LAG_SECONDS,
+                 check_seconds: float = REPLICA_LAG_CHECK_SECONDS):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_seconds = check_seconds
+        self.lag: Optional[float] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _read_lag(self) -> Optional[float]:
+        with self.engine.connect() as conn:
+            for statement, column in (("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+                                      ("SHOW SLAVE STATUS", "Seconds_Behind_Master")):
+                try:
+                    row = conn.execute(text(statement)).mappings().fetchone()
+                except Exception:
+                    continue  # older/newer server without this statement
+                if row is None:
+                    return None  # not configured as a replica
+                value = row.get(column)
+                return None if value is None else float(value)
+        return None
+
+    def healthy(self) -> bool:
+        now = time.monotonic()
+        if now - self._checked >= self.check_seconds and self._lock.acquire(blocking=False):
+            try:
+                self.lag = self._read_lag()
+            except Exception as e:
+                print(f"Replica lag check failed: {e}")
+                self.lag = None
+            finally:
+                self._checked = time.monotonic()
+                self._lock.release()
+            replica_lag.set(value=-1 if self.lag is None else self.lag)
+        return self.lag is not None and self.lag <= self.max_lag
+
+
+# ── MIDDLEWARE ─────────────────────────────────────────────────────────────
+class ReplicaStickinessMiddleware:
+    """Marks the caller as a recent writer after a successful non-GET."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+
+        authorization = ""
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value.decode("latin-1")
+                break
+        key = user_key(authorization)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                mark_write(key)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,158 @@
+# app/report_card_render.py
+"""
+Report card HTML (and PDF when WeasyPrint is installed) for one learner.
+Runs inside the report-card process pool, so it imports nothing that
+touches the database: cards arrive as plain dicts built by
+app/report_cards.py and files are written straight to disk.
+"""
+import html
+import os
+from datetime import datetime
+from functools import lru_cache
+from string import Template
+from typing import List, Optional, Tuple
+
+try:
+    from weasyprint import HTML
+except ImportError:  # optional: HTML only without it
+    HTML = None
+
+
+_LAYOUT = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>$learner_name - Term $term $year progress report</title>
+<style>
+  body { font-family: Poppins, Arial, sans-serif; color: #333; margin: 32px; font-size: 13px; }
+  header { border-bottom: 4px solid #0d6efd; padding-bottom: 12px; margin-bottom: 20px; }
+  h1 { margin: 0; font-size: 22px; }
+  h2 { font-size: 15px; color: #0d6efd; margin: 24px 0 8px; }
+  .meta { color: #555; margin-top: 4px; }
+  table { width: 100%; border-collapse: collapse; }
+  th, td { text-align: left; padding: 6px 8px; border-bottom: 1px solid #e5e5e5; }
+  th { background: #f8f9fa; }
+  td.num, th.num { text-align: right; }
+  .summary td { border: none; padding: 2px 16px 2px 0; }
+  .muted { color: #777; }
+  blockquote { margin: 8px 0; padding: 8px 12px; background: #f8f9fa; border-left: 3px solid #0d6efd; }
+  footer { margin-top: 32px; color: #777; font-size: 11px; text-align: center; }
+</style>
+</head>
+<body>
+<header>
+  <h1>Bokamoso Educational Trust &mdash; Progress Report</h1>
+  <div class="meta">$learner_name &middot; $bokamoso_number &middot; Grade $grade &middot; $school</div>
+  <div class="meta">Term $term, $year ($period)</div>
+</header>
+
+<table class="summary">
+  <tr><td><strong>Programme average</strong></td><td>$programme_average</td>
+      <td><strong>Attendance</strong></td><td>$attendance</td></tr>
+</table>
+
+<h2>Programme assessments</h2>
+$assessments
+
+<h2>School term marks</h2>
+$term_marks
+
+<h2>Tutor comments</h2>
+$comments
+
+<footer>Generated $generated &middot; &copy; $year Bokamoso Educational Trust</footer>
+</body>
+</html>
+"""
+
+
+@lru_cache(maxsize=None)
+def _layout() -> Template:
+    return Template(_LAYOUT)
+
+
+def _e(value) -> str:
+    return html.escape("" if value is None else str(value))
+
+
+def _pct(value) -> str:
+    return "&ndash;" if value is None else f"{float(value):.1f}%"
+
+
+def _assessments_table(rows: List[dict]) -> str:
+    if not rows:
+        return '<p class="muted">No programme assessments this term.</p>'
+    body = "".join(
+        f"<tr><td>{_e(r['subject'])}</td><td>{_e(r['name'])}</td><td>{_e(r['date_written'])}</td>"
+        f"<td class=\"num\">{_pct(r['percentage'])}</td><td class=\"num\">{_pct(r['class_average'])}</td></tr>"
+        for r in rows
+    )
+    return ("<table><tr><th>Subject</th><th>Assessment</th><th>Date</th>"
+            "<th class=\"num\">Mark</th><th class=\"num\">Class average</th></tr>" + body + "</table>")
+
+
+def _term_marks_table(marks: dict) -> str:
+    if not marks:
+        return '<p class="muted">No school marks submitted for this term.</p>'
+    body = "".join(f"<tr><td>{_e(subject)}</td><td class=\"num\">{_e(mark)}</td></tr>"
+                   for subject, mark in sorted(marks.items()))
+    return "<table><tr><th>Subject</th><th class=\"num\">Mark</th></tr>" + body + "</table>"
+
+
+def _comments_block(comments: List[dict]) -> str:
+    if not comments:
+        return '<p class="muted">No comments this term.</p>'
+    return "".join(
+        f"<blockquote>{_e(c['comment'])}<br><span class=\"muted\">&mdash; {_e(c['staff_name'])}"
+        f"{', ' + _e(c['subject']) if c.get('subject') else ''}</span></blockquote>"
+        for c in comments
+    )
+
+
+def render_report_card(card: dict) -> str:
+    attendance = card["attendance"]
+    if attendance["rate"] is None:
+        attendance_text = "&ndash;"
+    else:
+        attendance_text = (f"{attendance['rate']:.1f}% ({attendance['present']} present, "
+                           f"{attendance['absent']} absent, {attendance['apology']} excused)")
+    return _layout().substitute(
+        learner_name=_e(card["full_names"]),
+        bokamoso_number=_e(card["bokamoso_number"]),
+        grade=_e(card["grade"]),
+        school=_e(card["school"]),
+        term=_e(card["term"]),
+        year=_e(card["year"]),
+        period=_e(f"{card['date_from']} to {card['date_to']}"),
+        programme_average=_pct(card["programme_average"]),
+        attendance=attendance_text,
+        assessments=_assessments_table(card["assessments"]),
+        term_marks=_term_marks_table(card["term_marks"]),
+        comments=_comments_block(card["comments"]),
+        generated=datetime.now().strftime("%d %B %Y %H:%M"),
+    )
+
+
+def render_chunk(cards: List[dict], root: str, rel_dir: str,
+                 pdf: bool = True) -> List[Tuple[int, Optional[str], Optional[str]]]:
+    """
+    Render and write a chunk of cards (one pool task). Returns
+    (user_id, path relative to root or None, error or None) per card.
+    """
+    os.makedirs(os.path.join(root, rel_dir), exist_ok=True)
+    results = []
+    for card in cards:
+        try:
+            document = render_report_card(card)
+            name = f"{card['user_id']}_report_card_{card['year']}_t{card['term']}"
+            if pdf and HTML is not None:
+                rel = f"{rel_dir}/{name}.pdf"
+                HTML(string=document).write_pdf(os.path.join(root, rel))
+            else:
+                rel = f"{rel_dir}/{name}.html"
+                with open(os.path.join(root, rel), "w", encoding="utf-8") as f:
+                    f.write(document)
+            results.append((card["user_id"], rel, None))
+        except Exception as e:
+            results.append((card["user_id"], None, f"{type(e).__name__}: {e}"))
+    return results
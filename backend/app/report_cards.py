@@ -0,0 +1,249 @@
+# app/report_cards.py
+"""
+Term report cards for a whole grade. Five set-based queries gather the
+roster, programme assessment marks, attendance (from the monthly
+rollups), school term marks and tutor comments; the cards are rendered
+in a process pool (app/report_card_render.py) and each learner's file is
+recorded in learner_documents as report_card_<year>_t<term>.
+
+    python -m app.report_cards --grade 11 --term 2 [--year 2026]
+
+Runs as the report-cards job; progress is kept in report_card_runs and
+pushed to the requester's SSE channel.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from .config import UPLOAD_DIR, REPORT_CARD_WORKERS, REPORT_CARD_PDF
+from .database import engine
+from .events import publish
+from .report_card_render import render_chunk
+
+# School terms by month (the programme follows the public school calendar)
+TERM_MONTHS = {1: (1, 3), 2: (4, 6), 3: (7, 9), 4: (10, 12)}
+CHUNK_SIZE = 25  # cards per pool task
+REPORT_CARD_DIR = "report_cards"  # under UPLOAD_DIR
+
+
+def term_period(year: int, term: int):
+    first, last = TERM_MONTHS[term]
+    start = date(year, first, 1)
+    end = (date(year, last, 1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return start, end
+
+
+def check_year(year: int) -> None:
+    """
+    Only the current year can be rendered: class_roster is today's roster
+    and learner_term_marks has no year (one row per learner and term).
+    """
+    if year != datetime.now().year:
+        raise ValueError(f"Report cards can only be generated for {datetime.now().year}")
+
+
+def document_type(year: int, term: int) -> str:
+    return f"report_card_{year}_t{term}"
+
+
+# ── GATHER ─────────────────────────────────────────────────────────────────
+def gather_report_cards(db: Session, grade: int, year: int, term: int,
+                        learner_ids: Optional[List[int]] = None) -> List[dict]:
+    """One card dict per roster learner (or just learner_ids), ready to render."""
+    check_year(year)
+    start, end = term_period(year, term)
+    period = {"grade": grade, "start": start, "end": end, "year": year, "term": term}
+    only = set(learner_ids) if learner_ids else None
+
+    roster = db.execute(text("""
+        SELECT r.user_id, r.full_names, r.school, u.bokamoso_number
+        FROM class_roster r
+        JOIN users u ON u.id = r.user_id
+        WHERE r.grade = :grade
+        ORDER BY r.full_names
+    """), period).fetchall()
+
+    assessments = defaultdict(list)
+    for row in db.execute(text("""
+        SELECT am.learner_id, a.subject, a.name, a.date_written, am.percentage, a.average
+        FROM assessments a
+        JOIN assessment_marks am ON am.assessment_id = a.id
+        WHERE a.grade = :grade AND a.date_written BETWEEN :start AND :end
+        ORDER BY a.subject, a.date_written
+    """), period):
+        assessments[row.learner_id].append({
+            "subject": row.subject,
+            "name": row.name,
+            "date_written": str(row.date_written),
+            "percentage": None if row.percentage is None else float(row.percentage),
+            "class_average": None if row.average is None else float(row.average),
+        })
+
+    attendance = {row.user_id: row for row in db.execute(text("""
+        SELECT user_id, SUM(present) AS present, SUM(absent) AS absent,
+               SUM(apology) AS apology, SUM(total) AS total
+        FROM attendance_learner_monthly
+        WHERE grade = :grade AND period_year = :year
+          AND period_month BETWEEN :first_month AND :last_month
+        GROUP BY user_id
+    """), {**period, "first_month": start.month, "last_month": end.month})}
+
+    term_marks = {}
+    for row in db.execute(text("""
+        SELECT tm.user_id, tm.marks
+        FROM learner_term_marks tm
+        JOIN class_roster r ON r.user_id = tm.user_id AND r.grade = :grade
+        WHERE tm.term = :term
+    """), period):
+        term_marks[row.user_id] = json.loads(row.marks) if isinstance(row.marks, str) else (row.marks or {})
+
+    comments = defaultdict(list)
+    for row in db.execute(text("""
+        SELECT c.learner_id, c.subject, c.comment, CONCAT(s.names, ' ', s.surname) AS staff_name
+        FROM report_card_comments c
+        JOIN class_roster r ON r.user_id = c.learner_id AND r.grade = :grade
+        LEFT JOIN staff s ON s.id = c.staff_id
+        WHERE c.year = :year AND c.term = :term
+        ORDER BY c.subject, c.updated_at
+    """), period):
+        comments[row.learner_id].append({
+            "subject": row.subject, "comment": row.comment, "staff_name": row.staff_name or "Tutor",
+        })
+
+    cards = []
+    for learner in roster:
+        lid = learner.user_id
+        if only is not None and lid not in only:
+            continue
+        marks = [a["percentage"] for a in assessments[lid] if a["percentage"] is not None]
+        att = attendance.get(lid)
+        counted = int(att.total) - int(att.apology) if att else 0
+        cards.append({
+            "user_id": lid,
+            "full_names": learner.full_names,
+            "bokamoso_number": learner.bokamoso_number,
+            "school": learner.school or "",
+            "grade": grade,
+            "year": year,
+            "term": term,
+            "date_from": str(start),
+            "date_to": str(end),
+            "assessments": assessments[lid],
+            "programme_average": round(sum(marks) / len(marks), 1) if marks else None,
+            "attendance": {
+                "present": int(att.present) if att else 0,
+                "absent": int(att.absent) if att else 0,
+                "apology": int(att.apology) if att else 0,
+                "rate": round(int(att.present) / counted * 100, 1) if counted else None,
+            },
+            "term_marks": term_marks.get(lid, {}),
+            "comments": comments[lid],
+        })
+    return cards
+
+
+# ── RUNS ───────────────────────────────────────────────────────────────────
+def create_report_card_run(db: Session, grade: int, year: int, term: int, created_by: int,
+                           channel: str) -> int:
+    """Progress goes to channel (principal_channel). Caller commits. Returns the run id."""
+    db.execute(text("""
+        INSERT INTO report_card_runs (grade, year, term, created_by, channel) VALUES (:g, :y, :t, :by, :channel)
+    """), {"g": grade, "y": year, "t": term, "by": created_by, "channel": channel})
+    return db.execute(text("SELECT LAST_INSERT_ID()")).fetchone()[0]
+
+
+def _progress(run_id: Optional[int], channel: Optional[str], **fields) -> None:
+    if run_id is None:
+        return
+    assignments = ", ".join(f"{name} = :{name}" for name in fields)
+    if fields.get("status") == "Running":
+        assignments += ", started_at = NOW()"
+    elif fields.get("status") in ("Done", "Failed"):
+        assignments += ", finished_at = NOW()"
+    with engine.begin() as conn:
+        conn.execute(text(f"UPDATE report_card_runs SET {assignments} WHERE id = :id"), {"id": run_id, **fields})
+    if channel:
+        publish(channel, "report_cards_progress", {"run_id": run_id, **fields})
+
+
+def _record(db: Session, file_type: str, rendered: List[tuple]) -> None:
+    rows = [{"uid": uid, "type": file_type, "path": path} for uid, path, error in rendered if path]
+    if rows:
+        db.execute(text("""
+            INSERT INTO learner_documents (user_id, file_type, file_path, uploaded_at)
+            VALUES (:uid, :type, :path, NOW())
+            ON DUPLICATE KEY UPDATE file_path = VALUES(file_path), uploaded_at = NOW()
+        """), rows)
+
+
+def _render(chunks: List[List[dict]], rel_dir: str, workers: int):
+    """Yield each chunk's render results as it finishes."""
+    if workers <= 1:
+        # A pool of one only adds the interpreter start-up
+        for chunk in chunks:
+            yield render_chunk(chunk, UPLOAD_DIR, rel_dir, REPORT_CARD_PDF)
+        return
+    # spawn, not fork: this runs on a job thread of a multi-threaded server
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(render_chunk, chunk, UPLOAD_DIR, rel_dir, REPORT_CARD_PDF) for chunk in chunks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def generate_report_cards(db: Session, grade: int, year: int, term: int,
+                          learner_ids: Optional[List[int]] = None, run_id: Optional[int] = None,
+                          channel: Optional[str] = None) -> dict:
+    """
+    Gather, render in a process pool and record every card for the grade.
+    learner_documents rows are committed chunk by chunk as files land.
+    """
+    try:
+        cards = gather_report_cards(db, grade, year, term, learner_ids)
+        _progress(run_id, channel, status="Running", total=len(cards), rendered=0, failed=0, error=None)
+
+        rel_dir = f"{REPORT_CARD_DIR}/{year}/t{term}/grade{grade}"
+        file_type = document_type(year, term)
+        workers = REPORT_CARD_WORKERS or os.cpu_count() or 1
+        chunks = [cards[i:i + CHUNK_SIZE] for i in range(0, len(cards), CHUNK_SIZE)]
+        rendered = failed = 0
+        errors: List[str] = []
+
+        for results in _render(chunks, rel_dir, min(workers, len(chunks))):
+            _record(db, file_type, results)
+            db.commit()
+            rendered += sum(1 for _, path, _ in results if path)
+            failed += sum(1 for _, path, _ in results if not path)
+            errors += [f"{uid}: {error}" for uid, path, error in results if error]
+            _progress(run_id, channel, rendered=rendered, failed=failed)
+    except Exception as e:
+        _progress(run_id, channel, status="Failed", error=f"{type(e).__name__}: {e}"[:2000])
+        raise
+
+    _progress(run_id, channel, status="Done", error="\n".join(errors)[:2000] or None)
+    return {"grade": grade, "year": year, "term": term, "rendered": rendered, "failed": failed}
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Render term report cards for a grade")
+    parser.add_argument("--grade", type=int, required=True)
+    parser.add_argument("--term", type=int, required=True, choices=sorted(TERM_MONTHS))
+    parser.add_argument("--year", type=int, default=datetime.now().year)
+    args = parser.parse_args()
+    try:
+        check_year(args.year)
+    except ValueError as e:
+        parser.error(str(e))
+
+    db = SessionLocal()
+    try:
+        print(generate_report_cards(db, args.grade, args.year, args.term))
+    finally:
+        db.close()
@@ -0,0 +1,48 @@
+# app/responses.py
+import datetime
+import decimal
+from typing import Any
+import orjson
+from fastapi.responses import JSONResponse
+from sqlalchemy.engine import Row, RowMapping
+
+
+# Non-str keys: some payloads are keyed by term/grade numbers
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any):
+    """
+    Types orjson doesn't know. Matches what jsonable_encoder produced, so
+    clients see the same JSON: whole Decimals as int, others as float,
+    MySQL TIME (timedelta) as seconds.
+    """
+    if isinstance(obj, Row):
+        return obj._asdict()
+    if isinstance(obj, RowMapping):
+        return dict(obj)
+    if isinstance(obj, decimal.Decimal):
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    if isinstance(obj, datetime.timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any, sort_keys: bool = False) -> bytes:
+    options = ORJSON_OPTIONS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+    return orjson.dumps(content, default=_default, option=options)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson. Routes can return one directly with
+    SQLAlchemy rows in it (fetchall() results, Row, RowMapping) to skip
+    jsonable_encoder and the dict(row._mapping) copy.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,87 @@
+# app/roster.py
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy import text, bindparam
+from typing import Iterable, List, Set
+from .cache import cached
+
+# Admission decisions are written outside the app, so the roster is only
+# trusted for a minute; anything in-app that changes it invalidates grade:N
+ROSTER_TTL = 60  # seconds
+
+
+@cached("grade-roster", ttl=ROSTER_TTL, tags=lambda grade: [f"grade:{grade}"])
+def get_grade_roster(db: Session, grade: int) -> List[dict]:
+    """
+    Accepted learners for a grade, ordered by name.
+    Single lookup on class_roster (grade, full_names).
+    """
+    rows = db.execute(text("""
+        SELECT user_id AS id, full_names, school, email
+        FROM class_roster
+        WHERE grade = :grade
+        ORDER BY full_names
+    """), {"grade": grade}).fetchall()
+
+    return [dict(row._mapping) for row in rows]
+
+
+def get_roster_members(db: Session, grade: int, learner_ids: Iterable[int]) -> Set[int]:
+    """
+    Return the subset of learner_ids that are on the grade's roster.
+    """
+    ids = {int(lid) for lid in learner_ids}
+    if not ids:
+        return set()
+
+    query = text("""
+        SELECT user_id FROM class_roster
+        WHERE grade = :grade AND user_id IN :ids
+    """).bindparams(bindparam("ids", expanding=True))
+
+    rows = db.execute(query, {"grade": grade, "ids": list(ids)}).fetchall()
+    return {row.user_id for row in rows}
+
+
+def require_roster_members(db: Session, grade: int, learner_ids: Iterable[int]) -> None:
+    """
+    Raise 403 if any learner is not on the grade's roster.
+    Used by the attendance and assessment capture validators.
+    """
+    ids = {int(lid) for lid in learner_ids}
+    missing = ids - get_roster_members(db, grade, ids)
+    if missing:
+        listed = ", ".join(str(lid) for lid in sorted(missing))
+        raise HTTPException(403, f"Learner(s) {listed} not in grade {grade}")
+
+
+def refresh_class_roster(db: Session, grades: Iterable[int]) -> None:
+    """
+    Rebuild class_roster for the given grades from applications.
+    The triggers keep it current row by row; this is for backfills and
+    bulk decision runs that disable the triggers. Caller commits.
+    """
+    grades = sorted({int(g) for g in grades})
+    if not grades:
+        return
+
+    db.execute(
+        text("DELETE FROM class_roster WHERE grade IN :grades")
+        .bindparams(bindparam("grades", expanding=True)),
+        {"grades": grades}
+    )
+    # Same rule as the old per-request join: Accepted, and both the
+    # decision and first mails have gone out.
+    db.execute(
+        text("""
+            INSERT IGNORE INTO class_roster (grade, user_id, full_names, school, email)
+            SELECT a.grade, u.id, u.full_names, u.school, u.email
+            FROM applications a
+            JOIN users u ON u.id = a.user_id
+            WHERE a.status = 'Accepted'
+              AND a.Decision_mail = 'Yes'
+              AND a.first_mail = 'Yes'
+              AND a.grade IN :grades
+        """).bindparams(bindparam("grades", expanding=True)),
+        {"grades": grades}
+    )
@@ -0,0 +1,126 @@
+# app/session_search.py
+import html
+import re
+from datetime import date
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from typing import List, Optional
+
+
+# Each entry must match a FULLTEXT index column list exactly (see added dql.sql)
+SEARCH_FIELDS = {
+    "all": ["topic", "description", "positives", "negatives", "comments"],
+    "topic": ["topic"],
+    "negatives": ["negatives"],
+    "positives": ["positives"],
+}
+
+SNIPPET_CHARS = 160
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def query_terms(q: str) -> List[str]:
+    # InnoDB ignores tokens shorter than innodb_ft_min_token_size (3)
+    return sorted({w.lower() for w in _WORD.findall(q) if len(w) >= 3}, key=len, reverse=True)
+
+
+def highlight_snippet(value: Optional[str], terms: List[str]) -> Optional[str]:
+    """
+    Short HTML-escaped window around the first matching term, with every
+    match wrapped in <mark>. None if the text has no match.
+    """
+    if not value or not terms:
+        return None
+
+    pattern = re.compile("|".join(re.escape(t) for t in terms), re.IGNORECASE)
+    first = pattern.search(value)
+    if not first:
+        return None
+
+    start = max(first.start() - SNIPPET_CHARS // 3, 0)
+    end = min(start + SNIPPET_CHARS, len(value))
+    window = value[start:end]
+
+    parts = []
+    last = 0
+    for match in pattern.finditer(window):
+        parts.append(html.escape(window[last:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group(0))}</mark>")
+        last = match.end()
+    parts.append(html.escape(window[last:]))
+
+    return ("…" if start > 0 else "") + "".join(parts) + ("…" if end < len(value) else "")
+
+
+def search_session_reports(
+    db: Session,
+    q: str,
+    field: str = "all",
+    staff_id: Optional[int] = None,
+    grade: Optional[int] = None,
+    subject: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> dict:
+    """
+    Ranked FULLTEXT search (natural language mode) with optional filters.
+    """
+    columns = ", ".join(f"r.{c}" for c in SEARCH_FIELDS[field])
+    match = f"MATCH({columns}) AGAINST (:q IN NATURAL LANGUAGE MODE)"
+
+    filters = ""
+    params = {"q": q, "limit": limit + 1, "offset": offset}
+    if staff_id is not None:
+        filters += " AND r.staff_id = :sid"
+        params["sid"] = staff_id
+    if grade is not None:
+        filters += " AND r.class_name = :grade"  # class_name holds the grade
+        params["grade"] = str(grade)
+    if subject:
+        filters += " AND r.subject = :subject"
+        params["subject"] = subject.strip()
+    if date_from:
+        filters += " AND r.session_date >= :date_from"
+        params["date_from"] = date_from
+    if date_to:
+        filters += " AND r.session_date <= :date_to"
+        params["date_to"] = date_to
+
+    rows = db.execute(text(f"""
+        SELECT
+            r.id, r.staff_id,
+            CONCAT(s.names, ' ', s.surname) AS staff_name,
+            r.class_name, r.session_date, r.subject,
+            r.topic, r.description, r.positives, r.negatives, r.comments,
+            {match} AS score
+        FROM staff_session_reports r
+        JOIN staff s ON s.id = r.staff_id
+        WHERE {match} {filters}
+        ORDER BY score DESC, r.session_date DESC
+        LIMIT :limit OFFSET :offset
+    """), params).fetchall()
+
+    terms = query_terms(q)
+    results = []
+    for row in rows[:limit]:
+        snippets = {}
+        for col in SEARCH_FIELDS["all"]:
+            snippet = highlight_snippet(getattr(row, col), terms)
+            if snippet:
+                snippets[col] = snippet
+
+        results.append({
+            "id": row.id,
+            "staff_id": row.staff_id,
+            "staff_name": row.staff_name,
+            "class_name": row.class_name,
+            "session_date": row.session_date,
+            "subject": row.subject,
+            "topic": row.topic,
+            "score": round(float(row.score), 4),
+            "snippets": snippets,
+        })
+
+    return {"results": results, "has_more": len(rows) > limit}
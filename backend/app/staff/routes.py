@@ -1,21 +1,40 @@
 # app/staff/routes.py
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Body, Form, Request
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Body, Form, Request, Response
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
 from jose import JWTError, jwt
 from ..config import SECRET_KEY, ALGORITHM, UPLOAD_DIR, BASE_URL
 from ..database import get_db
-from ..auth.dependencies import oauth2_scheme, get_current_user
+from ..auth.dependencies import oauth2_scheme, get_current_user, get_current_staff, get_current_admin, staff_can_view_grade
+from ..roster import get_grade_roster, require_roster_members
+from ..payroll import rebuild_payroll, get_staff_payroll, payroll_rows, PAYROLL_COLUMNS
+from ..exports import export_response, stream_query, pivot_by_learner
+from ..session_search import search_session_reports, SEARCH_FIELDS
+from ..attendance_rollup import (
+    refresh_attendance_rollups, rebuild_attendance_rollups, grade_heatmap, grade_trend, learner_months,
+)
 import os
 import shutil
+import hashlib
 from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import Dict, Any, List, Optional
 import json
 import random
 import string
-from utils.send_brevo_email import send_brevo_email
+from ..outbox import enqueue_email, enqueue_emails, outbox_worker
+from ..mail_merge import AUDIENCES, build_messages
+from ..email_templates import EMAIL_THEMES, MERGE_FIELDS
+from ..events import publish, principal_channel
+from ..versioning import bump_versions, GLOBAL
+from ..responses import FastJSONResponse, dumps
+from ..cache import cache, on_primary
+from ..jobs import JOBS, enqueue_job, job_runner
+from ..admissions import DECISIONS, create_admission_run
+from ..application_scoring import get_scoring_config, save_scoring_config, rankings
+from ..learner_search import MAX_RESULTS, search_learners
+from ..report_cards import TERM_MONTHS, check_year, create_report_card_run
 
 
 router = APIRouter(prefix="/api/staff", tags=["staff"])
@@ -61,7 +80,7 @@ def get_staff_profile(db: Session = Depends(get_db), current_user: dict = Depend
     if not result:
         raise HTTPException(status_code=404, detail="Staff profile not found or inactive")
 
-    return dict(result._mapping)
+    return FastJSONResponse(result)
 
 # ── TIMESHEETS ─────────────────────────────────────────────────────────────
 @router.get("/timesheets")
@@ -109,6 +128,57 @@ def get_timesheets(
         "total_hours": round(total_hours, 2)
     }
 
+# ── PAYROLL ────────────────────────────────────────────────────────────────
+@router.get("/payroll")
+def get_my_payroll(
+    year: Optional[int] = None,
+    db: Session = Depends(get_db),
+    staff: dict = Depends(get_current_staff)
+):
+    """
+    Monthly hours / disputed hours / amount due for the current staff member
+    """
+    # Admin tokens carry an admins-table id, which is not a staff id
+    if staff["staff_id"] is None:
+        raise HTTPException(403, "Payroll is only available to staff accounts")
+    months = get_staff_payroll(db, staff["staff_id"], year or datetime.now().year)
+    return {
+        "months": months,
+        "total_hours": sum(m["hours"] for m in months),
+        "total_due": sum(m["amount_due"] for m in months)
+    }
+
+
+@router.get("/payroll/run")
+def run_payroll(
+    year: int,
+    month: int,
+    format: str = "csv",
+    admin: dict = Depends(get_current_admin)
+):
+    """
+    Payroll for all staff for a period, streamed as CSV (admin only)
+    """
+    if not 1 <= month <= 12:
+        raise HTTPException(422, "Month must be 1-12")
+
+    return export_response(format, f"payroll_{year}_{month:02d}", PAYROLL_COLUMNS, payroll_rows(year, month))
+
+
+@router.post("/payroll/rebuild")
+def rebuild_payroll_period(
+    year: int,
+    month: Optional[int] = None,
+    db: Session = Depends(get_db),
+    admin: dict = Depends(get_current_admin)
+):
+    """
+    Recompute rollups from staff_time_logs (backfill / repair)
+    """
+    rows = rebuild_payroll(db, year, month)
+    db.commit()
+    return {"success": True, "rows": rows}
+
 # Get previous reports (already have, but confirm)
 @router.get("/session-reports")
 def get_session_reports(
@@ -125,7 +195,45 @@ def get_session_reports(
         ORDER BY session_date DESC
     """)
     results = db.execute(query, {"sid": staff_id, "year": year}).fetchall()
-    return [dict(row._mapping) for row in results]
+    return FastJSONResponse(results)
+
+# ── SEARCH REPORTS ─────────────────────────────────────────────────────────
+@router.get("/session-reports/search")
+def search_reports(
+    q: str,
+    field: str = "all",
+    grade: Optional[int] = None,
+    subject: Optional[str] = None,
+    staff_id: Optional[int] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+    db: Session = Depends(get_db),
+    staff: dict = Depends(get_current_staff)
+):
+    """
+    Ranked full-text search over topic/description/positives/negatives/comments
+    with highlighted snippets. Admins search all tutors, others their own.
+    """
+    if len(q.strip()) < 3:
+        raise HTTPException(422, "Search text must be at least 3 characters")
+    if field not in SEARCH_FIELDS:
+        raise HTTPException(422, f"field must be one of: {', '.join(SEARCH_FIELDS)}")
+
+    if staff["role"] != "Admin":
+        staff_id = staff["id"]
+
+    start, end = None, None
+    if date_from or date_to:
+        start, end = _parse_period(date_from or "1900-01-01", date_to or "9999-12-31")
+
+    return search_session_reports(
+        db, q.strip(), field,
+        staff_id=staff_id, grade=grade, subject=subject,
+        date_from=start, date_to=end,
+        limit=max(1, min(limit, 100)), offset=max(offset, 0)
+    )
 
 # ── SUBMIT NEW REPORT ──────────────────────────────────────────────────────
 @router.post("/session-report")
@@ -225,7 +333,7 @@ def get_unavailability(
     """)
     results = db.execute(query, {"sid": staff_id, "year": year}).fetchall()
 
-    return [dict(row._mapping) for row in results]
+    return FastJSONResponse(results)
 
 
 # Submit new unavailability (already have, but confirm)
@@ -272,32 +380,32 @@ async def submit_unavailability(
 def get_learners_for_grade(
     grade: int,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    staff: dict = Depends(get_current_staff)
 ):
-    staff_id = int(current_user["sub"])
+    # Staff must be assigned to this grade
+    if not staff_can_view_grade(staff, grade):
+        raise HTTPException(403, "You are not assigned to this grade")
 
-    # Optional: check staff is assigned to this grade (if you want to keep permission check)
-    staff_grades = db.execute(text("""
-        SELECT grades FROM staff WHERE id = :sid
-    """), {"sid": staff_id}).fetchone()[0]
+    # Accepted learners (same rule as the PHP code), kept in class_roster
+    return FastJSONResponse(get_grade_roster(db, grade))
 
-    if not staff_grades or (staff_grades != 'all' and str(grade) not in staff_grades.split(',')):
-        raise HTTPException(403, "You are not assigned to this grade")
 
-    # Exact same logic as your PHP code
-    query = text("""
-        SELECT u.id, u.full_names, u.school, u.email
-        FROM applications a
-        JOIN users u ON u.id = a.user_id
-        WHERE a.status = 'Accepted'
-          AND a.Decision_mail = 'Yes'
-          AND a.first_mail = 'Yes'
-          AND a.grade = :grade
-        ORDER BY u.full_names
-    """)
-    learners = db.execute(query, {"grade": grade}).fetchall()
+@router.get("/learners/search")
+def search_learners_for_staff(
+    q: str,
+    grade: Optional[int] = None,
+    limit: int = 20,
+    staff: dict = Depends(get_current_staff)
+):
+    """
+    Find learners in the staff member's grades by partial name, surname,
+    school, email or Bokamoso number. Typos are tolerated; best match first.
+    """
+    q = q.strip()
+    if len(q) < 2:
+        raise HTTPException(422, "Search needs at least 2 characters")
+    return FastJSONResponse({"query": q, "results": search_learners(q, staff, grade, max(1, min(limit, MAX_RESULTS)))})
 
-    return [dict(row._mapping) for row in learners]
 
 @router.get("/assessments/check")
 def check_assessment_duplicate(
@@ -345,10 +453,11 @@ async def capture_assessments(
     if not marks or not isinstance(marks, list):
         raise HTTPException(422, "Marks must be a non-empty list")
 
-    # Start transaction
-    try:
-        db.begin()
+    # Validate all learners belong to the grade's roster (one lookup)
+    require_roster_members(db, grade, (mark["learner_id"] for mark in marks))
 
+    # The roster check above autobegan the transaction; the writes join it
+    try:
         # Insert assessment
         db.execute(text("""
             INSERT INTO assessments (name, grade, subject, total_mark, date_written, created_by)
@@ -370,13 +479,6 @@ async def capture_assessments(
             learner_id = int(mark["learner_id"])
             percentage = float(mark["percentage"])
 
-            # Validate learner belongs to grade
-            learner_check = db.execute(text("""
-                SELECT 1 FROM users WHERE id = :lid AND grade = :grade
-            """), {"lid": learner_id, "grade": grade}).fetchone()
-            if not learner_check:
-                raise HTTPException(403, f"Learner {learner_id} not in grade {grade}")
-
             db.execute(text("""
                 INSERT INTO assessment_marks (assessment_id, learner_id, percentage)
                 VALUES (:aid, :lid, :perc)
@@ -391,7 +493,9 @@ async def capture_assessments(
             UPDATE assessments SET average = :avg WHERE id = :aid
         """), {"avg": average, "aid": assessment_id})
 
+        bump_versions(db, "assessments", (int(mark["learner_id"]) for mark in marks))
         db.commit()
+        cache.invalidate(*(f"learner:{mark['learner_id']}" for mark in marks))
         return {"success": True, "message": "Assessment captured"}
 
     except Exception as e:
@@ -405,13 +509,10 @@ def get_assessment_results(
     month: int,
     subject: str,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    staff: dict = Depends(get_current_staff)
 ):
-    staff_id = int(current_user["sub"])
-
     # Optional: check staff assigned to grade/subject
-    staff_grades = db.execute(text("SELECT grades FROM staff WHERE id = :sid"), {"sid": staff_id}).fetchone()[0]
-    if not staff_grades or (staff_grades != 'all' and str(grade) not in staff_grades.split(',')):
+    if not staff_can_view_grade(staff, grade):
         raise HTTPException(403, "Not assigned to this grade")
 
     # 1. Get all assessments for filters
@@ -430,18 +531,7 @@ def get_assessment_results(
         return []
 
     # 2. Get accepted learners
-    learner_query = text("""
-        SELECT u.id, u.full_names, u.school
-        FROM applications a
-        JOIN users u ON u.id = a.user_id
-        WHERE a.status = 'Accepted'
-          AND a.Decision_mail = 'Yes'
-          AND a.first_mail = 'Yes'
-          AND a.grade = :grade
-        ORDER BY u.full_names ASC
-    """)
-    learners = db.execute(learner_query, {"grade": grade}).fetchall()
-    learner_list = [dict(row._mapping) for row in learners]
+    learner_list = get_grade_roster(db, grade)
 
     # 3. Build results per learner
     results = []
@@ -482,22 +572,19 @@ def get_assessment_results(
     # Sort by monthly_average DESC
     results.sort(key=lambda x: x["monthly_average"], reverse=True)
 
-    return results
+    return FastJSONResponse(results)
 
 
 @router.get("/learners/{learner_id}")
 def get_learner_detail(
     learner_id: int,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    staff: dict = Depends(get_current_staff)
 ):
-    staff_id = int(current_user["sub"])
-
     # Permission check (staff assigned to learner's grade)
-    staff_grades = db.execute(text("SELECT grades FROM staff WHERE id = :sid"), {"sid": staff_id}).fetchone()[0]
-    learner_grade = db.execute(text("SELECT grade FROM users WHERE id = :lid"), {"lid": learner_id}).fetchone()[0]
+    learner_grade = db.execute(text("SELECT grade FROM users WHERE id = :lid"), {"lid": learner_id}).scalar()
 
-    if not learner_grade or (staff_grades != 'all' and str(learner_grade) not in staff_grades.split(',')):
+    if not staff_can_view_grade(staff, learner_grade):
         raise HTTPException(403, "Not authorized to view this learner")
 
     learner = db.execute(text("""
@@ -526,13 +613,159 @@ def get_learner_detail(
         ORDER BY a.date_written DESC
     """), {"lid": learner_id}).fetchall()
 
+    return FastJSONResponse({
+        "learner": learner,
+        "attendance": attendance,
+        "assessments": assessments
+    })
+
+
+# ── LEARNER 360 ────────────────────────────────────────────────────────────
+# Everything ClassList/CaptureAttendance show for one learner, in one
+# statement. Kept briefly per worker so flipping between learners is a 304.
+LEARNER_360_TTL = 60  # seconds
+
+LEARNER_360_QUERY = text("""
+    SELECT
+        u.id, u.full_names, u.surname, u.school, u.grade, u.email,
+        u.cell_number, u.whatsapp_number,
+        (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                    'class_date', ac.class_date,
+                    'status', ac.status,
+                    'apology_message', ac.apology_message))
+           FROM attendance_classes ac
+          WHERE ac.user_id = u.id
+            AND ac.class_date >= MAKEDATE(YEAR(CURDATE()), 1)) AS attendance,
+        (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                    'name', a.name,
+                    'subject', a.subject,
+                    'date_written', a.date_written,
+                    'percentage', am.percentage,
+                    'average', a.average))
+           FROM assessments a
+           JOIN assessment_marks am ON a.id = am.assessment_id
+          WHERE am.learner_id = u.id
+            AND a.date_written >= MAKEDATE(YEAR(CURDATE()), 1)) AS assessments,
+        (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                    'term', tm.term,
+                    'marks', tm.marks,
+                    'report_path', tm.report_path,
+                    'updated_at', tm.updated_at))
+           FROM learner_term_marks tm
+          WHERE tm.user_id = u.id) AS term_marks,
+        (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                    'id', w.id,
+                    'type', w.warning_type,
+                    'reason', w.reason,
+                    'severity', w.severity,
+                    'date', DATE(w.issued_at)))
+           FROM learner_warnings w
+          WHERE w.learner_id = u.id AND w.status = 'Active') AS warnings,
+        (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                    'name', CONCAT(p.parent_first_name, ' ', p.parent_surname),
+                    'email', p.parent_email,
+                    'cell', p.parent_cell))
+           FROM parents p
+          WHERE p.user_id = u.id) AS parents
+    FROM users u
+    WHERE u.id = :lid
+""")
+
+
+def _json_list(value) -> list:
+    if value is None:
+        return []
+    return json.loads(value) if isinstance(value, (str, bytes)) else value
+
+
+def build_learner_360(db: Session, learner_id: int) -> dict | None:
+    row = db.execute(LEARNER_360_QUERY, {"lid": learner_id}).fetchone()
+    if not row:
+        return None
+
+    attendance = sorted(_json_list(row.attendance), key=lambda r: r["class_date"], reverse=True)
+    assessments = sorted(_json_list(row.assessments), key=lambda r: r["date_written"], reverse=True)
+    term_marks = sorted(_json_list(row.term_marks), key=lambda r: r["term"])
+    warnings = sorted(_json_list(row.warnings), key=lambda r: r["date"], reverse=True)
+
+    counts = {"Present": 0, "Absent": 0, "Apology": 0}
+    for item in attendance:
+        if item["status"] in counts:
+            counts[item["status"]] += 1
+    total = len(attendance)
+
+    marks = [a["percentage"] for a in assessments if a["percentage"] is not None]
+
     return {
-        "learner": dict(learner._mapping),
-        "attendance": [dict(row._mapping) for row in attendance],
-        "assessments": [dict(row._mapping) for row in assessments]
+        "learner": {
+            "id": row.id,
+            "full_names": row.full_names,
+            "surname": row.surname,
+            "school": row.school,
+            "grade": row.grade,
+            "email": row.email,
+            "cell_number": row.cell_number,
+            "whatsapp_number": row.whatsapp_number,
+        },
+        "attendance_summary": {
+            "total": total,
+            "present": counts["Present"],
+            "absent": counts["Absent"],
+            "apology": counts["Apology"],
+            "rate": round(counts["Present"] / total * 100, 1) if total else None,
+        },
+        "attendance": attendance,
+        "assessments": assessments,
+        "average_mark": round(sum(marks) / len(marks), 1) if marks else None,
+        "term_marks": term_marks,
+        "warnings": warnings,
+        "parents": _json_list(row.parents),
     }
 
 
+def _encoded_learner_360(db: Session, learner_id: int):
+    """(etag, grade, body) for the 360, or None. Encoded once and served as bytes."""
+    payload = build_learner_360(db, learner_id)
+    if payload is None:
+        return None
+    body = dumps(payload, sort_keys=True)
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    return etag, payload["learner"]["grade"], body
+
+
+@router.get("/learners/{learner_id}/360")
+def get_learner_360(
+    learner_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    staff: dict = Depends(get_current_staff)
+):
+    """
+    Learner profile, year-to-date attendance (summary + rows), marks,
+    term marks, active warnings and parent contact in one round trip.
+    Supports If-None-Match.
+    """
+    cached = cache.get_or_set(
+        f"learner-360:{learner_id}",
+        on_primary(db, lambda session: _encoded_learner_360(session, learner_id)),
+        LEARNER_360_TTL,
+        tags=[f"learner:{learner_id}"],
+        name="learner-360",
+    )
+    if cached is None:
+        raise HTTPException(404, "Learner not found")
+    etag, grade, body = cached
+
+    if not staff_can_view_grade(staff, grade):
+        raise HTTPException(403, "Not authorized to view this learner")
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    return Response(body, media_type="application/json", headers=headers)
+
+
 @router.post("/attendance/capture")
 async def capture_attendance(
     request: Request,
@@ -553,7 +786,9 @@ async def capture_attendance(
     if class_date > datetime.now().date().isoformat():
         raise HTTPException(403, "Cannot capture attendance for future dates")
 
-    db.begin()
+    # Only learners on the grade's roster
+    require_roster_members(db, int(grade), (item["learner_id"] for item in attendance_list))
+
     try:
         for item in attendance_list:
             learner_id = int(item["learner_id"])
@@ -578,13 +813,87 @@ async def capture_attendance(
                 "by": current_user.get("name", "System")
             })
 
+        refresh_attendance_rollups(db, int(grade), class_date, (item["learner_id"] for item in attendance_list))
+        bump_versions(db, "attendance", (int(item["learner_id"]) for item in attendance_list))
         db.commit()
+        cache.invalidate(*(f"learner:{item['learner_id']}" for item in attendance_list))
         return {"success": True}
     except Exception as e:
         db.rollback()
         raise HTTPException(500, str(e))
 
 
+# ── ATTENDANCE ROLLUPS ─────────────────────────────────────────────────────
+@router.get("/attendance/heatmap")
+def get_attendance_heatmap(
+    grade: int,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    db: Session = Depends(get_db),
+    staff: dict = Depends(get_current_staff)
+):
+    """
+    Present/absent/apology counts and rate per class day for a grade
+    (defaults to the current year)
+    """
+    if not staff_can_view_grade(staff, grade):
+        raise HTTPException(403, "Not authorized for this grade")
+    start, end = _parse_period(date_from, date_to)
+    return FastJSONResponse({"grade": grade, "days": grade_heatmap(db, grade, start, end)})
+
+
+@router.get("/attendance/trend")
+def get_attendance_trend(
+    grade: int,
+    period: str = "week",
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    db: Session = Depends(get_db),
+    staff: dict = Depends(get_current_staff)
+):
+    """
+    Attendance totals and rate per week or month for a grade
+    """
+    if period not in ("week", "month"):
+        raise HTTPException(422, "period must be week or month")
+    if not staff_can_view_grade(staff, grade):
+        raise HTTPException(403, "Not authorized for this grade")
+    start, end = _parse_period(date_from, date_to)
+    return FastJSONResponse({"grade": grade, "period": period, "points": grade_trend(db, grade, period, start, end)})
+
+
+@router.get("/learners/{learner_id}/attendance-summary")
+def get_learner_attendance_summary(
+    learner_id: int,
+    year: Optional[int] = None,
+    db: Session = Depends(get_db),
+    staff: dict = Depends(get_current_staff)
+):
+    """
+    Monthly attendance counts for one learner (default: this year)
+    """
+    learner_grade = db.execute(text("SELECT grade FROM users WHERE id = :lid"), {"lid": learner_id}).scalar()
+    if not staff_can_view_grade(staff, learner_grade):
+        raise HTTPException(403, "Not authorized to view this learner")
+    return FastJSONResponse(learner_months(db, learner_id, year or datetime.now().year))
+
+
+@router.post("/attendance/rollups/rebuild")
+def rebuild_attendance_rollup_tables(
+    date_from: str,
+    date_to: Optional[str] = None,
+    db: Session = Depends(get_db),
+    admin: dict = Depends(get_current_admin)
+):
+    """
+    Recompute attendance rollups from attendance_classes (backfill / repair)
+    """
+    start, end = _parse_period(date_from, date_to or datetime.now().date().isoformat())
+    result = rebuild_attendance_rollups(db, start, end)
+    db.commit()
+    return {"success": True, **result}
+
+
 @router.post("/messages")
 async def send_class_message(
     request: Request,
@@ -636,57 +945,468 @@ async def send_class_message(
 
     db.execute(text("""
         INSERT INTO notifications
-        (title,content,sender_name,sender_type,target_grades)
-        VALUES (:title,:content,:sender_name,:sender_type,:grades)
+        (title,content,sender_id,sender_name,sender_type,target_grades)
+        VALUES (:title,:content,:sender_id,:sender_name,:sender_type,:grades)
     """),{
         "title":title,
         "content":content,
+        "sender_id":staff_id,
         "sender_name":sender_name,
         "sender_type":sender_role,
         "grades":grade_string
     })
+    notification_id = db.execute(text("SELECT LAST_INSERT_ID()")).fetchone()[0]
+
+    # Delivery count = roster size of the target grades right now
+    db.execute(text("""
+        INSERT INTO notification_stats (notification_id, recipients)
+        SELECT :nid, COUNT(*) FROM class_roster WHERE grade IN :grades
+        ON DUPLICATE KEY UPDATE recipients = VALUES(recipients)
+    """).bindparams(bindparam("grades", expanding=True)), {
+        "nid": notification_id,
+        "grades": [int(g) for g in grades] or [0]
+    })
 
     db.commit()
 
-    return {"success":True}
+    for g in grades:
+        publish(f"grade:{g}", "notification", {
+            "id": notification_id,
+            "title": title,
+            "sender_name": sender_name,
+            "sender_type": sender_role
+        })
 
+    return {"success":True, "id":notification_id}
 
-@router.get("/notifications")
-def get_class_notifications(
+
+# ── WARNINGS ───────────────────────────────────────────────────────────────
+class WarningCreate(BaseModel):
+    learner_id: int
+    warning_type: str = Field(..., pattern="^(Yellow|Red|Blue|Green)$")
+    reason: str = Field(..., min_length=1)
+    severity: str = Field("medium", pattern="^(low|medium|high)$")
+
+
+@router.post("/warnings")
+def issue_warning(
+    warning: WarningCreate,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    staff: dict = Depends(get_current_staff)
 ):
+    """
+    Issue a warning to a learner in one of the staff member's grades
+    """
+    learner_grade = db.execute(text("SELECT grade FROM users WHERE id = :lid"),
+                               {"lid": warning.learner_id}).scalar()
+    if not staff_can_view_grade(staff, learner_grade):
+        raise HTTPException(403, "Not authorized for this learner")
 
-    staff_id = int(current_user["sub"])
+    db.execute(text("""
+        INSERT INTO learner_warnings (learner_id, warning_type, reason, severity, created_by)
+        VALUES (:lid, :type, :reason, :severity, :by)
+    """), {
+        "lid": warning.learner_id,
+        "type": warning.warning_type,
+        "reason": warning.reason.strip(),
+        "severity": warning.severity,
+        "by": staff["staff_id"]
+    })
+    warning_id = db.execute(text("SELECT LAST_INSERT_ID()")).fetchone()[0]
+    bump_versions(db, "warnings", [warning.learner_id])
+    db.commit()
 
-    # Get staff name from DB
-    staff = db.execute(text("""
-        SELECT CONCAT(names,' ',surname) AS name
-        FROM staff
-        WHERE id = :sid
-    """), {"sid": staff_id}).fetchone()
+    cache.invalidate(f"learner:{warning.learner_id}")
+    publish(f"learner:{warning.learner_id}", "warning", {
+        "id": warning_id,
+        "type": warning.warning_type,
+        "severity": warning.severity
+    })
 
-    if not staff:
-        raise HTTPException(status_code=404, detail="Staff account not found")
+    return {"success": True, "id": warning_id}
 
-    sender_name = staff.name
 
-    # Fetch notifications sent by this staff member
+@router.post("/warnings/run")
+def run_warning_engine(
+    full: bool = False,
+    grade: Optional[int] = None,
+    db: Session = Depends(get_db),
+    admin: dict = Depends(get_current_admin)
+):
+    """
+    Queue a scoring run that raises/resolves rule-based warnings (admin
+    only). Incremental unless full=true.
+    """
+    job_id = enqueue_job(db, "early-warnings", {"full": full, "grades": [grade] if grade is not None else None})
+    db.commit()
+    job_runner.wake()
+    return {"success": True, "job_id": job_id}
+
+
+# ── JOBS ───────────────────────────────────────────────────────────────────
+@router.get("/jobs")
+def list_jobs(
+    limit: int = 50,
+    db: Session = Depends(get_db),
+    admin: dict = Depends(get_current_admin)
+):
+    """
+    Registered jobs with their schedules, and the most recent runs
+    """
+    schedules = {row.name: row for row in db.execute(text("""
+        SELECT name, interval_seconds, next_run_at, last_enqueued_at FROM job_schedules
+    """)).fetchall()}
+    runs = db.execute(text("""
+        SELECT id, name, status, attempts, max_attempts, run_at, claimed_by,
+               finished_at, duration_ms, last_error, created_at
+        FROM jobs
+        ORDER BY id DESC
+        LIMIT :n
+    """), {"n": min(limit, 500)}).fetchall()
+
+    return FastJSONResponse({
+        "leader": job_runner.is_leader,
+        "jobs": [{
+            "name": spec.name,
+            "description": spec.description,
+            "every": spec.every,
+            "next_run_at": schedules[spec.name].next_run_at if spec.name in schedules else None,
+            "last_enqueued_at": schedules[spec.name].last_enqueued_at if spec.name in schedules else None,
+        } for spec in sorted(JOBS.values(), key=lambda s: s.name)],
+        "runs": runs,
+    })
+
+
+@router.post("/jobs/{name}")
+def enqueue_job_now(
+    name: str,
+    payload: Dict[str, Any] = Body(default={}),
+    db: Session = Depends(get_db),
+    admin: dict = Depends(get_current_admin)
+):
+    """
+    Queue a job to run as soon as a worker is free (admin only)
+    """
+    if name not in JOBS:
+        raise HTTPException(404, "Unknown job")
+    job_id = enqueue_job(db, name, payload)
+    db.commit()
+    job_runner.wake()
+    return {"success": True, "id": job_id}
+
+
+# ── ADMISSIONS ─────────────────────────────────────────────────────────────
+class AdmissionDecision(BaseModel):
+    app_id: str
+    status: str
+
+
+class AdmissionDecisionsRequest(BaseModel):
+    decisions: List[AdmissionDecision] = Field(..., min_length=1, max_length=5000)
+    send_emails: bool = True
+
+
+@router.post("/admissions/decisions")
+def submit_admission_decisions(
+    payload: AdmissionDecisionsRequest,
+    db: Session = Depends(get_db),
+    admin: dict = Depends(get_current_admin)
+):
+    """
+    Apply accept/reject/waitlist decisions in bulk (admin only). Queued as
+    one admissions-decide job; follow it on GET /admissions/runs/{run_id}
+    or the admissions_progress event.
+    """
+    for d in payload.decisions:
+        if d.status not in DECISIONS:
+            raise HTTPException(422, f"status must be one of: {', '.join(DECISIONS)}")
+
+    run_id = create_admission_run(
+        db, [(d.app_id, d.status) for d in payload.decisions], admin["id"], principal_channel(admin),
+        payload.send_emails
+    )
+    job_id = enqueue_job(db, "admissions-decide", {"run_id": run_id})
+    db.commit()
+    job_runner.wake()
+    return {"success": True, "run_id": run_id, "job_id": job_id}
+
+
+@router.get("/admissions/runs")
+def list_admission_runs(
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    admin: dict = Depends(get_current_admin)
+):
+    rows = db.execute(text("""
+        SELECT id, created_by, status, send_emails, total, processed, changed, unchanged,
+               not_found, emails_queued, error, created_at, started_at, finished_at
+        FROM admission_runs
+        ORDER BY id DESC
+        LIMIT :n
+    """), {"n": min(limit, 200)}).fetchall()
+    return FastJSONResponse(rows)
+
+
+@router.get("/admissions/runs/{run_id}")
+def get_admission_run(
+    run_id: int,
+    db: Session = Depends(get_db),
+    admin: dict = Depends(get_current_admin)
+):
+    """
+    Progress and totals for a run, plus the decisions that didn't apply
+    (unknown app_id).
+    """
+    run = db.execute(text("""
+        SELECT id, created_by, status, send_emails, total, processed, changed, unchanged,
+               not_found, emails_queued, error, created_at, started_at, finished_at
+        FROM admission_runs WHERE id = :id
+    """), {"id": run_id}).fetchone()
+    if not run:
+        raise HTTPException(404, "Admission run not found")
+
+    missing = db.execute(text("""
+        SELECT app_id, status FROM admission_decisions
+        WHERE run_id = :id AND changed IS NULL
+        ORDER BY id
+    """), {"id": run_id}).fetchall() if run.status == "Done" else []
+
+    return FastJSONResponse({**run._mapping, "not_found_apps": missing})
+
+
+@router.get("/applications/rankings")
+def get_application_rankings(
+    grade: int,
+    year: Optional[int] = None,
+    eligible_only: bool = False,
+    limit: int = 100,
+    offset: int = 0,
+    db: Session = Depends(get_db),
+    admin: dict = Depends(get_current_admin)
+):
+    """
+    Applicants for a grade ranked by admissions score, with each score's
+    breakdown and the eligibility rules it failed.
+    """
+    return FastJSONResponse(rankings(
+        db, year or datetime.now().year, grade, eligible_only, min(max(limit, 1), 1000), max(offset, 0)
+    ))
+
+
+@router.get("/applications/scoring/{grade}")
+def get_application_scoring(
+    grade: int,
+    db: Session = Depends(get_db),
+    admin: dict = Depends(get_current_admin)
+):
+    return get_scoring_config(db, grade)
+
+
+@router.put("/applications/scoring/{grade}")
+def set_application_scoring(
+    grade: int,
+    config: Dict[str, Any] = Body(...),
+    db: Session = Depends(get_db),
+    admin: dict = Depends(get_current_admin)
+):
+    """
+    Save a grade's weights/thresholds (keys as in GET) and queue a rescore
+    of this year's applications for it.
+    """
+    try:
+        save_scoring_config(db, grade, config)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+    job_id = enqueue_job(db, "application-scores", {"grade": grade})
+    db.commit()
+    cache.invalidate("scoring-config")
+    job_runner.wake()
+    return {"success": True, "job_id": job_id}
+
+
+# ── REPORT CARDS ───────────────────────────────────────────────────────────
+class ReportCommentRequest(BaseModel):
+    term: int = Field(..., ge=1, le=4)
+    year: int = Field(default_factory=lambda: datetime.now().year)
+    subject: str = Field("", max_length=100)
+    comment: str = Field(..., min_length=1, max_length=2000)
+
+
+@router.put("/learners/{learner_id}/report-comment")
+def set_report_comment(
+    learner_id: int,
+    payload: ReportCommentRequest,
+    db: Session = Depends(get_db),
+    staff: dict = Depends(get_current_staff)
+):
+    """
+    The tutor comment printed on a learner's term report card (one per
+    subject; subject "" is the general comment).
+    """
+    learner_grade = db.execute(text("SELECT grade FROM users WHERE id = :lid"), {"lid": learner_id}).scalar()
+    if not staff_can_view_grade(staff, learner_grade):
+        raise HTTPException(403, "Not authorized to view this learner")
+    db.execute(text("""
+        INSERT INTO report_card_comments (learner_id, year, term, subject, staff_id, comment)
+        VALUES (:lid, :year, :term, :subject, :sid, :comment)
+        ON DUPLICATE KEY UPDATE staff_id = VALUES(staff_id), comment = VALUES(comment)
+    """), {"lid": learner_id, "year": payload.year, "term": payload.term,
+           "subject": payload.subject.strip(), "sid": staff["staff_id"], "comment": payload.comment.strip()})
+    db.commit()
+    return {"success": True}
+
+
+@router.post("/report-cards/{grade}")
+def generate_grade_report_cards(
+    grade: int,
+    term: int,
+    year: Optional[int] = None,
+    db: Session = Depends(get_db),
+    staff: dict = Depends(get_current_staff)
+):
+    """
+    Render this year's term report cards for every learner in the grade
+    (term marks and the roster aren't kept per year). Queued as one
+    report-cards job; follow it on GET /report-cards/runs/{run_id} or the
+    report_cards_progress event. Cards land in the learner's documents.
+    """
+    if term not in TERM_MONTHS:
+        raise HTTPException(422, "term must be 1-4")
+    if not staff_can_view_grade(staff, grade):
+        raise HTTPException(403, "Not authorized for this grade")
+    year = year or datetime.now().year
+    try:
+        check_year(year)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+    run_id = create_report_card_run(db, grade, year, term, staff["id"],
+                                    principal_channel(staff))
+    job_id = enqueue_job(db, "report-cards", {"run_id": run_id})
+    db.commit()
+    job_runner.wake()
+    return {"success": True, "run_id": run_id, "job_id": job_id}
+
+
+@router.get("/report-cards/runs/{run_id}")
+def get_report_card_run(
+    run_id: int,
+    db: Session = Depends(get_db),
+    staff: dict = Depends(get_current_staff)
+):
+    run = db.execute(text("""
+        SELECT id, created_by, grade, year, term, status, total, rendered, failed, error,
+               created_at, started_at, finished_at
+        FROM report_card_runs WHERE id = :id
+    """), {"id": run_id}).fetchone()
+    if not run or not staff_can_view_grade(staff, run.grade):
+        raise HTTPException(404, "Report card run not found")
+    return FastJSONResponse(run)
+
+
+# ── TERM SETTINGS ──────────────────────────────────────────────────────────
+@router.put("/term-settings/{term}")
+def set_term_open(
+    term: int,
+    is_open: bool = Body(..., embed=True),
+    db: Session = Depends(get_db),
+    admin: dict = Depends(get_current_admin)
+):
+    """
+    Open or close a term for learner mark capture (admin only)
+    """
+    result = db.execute(text("""
+        UPDATE term_settings SET is_open = :open WHERE term = :term
+    """), {"open": is_open, "term": term})
+    if result.rowcount == 0 and not db.execute(
+        text("SELECT 1 FROM term_settings WHERE term = :term"), {"term": term}
+    ).fetchone():
+        raise HTTPException(404, "Unknown term")
+    bump_versions(db, "term-settings", [GLOBAL])
+    db.commit()
+
+    publish("all", "term_settings", {"term": term, "is_open": is_open})
+
+    return {"success": True, "term": term, "is_open": is_open}
+
+
+@router.get("/notifications")
+def get_class_notifications(
+    db: Session = Depends(get_db),
+    staff: dict = Depends(get_current_staff)
+):
+    """
+    Messages sent by this staff member, with delivery and read counts
+    """
     rows = db.execute(text("""
         SELECT
-            id,
-            title,
-            content,
-            target_grades,
-            created_at
-        FROM notifications
-        WHERE sender_name = :sender_name
-        ORDER BY created_at DESC
-    """), {"sender_name": sender_name}).fetchall()
+            n.id,
+            n.title,
+            n.content,
+            n.target_grades,
+            n.created_at,
+            COALESCE(ns.recipients, 0) AS recipients,
+            COALESCE(ns.read_count, 0) AS read_count
+        FROM notifications n
+        LEFT JOIN notification_stats ns ON ns.notification_id = n.id
+        WHERE n.sender_id = :sid
+        ORDER BY n.created_at DESC
+    """), {"sid": staff["id"]}).fetchall()
 
     return [dict(r._mapping) for r in rows]
 
 
+@router.get("/notifications/{notification_id}/non-readers")
+def get_notification_non_readers(
+    notification_id: int,
+    page: int = 1,
+    page_size: int = 50,
+    db: Session = Depends(get_db),
+    staff: dict = Depends(get_current_staff)
+):
+    """
+    Page through learners in the target grades who have not read a message
+    """
+    note = db.execute(text("""
+        SELECT n.target_grades, COALESCE(ns.recipients, 0) AS recipients,
+               COALESCE(ns.read_count, 0) AS read_count
+        FROM notifications n
+        LEFT JOIN notification_stats ns ON ns.notification_id = n.id
+        WHERE n.id = :nid AND n.sender_id = :sid
+    """), {"nid": notification_id, "sid": staff["id"]}).fetchone()
+
+    if not note:
+        raise HTTPException(404, "Message not found or not yours")
+
+    grades = [int(g) for g in (note.target_grades or "").split(",") if g.strip().isdigit()]
+    if not grades:
+        return {"total": 0, "page": page, "page_size": page_size, "learners": []}
+
+    page = max(page, 1)
+    page_size = max(1, min(page_size, 200))
+
+    rows = db.execute(text("""
+        SELECT r.user_id AS id, r.full_names, r.grade, r.email
+        FROM class_roster r
+        LEFT JOIN notification_reads nr
+               ON nr.notification_id = :nid AND nr.user_id = r.user_id AND nr.is_read = TRUE
+        WHERE r.grade IN :grades AND nr.user_id IS NULL
+        ORDER BY r.grade, r.full_names
+        LIMIT :limit OFFSET :offset
+    """).bindparams(bindparam("grades", expanding=True)), {
+        "nid": notification_id,
+        "grades": grades,
+        "limit": page_size,
+        "offset": (page - 1) * page_size
+    }).fetchall()
+
+    return {
+        "total": max(note.recipients - note.read_count, 0),
+        "page": page,
+        "page_size": page_size,
+        "learners": [dict(r._mapping) for r in rows]
+    }
+
+
 # ── NOTIFICATIONS ──────────────────────────────────────────────────────────
 @router.get("/staffnotifications")
 def get_staff_notifications(
@@ -713,7 +1433,7 @@ def get_staff_notifications(
     """)
     results = db.execute(query, {"sid": staff_id, "limit": limit}).fetchall()
 
-    return [dict(row._mapping) for row in results]
+    return FastJSONResponse(results)
 
 
 @router.patch("/staffnotifications/{nid}/read")
@@ -745,18 +1465,233 @@ class EmailRequest(BaseModel):
 @router.post("/send-email")
 def send_email(
     payload: EmailRequest,
+    db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-
-    success = send_brevo_email(
+    """
+    Queue the email; the outbox worker delivers it in the background.
+    """
+    outbox_id = enqueue_email(
+        db,
         payload.to,
         payload.subject,
         payload.html,
         name=current_user.get("name",""),
         reference=current_user.get("sub","")
     )
+    db.commit()
+    outbox_worker.wake()
+
+    return {"message": "Email queued", "id": outbox_id}
+
+
+class BulkEmailRequest(BaseModel):
+    audience: str                      # grade_learners | grade_parents
+    grades: List[int]
+    subject: str
+    title: str
+    message: str                       # HTML, may use $learner_name, $grade, ...
+    subtitle: Optional[str] = ""
+    type: str = "standard"             # email theme
+    button_text: Optional[str] = None
+    button_link: Optional[str] = None
+    regards: Optional[str] = None
+    preview: bool = False
+
+
+@router.post("/send-bulk-email")
+def send_bulk_email(
+    payload: BulkEmailRequest,
+    db: Session = Depends(get_db),
+    staff: dict = Depends(get_current_staff)
+):
+    """
+    Render one email per learner/parent in the selected grades (mail merge)
+    and queue them all. preview=true returns the first message instead.
+    """
+    if payload.audience not in AUDIENCES:
+        raise HTTPException(422, f"audience must be one of: {', '.join(AUDIENCES)}")
+    if payload.type not in EMAIL_THEMES:
+        raise HTTPException(422, f"type must be one of: {', '.join(EMAIL_THEMES)}")
+    if not payload.grades:
+        raise HTTPException(422, "Select at least one grade")
+
+    for g in payload.grades:
+        if not staff_can_view_grade(staff, g):
+            raise HTTPException(403, f"You cannot send to grade {g}")
+
+    messages = build_messages(
+        db, payload.audience, sorted(set(payload.grades)),
+        payload.subject, payload.title, payload.message,
+        reference=f"bulk:{staff['id']}",
+        subtitle=payload.subtitle,
+        theme=payload.type,
+        button_text=payload.button_text,
+        button_link=payload.button_link,
+        regards=payload.regards,
+    )
+
+    if payload.preview:
+        first = next(messages, None)
+        return {"preview": first, "merge_fields": MERGE_FIELDS}
+
+    queued = enqueue_emails(db, messages)
+    db.commit()
+    outbox_worker.wake()
+
+    return {"success": True, "queued": queued}
+
+
+# ── EXPORTS ────────────────────────────────────────────────────────────────
+# Streamed from server-side cursors; only one learner's row is in memory.
+def _parse_period(date_from: Optional[str], date_to: Optional[str]):
+    year = datetime.now().year
+    try:
+        start = datetime.strptime(date_from, "%Y-%m-%d").date() if date_from else datetime(year, 1, 1).date()
+        end = datetime.strptime(date_to, "%Y-%m-%d").date() if date_to else datetime(year, 12, 31).date()
+    except ValueError:
+        raise HTTPException(422, "Invalid date format. Use YYYY-MM-DD")
+    if end < start:
+        raise HTTPException(422, "date_to must be on or after date_from")
+    return start, end
+
+
+@router.get("/export/class-list")
+def export_class_list(
+    grade: int,
+    format: str = "csv",
+    staff: dict = Depends(get_current_staff)
+):
+    if not staff_can_view_grade(staff, grade):
+        raise HTTPException(403, "You are not assigned to this grade")
+
+    rows = stream_query("""
+        SELECT user_id, full_names, school, email
+        FROM class_roster
+        WHERE grade = :grade
+        ORDER BY full_names
+    """, {"grade": grade})
+
+    return export_response(
+        format, f"class_list_grade{grade}",
+        ["learner_id", "full_names", "school", "email"],
+        (list(row) for row in rows)
+    )
+
+
+@router.get("/export/attendance-register")
+def export_attendance_register(
+    grade: int,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    format: str = "csv",
+    db: Session = Depends(get_db),
+    staff: dict = Depends(get_current_staff)
+):
+    """
+    One row per learner, one column per class date, plus totals
+    """
+    if not staff_can_view_grade(staff, grade):
+        raise HTTPException(403, "You are not assigned to this grade")
 
-    if not success:
-        raise HTTPException(status_code=500, detail="Email failed")
+    start, end = _parse_period(date_from, date_to)
+    params = {"grade": grade, "start": start, "end": end}
 
-    return {"message": "Email sent successfully"}
\ No newline at end of file
+    dates = db.execute(text("""
+        SELECT DISTINCT class_date
+        FROM attendance_classes
+        WHERE grade = :grade AND class_date BETWEEN :start AND :end
+        ORDER BY class_date
+    """), params).scalars().all()
+
+    rows = stream_query("""
+        SELECT ac.user_id AS learner_id, u.full_names, u.school, ac.class_date, ac.status
+        FROM attendance_classes ac
+        JOIN users u ON u.id = ac.user_id
+        WHERE ac.grade = :grade AND ac.class_date BETWEEN :start AND :end
+        ORDER BY u.full_names, ac.user_id, ac.class_date
+    """, params)
+
+    register = pivot_by_learner(
+        rows, dates,
+        column_of=lambda r: r.class_date,
+        value_of=lambda r: r.status,
+        head_of=lambda r: [r.learner_id, r.full_names, r.school],
+    )
+
+    def with_totals():
+        for row in register:
+            statuses = row[3:]
+            yield row + [
+                statuses.count("Present"),
+                statuses.count("Absent"),
+                statuses.count("Apology"),
+            ]
+
+    return export_response(
+        format, f"attendance_grade{grade}_{start}_{end}",
+        ["learner_id", "full_names", "school", *dates, "present", "absent", "apology"],
+        with_totals()
+    )
+
+
+@router.get("/export/results")
+def export_results(
+    grade: int,
+    subject: str,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    format: str = "csv",
+    db: Session = Depends(get_db),
+    staff: dict = Depends(get_current_staff)
+):
+    """
+    Results matrix: one row per learner, one column per assessment
+    """
+    if not staff_can_view_grade(staff, grade):
+        raise HTTPException(403, "Not assigned to this grade")
+
+    start, end = _parse_period(date_from, date_to)
+
+    assessments = db.execute(text("""
+        SELECT id, name, date_written
+        FROM assessments
+        WHERE grade = :grade AND subject = :subject
+          AND date_written BETWEEN :start AND :end
+        ORDER BY date_written, id
+    """), {"grade": grade, "subject": subject.strip(), "start": start, "end": end}).fetchall()
+
+    assessment_ids = [a.id for a in assessments]
+    if not assessment_ids:
+        raise HTTPException(404, "No assessments in this period")
+
+    rows = stream_query(
+        text("""
+            SELECT r.user_id AS learner_id, r.full_names, r.school, am.assessment_id, am.percentage
+            FROM class_roster r
+            LEFT JOIN assessment_marks am
+                   ON am.learner_id = r.user_id AND am.assessment_id IN :aids
+            WHERE r.grade = :grade
+            ORDER BY r.full_names, r.user_id
+        """).bindparams(bindparam("aids", expanding=True)),
+        {"grade": grade, "aids": assessment_ids}
+    )
+
+    matrix = pivot_by_learner(
+        rows, assessment_ids,
+        column_of=lambda r: r.assessment_id,
+        value_of=lambda r: r.percentage,
+        head_of=lambda r: [r.learner_id, r.full_names, r.school or "N/A"],
+    )
+
+    def with_average():
+        for row in matrix:
+            marks = [m for m in row[3:] if m is not None]
+            yield row + [round(sum(marks) / len(marks), 1) if marks else None]
+
+    return export_response(
+        format, f"results_grade{grade}_{subject.strip().replace(' ', '_')}",
+        ["learner_id", "full_names", "school",
+         *[f"{a.name} ({a.date_written})" for a in assessments], "average"],
+        with_average()
+    )
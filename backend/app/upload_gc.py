@@ -0,0 +1,136 @@
+# app/upload_gc.py
+"""
+Mark-and-sweep for UPLOAD_DIR. Mark: stream every path referenced by
+learner_documents and learner_term_marks into a set of 64-bit digests.
+Sweep: walk the tree with os.scandir and move unreferenced files older
+than the grace period to the quarantine dir (or delete them). Quarantined
+files are purged after UPLOAD_GC_QUARANTINE_DAYS.
+"""
+import hashlib
+import os
+import shutil
+import time
+from typing import Iterator, Set, Tuple
+from .config import UPLOAD_DIR, UPLOAD_QUARANTINE_DIR, UPLOAD_GC_GRACE_HOURS, UPLOAD_GC_QUARANTINE_DAYS
+from .exports import stream_query
+
+
+# Referenced paths, relative to UPLOAD_DIR
+REFERENCE_QUERIES = (
+    "SELECT file_path FROM learner_documents WHERE file_path IS NOT NULL",
+    "SELECT report_path FROM learner_term_marks WHERE report_path IS NOT NULL",
+)
+
+
+def _digest(rel_path: str) -> int:
+    # 8 bytes per path instead of a full string. A collision can only keep
+    # an orphan alive, never delete a referenced file.
+    normalized = os.path.normpath(rel_path.strip().lstrip("/")).replace(os.sep, "/")
+    return int.from_bytes(hashlib.blake2b(normalized.encode(), digest_size=8).digest(), "big")
+
+
+def referenced_paths() -> Set[int]:
+    marked = set()
+    for sql in REFERENCE_QUERIES:
+        for row in stream_query(sql, {}):
+            if row[0]:
+                marked.add(_digest(row[0]))
+    return marked
+
+
+def _walk(root: str) -> Iterator[Tuple[str, os.DirEntry]]:
+    """(path relative to root, entry) for every regular file, depth first."""
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            with os.scandir(os.path.join(root, rel_dir)) as it:
+                for entry in it:
+                    rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(rel)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield rel, entry
+        except FileNotFoundError:
+            continue
+
+
+def _purge_quarantine(cutoff: float, deadline: float, stats: dict) -> None:
+    if not os.path.isdir(UPLOAD_QUARANTINE_DIR):
+        return
+    for rel, entry in _walk(UPLOAD_QUARANTINE_DIR):
+        if time.monotonic() > deadline:
+            stats["complete"] = False
+            return
+        try:
+            st = entry.stat(follow_symlinks=False)
+            if st.st_mtime < cutoff:
+                os.remove(entry.path)
+                stats["purged"] += 1
+                stats["bytes_purged"] += st.st_size
+        except OSError as e:
+            stats["errors"] += 1
+            print(f"Upload GC: could not purge {rel}: {e}")
+
+
+def sweep_uploads(dry_run: bool = False, delete: bool = False,
+                  grace_hours: float = UPLOAD_GC_GRACE_HOURS, max_seconds: float = 300) -> dict:
+    """
+    Quarantine (or with delete=True remove) unreferenced upload files whose
+    mtime is older than grace_hours. The grace period covers uploads whose
+    DB row hasn't committed yet. Stops after max_seconds and reports
+    complete=False; files already moved are not revisited next run.
+    """
+    started = time.monotonic()
+    deadline = started + max_seconds
+    now = time.time()
+    cutoff = now - grace_hours * 3600
+
+    marked = referenced_paths()
+    stats = {
+        "referenced": len(marked), "scanned": 0, "orphans": 0, "too_new": 0,
+        "quarantined": 0, "deleted": 0, "bytes_reclaimed": 0,
+        "purged": 0, "bytes_purged": 0, "errors": 0,
+        "dry_run": dry_run, "complete": True,
+    }
+
+    for rel, entry in _walk(UPLOAD_DIR):
+        if time.monotonic() > deadline:
+            stats["complete"] = False
+            break
+        stats["scanned"] += 1
+        if _digest(rel) in marked:
+            continue
+        try:
+            st = entry.stat(follow_symlinks=False)
+        except OSError:
+            continue
+        if st.st_mtime >= cutoff:
+            stats["too_new"] += 1
+            continue
+
+        stats["orphans"] += 1
+        stats["bytes_reclaimed"] += st.st_size
+        if dry_run:
+            continue
+        try:
+            if delete:
+                os.remove(entry.path)
+                stats["deleted"] += 1
+            else:
+                target = os.path.join(UPLOAD_QUARANTINE_DIR, rel)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(entry.path, target)
+                # mtime now marks when it was quarantined, for the purge
+                os.utime(target, (now, now))
+                stats["quarantined"] += 1
+        except OSError as e:
+            stats["errors"] += 1
+            stats["bytes_reclaimed"] -= st.st_size
+            print(f"Upload GC: could not remove {rel}: {e}")
+
+    if not dry_run and stats["complete"]:
+        _purge_quarantine(now - UPLOAD_GC_QUARANTINE_DAYS * 86400, deadline, stats)
+
+    stats["seconds"] = round(time.monotonic() - started, 2)
+    return stats
@@ -0,0 +1,164 @@
+# app/versioning.py
+import re
+import zlib
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy import text, bindparam
+from starlette.concurrency import run_in_threadpool
+from .database import engine, read_session
+from .auth.dependencies import decode_token
+from .cache import cache, MISS
+
+
+GLOBAL = 0  # data_versions.user_id for stamps shared by everyone
+
+PARENT_CHILD_TTL = 300  # seconds
+
+
+def bump_versions(db: Session, resource: str, user_ids: Iterable[int]) -> None:
+    """
+    Mark resource as changed for these users. Call inside the write's
+    transaction, before commit.
+    """
+    rows = [{"uid": int(uid), "res": resource} for uid in set(user_ids)]
+    if not rows:
+        return
+    db.execute(text("""
+        INSERT INTO data_versions (user_id, resource, version)
+        VALUES (:uid, :res, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+    """), rows)
+
+
+def _read_versions(keys: List[Tuple[int, str]], authorization: str = "") -> List[int]:
+    users = sorted({uid for uid, _ in keys})
+    resources = sorted({res for _, res in keys})
+    # Same database the route will read from: stamps commit with the data,
+    # so a lagging replica yields an older ETag, never a newer one
+    with read_session(authorization) as conn:
+        rows = conn.execute(text("""
+            SELECT user_id, resource, version
+            FROM data_versions
+            WHERE user_id IN :users AND resource IN :resources
+        """).bindparams(
+            bindparam("users", expanding=True),
+            bindparam("resources", expanding=True),
+        ), {"users": users, "resources": resources}).fetchall()
+    found = {(r.user_id, r.resource): r.version for r in rows}
+    return [found.get(key, 0) for key in keys]
+
+
+def _child_of_parent(parent_id: int) -> Optional[int]:
+    key, tags = f"etag-parent-child:{parent_id}", [f"parent:{parent_id}"]
+    child = cache.get(key, tags, name="etag-parent-child")
+    if child is not MISS:
+        return child
+    with engine.connect() as conn:
+        child = conn.execute(text("SELECT user_id FROM parents WHERE id = :pid"),
+                             {"pid": parent_id}).scalar()
+    # Unknown parents are not cached
+    if child is not None:
+        cache.set(key, child, PARENT_CHILD_TTL, tags)
+    return child
+
+
+# path regex -> (role, resources). Resources are (scope, name): scope
+# "self" is the learner the data belongs to (the parent's child for parent
+# routes), "global" is user_id 0.
+VERSIONED_ROUTES: List[Tuple[re.Pattern, str, List[Tuple[str, str]]]] = [
+    (re.compile(r"^/api/learner/profile$"), "Learner", [("self", "profile")]),
+    (re.compile(r"^/api/learner/assessments$"), "Learner", [("self", "assessments")]),
+    (re.compile(r"^/api/learner/attendance(/summary)?$"), "Learner", [("self", "attendance")]),
+    (re.compile(r"^/api/learner/warnings$"), "Learner", [("self", "warnings")]),
+    (re.compile(r"^/api/learner/term-marks/(\d+)$"), "Learner",
+     [("self", "term-marks"), ("global", "term-settings")]),
+    (re.compile(r"^/api/parent/assessments$"), "Parent", [("self", "assessments")]),
+    (re.compile(r"^/api/parent/attendance(/summary)?$"), "Parent", [("self", "attendance")]),
+    (re.compile(r"^/api/parent/warnings$"), "Parent", [("self", "warnings")]),
+]
+
+
+def _etag_for(path: str, query: bytes, headers: Dict[str, str]) -> Optional[str]:
+    """
+    ETag for a versioned GET, from the stamps alone (no main query).
+    None when the route isn't versioned or the caller can't be resolved.
+    """
+    for pattern, role, resources in VERSIONED_ROUTES:
+        if pattern.match(path):
+            break
+    else:
+        return None
+
+    auth = headers.get("authorization", "")
+    if not auth.lower().startswith("bearer "):
+        return None
+    try:
+        user = decode_token(auth[7:])
+    except HTTPException:
+        return None
+    if user.get("role") != role:
+        return None
+
+    learner_id = int(user["sub"])
+    if role == "Parent":
+        learner_id = _child_of_parent(learner_id)
+        if learner_id is None:
+            return None
+
+    keys = [(learner_id if scope == "self" else GLOBAL, name) for scope, name in resources]
+    versions = _read_versions(keys, auth)
+    # Day stamp bounds staleness for writes made outside the API
+    stamp = "-".join(str(v) for v in versions)
+    etag = f"{learner_id}-{stamp}-{date.today():%Y%m%d}"
+    if query:
+        # ?year= etc. select a different body under the same stamps
+        etag += f"-{zlib.crc32(query):08x}"
+    return f'W/"{etag}"'
+
+
+class ConditionalGetMiddleware:
+    """
+    Answers If-None-Match on versioned GETs with 304 before the route runs,
+    and adds the ETag to full 200 responses.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+        if not any(pattern.match(path) for pattern, _, _ in VERSIONED_ROUTES):
+            return await self.app(scope, receive, send)
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        try:
+            etag = await run_in_threadpool(_etag_for, path, scope.get("query_string", b""), headers)
+        except Exception as e:
+            print(f"ETag lookup failed for {path}: {e}")
+            etag = None
+
+        if etag is None:
+            return await self.app(scope, receive, send)
+
+        cache_headers = [
+            (b"etag", etag.encode("latin-1")),
+            (b"cache-control", b"private, no-cache"),
+        ]
+
+        if etag in [t.strip() for t in headers.get("if-none-match", "").split(",")]:
+            await send({"type": "http.response.start", "status": 304, "headers": cache_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + cache_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
@@ -0,0 +1,94 @@
+# benchmarks/bench_exports.py
+"""
+Streaming export benchmark on a synthetic 10k-learner year.
+
+Feeds synthetic cursor rows through the same pivot + CSV/XLSX writers the
+/api/staff/export/* routes use, and reports time, bytes and peak Python
+memory. Peak memory should stay flat as the learner count grows.
+
+    cd backend
+    python -m benchmarks.bench_exports [--learners 10000] [--days 80] [--assessments 40]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import date, timedelta
+
+from app.exports import csv_stream, xlsx_stream, pivot_by_learner
+
+AttendanceRow = namedtuple("AttendanceRow", "learner_id full_names school class_date status")
+MarkRow = namedtuple("MarkRow", "learner_id full_names school assessment_id percentage")
+STATUSES = ["Present"] * 8 + ["Absent", "Apology"]
+
+
+def attendance_rows(learners, dates, rng):
+    for lid in range(1, learners + 1):
+        name = f"Learner {lid:05d}"
+        for d in dates:
+            yield AttendanceRow(lid, name, "Synthetic High", d, rng.choice(STATUSES))
+
+
+def mark_rows(learners, assessment_ids, rng):
+    for lid in range(1, learners + 1):
+        name = f"Learner {lid:05d}"
+        for aid in assessment_ids:
+            yield MarkRow(lid, name, "Synthetic High", aid, round(rng.uniform(20, 100), 1))
+
+
+def measure(label, chunks):
+    tracemalloc.start()
+    started = time.perf_counter()
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<32} {elapsed:8.2f}s {total / 1e6:10.1f} MB out {peak / 1e6:8.2f} MB peak")
+
+
+def run(learners, days, assessments, seed=42):
+    rng = random.Random(seed)
+    start = date(date.today().year, 1, 15)
+    dates = [start + timedelta(days=3 * i) for i in range(days)]
+    assessment_ids = list(range(1, assessments + 1))
+
+    print(f"\n{learners} learners, {days} class dates, {assessments} assessments")
+
+    for fmt, writer in (("csv", csv_stream), ("xlsx", xlsx_stream)):
+        register = pivot_by_learner(
+            attendance_rows(learners, dates, rng), dates,
+            column_of=lambda r: r.class_date,
+            value_of=lambda r: r.status,
+            head_of=lambda r: [r.learner_id, r.full_names, r.school],
+        )
+        measure(f"attendance register ({fmt})",
+                writer(["learner_id", "full_names", "school", *dates], register))
+
+        matrix = pivot_by_learner(
+            mark_rows(learners, assessment_ids, rng), assessment_ids,
+            column_of=lambda r: r.assessment_id,
+            value_of=lambda r: r.percentage,
+            head_of=lambda r: [r.learner_id, r.full_names, r.school],
+        )
+        measure(f"results matrix ({fmt})",
+                writer(["learner_id", "full_names", "school", *assessment_ids], matrix))
+
+        class_list = ([lid, f"Learner {lid:05d}", "Synthetic High", f"l{lid}@example.com"]
+                      for lid in range(1, learners + 1))
+        measure(f"class list ({fmt})",
+                writer(["learner_id", "full_names", "school", "email"], class_list))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--learners", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=80)
+    parser.add_argument("--assessments", type=int, default=40)
+    args = parser.parse_args()
+
+    # Small run first so flat memory is visible side by side
+    run(max(args.learners // 10, 1), args.days, args.assessments)
+    run(args.learners, args.days, args.assessments)
@@ -0,0 +1,139 @@
+# benchmarks/bench_json.py
+"""
+JSON encoding + compression benchmark for the largest learner and staff
+responses.
+
+Builds real SQLAlchemy rows (in-memory SQLite, typed so Decimal/date come
+back as they do from MySQL) and encodes them two ways:
+
+  old   dict(row._mapping) -> jsonable_encoder -> JSONResponse (stdlib json)
+  new   FastJSONResponse(rows) (orjson, rows encoded directly)
+
+then reports encode time and bytes on the wire raw / gzip / brotli.
+
+    cd backend
+    python -m benchmarks.bench_json [--learners 60] [--repeat 200]
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import Date, DateTime, Numeric, create_engine, text
+
+from app.compression import brotli, compress_body
+from app.responses import FastJSONResponse
+
+STATUSES = ["Present"] * 8 + ["Absent", "Apology"]
+SUBJECTS = ["Mathematics", "Physical Sciences", "English", "Life Sciences"]
+LOREM = (
+    "Learners worked through past paper questions in groups and then "
+    "presented their answers to the class. "
+)
+
+
+def build_rows(learners, rng):
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE attendance (class_date TEXT, status TEXT, apology_message TEXT, recorded_at TEXT)"))
+        conn.execute(text("CREATE TABLE marks (assessment_name TEXT, subject TEXT, date_written TEXT, mark REAL)"))
+        conn.execute(text("""
+            CREATE TABLE reports (id INTEGER, class_name TEXT, session_date TEXT, subject TEXT, topic TEXT,
+                                  description TEXT, positives TEXT, negatives TEXT, comments TEXT, created_at TEXT)
+        """))
+
+        start = date(date.today().year, 1, 15)
+        conn.execute(text("INSERT INTO attendance VALUES (:d, :s, :a, :r)"), [{
+            "d": (start + timedelta(days=i)).isoformat(),
+            "s": rng.choice(STATUSES),
+            "a": None,
+            "r": datetime.combine(start + timedelta(days=i), datetime.min.time()).isoformat(sep=" "),
+        } for i in range(200)])
+        conn.execute(text("INSERT INTO marks VALUES (:n, :s, :d, :m)"), [{
+            "n": f"Test {i}",
+            "s": rng.choice(SUBJECTS),
+            "d": (start + timedelta(days=2 * i)).isoformat(),
+            "m": round(rng.uniform(20, 100), 2),
+        } for i in range(120)])
+        conn.execute(text("INSERT INTO reports VALUES (:i, 'Grade 11', :d, :s, 'Revision', :t, :t, :t, :t, :c)"), [{
+            "i": i,
+            "d": (start + timedelta(days=i)).isoformat(),
+            "s": rng.choice(SUBJECTS),
+            "t": LOREM * 3,
+            "c": datetime.combine(start + timedelta(days=i), datetime.min.time()).isoformat(sep=" "),
+        } for i in range(200)])
+
+    with engine.connect() as conn:
+        attendance = conn.execute(text("SELECT * FROM attendance").columns(
+            class_date=Date, recorded_at=DateTime)).fetchall()
+        marks = conn.execute(text("SELECT * FROM marks").columns(
+            date_written=Date, mark=Numeric(5, 2, asdecimal=True))).fetchall()
+        reports = conn.execute(text("SELECT * FROM reports").columns(
+            session_date=Date, created_at=DateTime)).fetchall()
+
+    # /api/staff/assessments/results: nested dicts, Decimal marks
+    results = [{
+        "id": lid,
+        "full_names": f"Learner {lid:03d}",
+        "school": "Synthetic High",
+        "monthly_average": round(rng.uniform(30, 95), 1),
+        "assessments": [{
+            "name": f"Test {a}",
+            "average": Decimal(f"{rng.uniform(40, 80):.2f}"),
+            "percentage": Decimal(f"{rng.uniform(20, 100):.2f}"),
+        } for a in range(12)],
+    } for lid in range(learners)]
+
+    return {
+        "learner /attendance (200 rows)": attendance,
+        "learner /assessments (120 rows)": marks,
+        "staff /session-reports (200 rows)": reports,
+        f"staff /assessments/results ({learners}x12)": results,
+    }
+
+
+def old_encode(content):
+    if content and not isinstance(content[0], dict):
+        content = [dict(row._mapping) for row in content]
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def new_encode(content):
+    return FastJSONResponse(content).body
+
+
+def timed(fn, content, repeat):
+    fn(content)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        body = fn(content)
+    return (time.perf_counter() - started) / repeat * 1e6, body
+
+
+def run(learners, repeat, seed=42):
+    rng = random.Random(seed)
+    payloads = build_rows(learners, rng)
+
+    header = f"{'response':<38} {'old µs':>9} {'new µs':>9} {'speedup':>8} {'raw B':>9} {'gzip B':>9} {'br B':>9}"
+    print(header)
+    print("-" * len(header))
+    for label, content in payloads.items():
+        old_us, old_body = timed(old_encode, content, repeat)
+        new_us, new_body = timed(new_encode, content, repeat)
+        assert len(new_body) <= len(old_body) + 16, "encoders disagree on payload size"
+
+        gz = len(compress_body(new_body, "gzip"))
+        br = len(compress_body(new_body, "br")) if brotli is not None else None
+        print(f"{label:<38} {old_us:9.0f} {new_us:9.0f} {old_us / new_us:7.1f}x "
+              f"{len(new_body):9d} {gz:9d} {br if br is not None else 'n/a':>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--learners", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run(args.learners, args.repeat)
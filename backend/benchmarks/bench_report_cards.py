@@ -0,0 +1,76 @@
+# benchmarks/bench_report_cards.py
+"""
+Report card rendering benchmark on synthetic cards.
+
+Builds card dicts shaped like gather_report_cards' output and times
+render_chunk over the whole grade, first in this process and then in a
+spawn process pool the way the report-cards job runs it. Files go to a
+temporary directory.
+
+    cd backend
+    python -m benchmarks.bench_report_cards [--learners 300] [--workers 0] [--html]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.report_card_render import HTML, render_chunk
+
+SUBJECTS = ["Mathematics", "Physical Sciences", "English", "Life Sciences", "Geography"]
+CHUNK_SIZE = 25
+
+
+def cards(n, rng):
+    for i in range(1, n + 1):
+        assessments = [{
+            "subject": s, "name": f"{s} test {k}", "date_written": f"2026-0{4 + k}-1{k}",
+            "percentage": float(rng.randrange(25, 100)), "class_average": 61.5,
+        } for s in SUBJECTS for k in range(1, 3)]
+        yield {
+            "user_id": i, "full_names": f"Learner {i}", "bokamoso_number": f"BOK{i:05d}",
+            "school": "Ikageng High", "grade": 11, "year": 2026, "term": 2,
+            "date_from": "2026-04-01", "date_to": "2026-06-30",
+            "assessments": assessments,
+            "programme_average": round(sum(a["percentage"] for a in assessments) / len(assessments), 1),
+            "attendance": {"present": 20, "absent": 2, "apology": 1, "rate": 90.9},
+            "term_marks": {s: rng.randrange(30, 99) for s in SUBJECTS},
+            "comments": [{"subject": "Mathematics", "comment": "Keep it up.", "staff_name": "T. Tutor"}],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--learners", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=0, help="0 = one per CPU")
+    parser.add_argument("--html", action="store_true", help="skip PDF even if WeasyPrint is installed")
+    args = parser.parse_args()
+
+    grade = list(cards(args.learners, random.Random(7)))
+    chunks = [grade[i:i + CHUNK_SIZE] for i in range(0, len(grade), CHUNK_SIZE)]
+    pdf = not args.html
+    workers = args.workers or os.cpu_count() or 1
+    print(f"{len(grade)} cards, {'PDF' if pdf and HTML is not None else 'HTML'}, {workers} workers")
+
+    with tempfile.TemporaryDirectory() as root:
+        started = time.perf_counter()
+        for chunk in chunks:
+            render_chunk(chunk, root, "serial", pdf)
+        serial = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = [r for rs in pool.map(render_chunk, chunks, [root] * len(chunks),
+                                            ["pool"] * len(chunks), [pdf] * len(chunks)) for r in rs]
+        pooled = time.perf_counter() - started
+
+    failed = sum(1 for _, path, _ in results if not path)
+    print(f"  in process   {serial * 1000:8.1f} ms")
+    print(f"  process pool {pooled * 1000:8.1f} ms  ({failed} failed)")
+
+
+if __name__ == "__main__":
+    main()
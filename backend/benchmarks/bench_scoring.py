@@ -0,0 +1,63 @@
+# benchmarks/bench_scoring.py
+"""
+Admissions scoring benchmark on synthetic applications.
+
+Builds application rows shaped like create_application's (subject t2/t4
+marks as JSON), then times the two halves of a grade rescore: unpacking
+the JSON into columns, and scoring + eligibility over the columns.
+
+    cd backend
+    python -m benchmarks.bench_scoring [--applicants 5000] [--repeat 20]
+"""
+import argparse
+import json
+import random
+import time
+from collections import namedtuple
+
+from app.application_scoring import DEFAULT_CONFIG, build_columns, score_columns
+
+Row = namedtuple("Row", "id app_id user_id year grade data")
+SUBJECTS = ["Mathematics", "Physical Sciences", "English", "Life Orientation", "Setswana",
+            "Life Sciences", "Geography"]
+
+
+def applications(n, rng):
+    for i in range(1, n + 1):
+        subjects = {s: {"t2": str(rng.randrange(20, 99)), "t4": str(rng.randrange(20, 99))} for s in SUBJECTS}
+        if rng.random() < 0.02:
+            del subjects["Mathematics"]
+        data = {"englishLevel": rng.choice(["Home Language", "First Additional Language"]),
+                "otherLanguage": "Setswana", "subjects": subjects, "documents": [], "electives": []}
+        yield Row(i, f"APP-26-{i:06d}", i, 2026, 11, json.dumps(data))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--applicants", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = list(applications(args.applicants, random.Random(7)))
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        cols = build_columns(rows)
+    unpack_ms = (time.perf_counter() - started) / args.repeat * 1000
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        result = score_columns(cols, DEFAULT_CONFIG)
+    score_ms = (time.perf_counter() - started) / args.repeat * 1000
+
+    eligible = sum(result["eligible"])
+    print(f"{args.applicants} applicants, {eligible} eligible")
+    print(f"  unpack JSON -> columns  {unpack_ms:8.1f} ms")
+    print(f"  score + eligibility     {score_ms:8.1f} ms")
+    top = sorted(range(len(cols)), key=lambda i: (-result["eligible"][i], -result["score"][i]))[:3]
+    for i in top:
+        print(f"  {cols.app_id[i]}  {result['score'][i]:6.2f}  {result['breakdown'][i]}")
+
+
+if __name__ == "__main__":
+    main()
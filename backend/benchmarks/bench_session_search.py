@@ -0,0 +1,124 @@
+# benchmarks/bench_session_search.py
+"""
+Session report search latency on a multi-year synthetic corpus.
+
+Seeds synthetic staff_session_reports rows (tagged with comments
+'[bench]') into a scratch MySQL database that already has the
+staff table and the FULLTEXT indexes from "added dql.sql", then times
+search_session_reports() for a mix of queries.
+
+    cd backend
+    python -m benchmarks.bench_session_search --database-url mysql+pymysql://... \
+        [--years 4] [--per-day 40] [--runs 50] [--cleanup]
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.session_search import search_session_reports
+
+SUBJECTS = ["Mathematics", "Physical Sciences", "Accounting", "English"]
+TOPICS = [
+    "quadratic equations", "trigonometric identities", "Newton's laws", "stoichiometry",
+    "electric circuits", "probability", "financial statements", "essay structure",
+    "calculus differentiation", "organic chemistry", "momentum and impulse", "analytical geometry",
+]
+POSITIVES = [
+    "learners were engaged", "good participation", "homework completed",
+    "strong questions from the class", "improved test preparation",
+]
+NEGATIVES = [
+    "learners arrived late", "calculators missing", "load shedding interrupted the session",
+    "homework not done", "struggled with fractions", "low attendance", "noisy venue",
+]
+QUERIES = [
+    ("quadratic equations", "all"), ("load shedding", "negatives"), ("calculators", "negatives"),
+    ("stoichiometry", "topic"), ("participation", "positives"), ("late homework", "all"),
+]
+
+
+def seed(session, years, per_day, rng):
+    staff_ids = [r[0] for r in session.execute(text("SELECT id FROM staff LIMIT 50"))]
+    if not staff_ids:
+        raise SystemExit("No staff rows in the target database - seed staff first")
+
+    start = date(date.today().year - years + 1, 1, 1)
+    rows = []
+    day = start
+    while day <= date.today():
+        if day.weekday() < 5:
+            for _ in range(per_day):
+                rows.append({
+                    "sid": rng.choice(staff_ids),
+                    "cn": str(rng.choice([10, 11, 12])),
+                    "sd": day,
+                    "sub": rng.choice(SUBJECTS),
+                    "topic": rng.choice(TOPICS),
+                    "desc": " ".join(rng.sample(TOPICS, 3)),
+                    "pos": rng.choice(POSITIVES),
+                    "neg": rng.choice(NEGATIVES),
+                    "comm": "[bench] " + rng.choice(NEGATIVES + POSITIVES),
+                })
+        if len(rows) >= 5000:
+            _insert(session, rows)
+            rows = []
+        day += timedelta(days=1)
+    if rows:
+        _insert(session, rows)
+    session.commit()
+
+
+def _insert(session, rows):
+    session.execute(text("""
+        INSERT INTO staff_session_reports
+        (staff_id, class_name, session_date, subject, topic, description, positives, negatives, comments)
+        VALUES (:sid, :cn, :sd, :sub, :topic, :desc, :pos, :neg, :comm)
+    """), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--years", type=int, default=4)
+    parser.add_argument("--per-day", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--cleanup", action="store_true")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    session = sessionmaker(bind=engine)()
+    rng = random.Random(7)
+
+    if not args.skip_seed:
+        started = time.perf_counter()
+        seed(session, args.years, args.per_day, rng)
+        print(f"seeded in {time.perf_counter() - started:.1f}s")
+
+    total = session.execute(text("SELECT COUNT(*) FROM staff_session_reports")).scalar()
+    print(f"corpus: {total} reports")
+
+    for q, field in QUERIES:
+        for filters in ({}, {"grade": 11, "subject": "Mathematics"}):
+            timings = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                search_session_reports(session, q, field, **filters)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            label = f"{q!r} [{field}]" + (" +filters" if filters else "")
+            print(f"{label:<44} p50 {statistics.median(timings):7.2f} ms  p95 {p95:7.2f} ms")
+
+    if args.cleanup:
+        session.execute(text("DELETE FROM staff_session_reports WHERE comments LIKE '[bench]%'"))
+        session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+# benchmarks/load.py
+"""
+Portal load scenarios against a running API on the seeded dataset.
+
+Scenarios:
+  login_storm         admin opens a term, then learners all log in and
+                      open their term marks at once
+  dashboards          learner, parent and staff landing pages
+  attendance_capture  staff load a class list and capture a register
+  results_matrix      staff open the monthly assessment results grid
+
+Reports p50/p95/p99 latency and throughput per request type, and DB
+statements per request (from /metrics). --save-baseline stores the run;
+--baseline compares against a stored run and exits 1 on regressions.
+
+    # API pointed at the seeded database (see benchmarks/seed.py). One
+    # worker, so /metrics statement counts cover every request.
+    cd backend
+    uvicorn app.main:app --port 8000
+    python -m benchmarks.load --base-url http://127.0.0.1:8000 [--users 200] [--concurrency 20] \
+        [--learners 3000] [--scenarios login_storm,dashboards] \
+        [--baseline benchmarks/baseline.json] [--save-baseline PATH]
+"""
+import argparse
+import gzip
+import json
+import random
+import re
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from benchmarks.seed import GRADES, PASSWORD, SUBJECTS
+
+TERM = 2
+
+
+# ── HTTP ───────────────────────────────────────────────────────────────────
+class Client:
+    """urllib client that records latency per request label."""
+
+    def __init__(self, base_url: str, metrics_token: str = ""):
+        self.base_url = base_url.rstrip("/")
+        self.metrics_token = metrics_token
+        self.samples = defaultdict(list)   # label -> [ms]
+        self.errors = defaultdict(int)     # label -> count
+        self._lock = threading.Lock()
+
+    def call(self, label, method, path, token=None, body=None, record=True):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        request.add_header("Accept-Encoding", "gzip")
+        if data is not None:
+            request.add_header("Content-Type", "application/json")
+        if token:
+            request.add_header("Authorization", f"Bearer {token}")
+
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                payload = response.read()
+                status = response.status
+                if response.headers.get("Content-Encoding") == "gzip":
+                    payload = gzip.decompress(payload)
+        except urllib.error.HTTPError as e:
+            payload, status = e.read(), e.code
+        except OSError:
+            payload, status = b"", 0
+        elapsed = (time.perf_counter() - started) * 1000
+
+        if record:
+            with self._lock:
+                self.samples[label].append(elapsed)
+                if not 200 <= status < 400:
+                    self.errors[label] += 1
+        if status == 200 and payload:
+            try:
+                return json.loads(payload)
+            except ValueError:
+                return None
+        return None
+
+    def login(self, identifier, record=False):
+        result = self.call("POST /api/login", "POST", "/api/login",
+                           body={"identifier": identifier, "password": PASSWORD}, record=record)
+        if not result or "token" not in result:
+            raise SystemExit(f"Login failed for {identifier} - is the API using the seeded database?")
+        return result["token"]
+
+    def db_queries(self):
+        """(statements, requests) summed over routes, from /metrics."""
+        request = urllib.request.Request(self.base_url + "/metrics")
+        if self.metrics_token:
+            request.add_header("Authorization", f"Bearer {self.metrics_token}")
+        with urllib.request.urlopen(request, timeout=30) as response:
+            body = response.read().decode()
+        total = count = 0.0
+        for line in body.splitlines():
+            match = re.match(r'http_request_db_queries_(sum|count)\{route="([^"]*)"\} (\S+)', line)
+            if match and match.group(2) != "/metrics":
+                if match.group(1) == "sum":
+                    total += float(match.group(3))
+                else:
+                    count += float(match.group(3))
+        return total, count
+
+
+class Tokens:
+    """Logs actors in once (untimed) and reuses their tokens."""
+
+    def __init__(self, client, concurrency):
+        self.client, self.concurrency, self._cache = client, concurrency, {}
+
+    def get(self, identifiers):
+        missing = [i for i in identifiers if i not in self._cache]
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            for ident, token in zip(missing, pool.map(self.client.login, missing)):
+                self._cache[ident] = token
+        return [self._cache[i] for i in identifiers]
+
+
+def learner_ids(n, population, rng):
+    return [f"BOK{i:05d}" for i in rng.sample(range(1, population + 1), min(n, population))]
+
+
+def staff_ids(n):
+    return [f"BET{i:03d}" for i in range(3, 3 + n)]  # teachers/tutors
+
+
+# ── SCENARIOS ──────────────────────────────────────────────────────────────
+def login_storm(client, tokens, users, population, rng):
+    admin = tokens.get(["ADM001"])[0]
+    client.call("PUT /term-settings", "PUT", f"/api/staff/term-settings/{TERM}", admin,
+                body={"is_open": True}, record=False)
+
+    def learner(identifier):
+        token = client.login(identifier, record=True)
+        client.call("GET /learner/term-marks", "GET", f"/api/learner/term-marks/{TERM}", token)
+        client.call("GET /learner/profile", "GET", "/api/learner/profile", token)
+
+    return [lambda i=i: learner(i) for i in learner_ids(users, population, rng)]
+
+
+def dashboards(client, tokens, users, population, rng):
+    learners = tokens.get(learner_ids(users, population, rng))
+    parents = tokens.get([f"PAR{i:05d}" for i in rng.sample(range(1, population + 1), max(users // 2, 1))])
+    staff = tokens.get(staff_ids(min(20, users)))
+
+    def learner(token):
+        for path in ("profile", "assessments", "attendance", "notifications", "warnings"):
+            client.call(f"GET /learner/{path}", "GET", f"/api/learner/{path}", token)
+
+    def parent(token):
+        for path in ("profile", "assessments", "attendance", "warnings"):
+            client.call(f"GET /parent/{path}", "GET", f"/api/parent/{path}", token)
+
+    def teacher(token):
+        profile = client.call("GET /staff/profile", "GET", "/api/staff/profile", token) or {}
+        client.call("GET /staff/notifications", "GET", "/api/staff/notifications", token)
+        grade = (profile.get("grades") or "10").split(",")[0]
+        client.call("GET /staff/learners", "GET", f"/api/staff/learners?grade={grade}", token)
+
+    jobs = [lambda t=t: learner(t) for t in learners]
+    jobs += [lambda t=t: parent(t) for t in parents]
+    jobs += [lambda t=t: teacher(t) for t in staff]
+    rng.shuffle(jobs)
+    return jobs
+
+
+def attendance_capture(client, tokens, users, population, rng):
+    admin = tokens.get(["ADM001"])[0]
+    # Admins can capture for any grade; one register per job on past Mondays
+    # (not seeded class days) so every capture writes fresh rows
+    monday = date.today() - timedelta(days=date.today().weekday() or 7)
+
+    def capture(n):
+        grade = GRADES[n % len(GRADES)]
+        class_date = (monday - timedelta(weeks=n // len(GRADES))).isoformat()
+        learners = client.call("GET /staff/learners", "GET", f"/api/staff/learners?grade={grade}", admin) or []
+        register = [{"learner_id": l["id"], "status": rng.choice(["Present"] * 9 + ["Absent"])} for l in learners]
+        client.call("POST /staff/attendance/capture", "POST", "/api/staff/attendance/capture", admin,
+                    body={"grade": grade, "class_date": class_date, "attendance": register})
+
+    return [lambda n=n: capture(n) for n in range(max(users // 10, 3))]
+
+
+def results_matrix(client, tokens, users, population, rng):
+    admin = tokens.get(["ADM001"])[0]
+
+    def results():
+        grade, subject = rng.choice(GRADES), rng.choice(SUBJECTS)
+        month = rng.choice([2, 5, 8, 11])
+        client.call("GET /staff/assessments/results", "GET",
+                    f"/api/staff/assessments/results?grade={grade}&month={month}&subject={subject.replace(' ', '%20')}",
+                    admin)
+
+    return [results for _ in range(max(users // 4, 5))]
+
+
+SCENARIOS = {
+    "login_storm": login_storm,
+    "dashboards": dashboards,
+    "attendance_capture": attendance_capture,
+    "results_matrix": results_matrix,
+}
+
+
+# ── RUN + REPORT ───────────────────────────────────────────────────────────
+def percentile(sorted_ms, p):
+    if not sorted_ms:
+        return 0.0
+    k = (len(sorted_ms) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_ms) - 1)
+    return sorted_ms[lo] + (sorted_ms[hi] - sorted_ms[lo]) * (k - lo)
+
+
+def run_scenario(name, base_url, metrics_token, users, population, concurrency, seed):
+    client = Client(base_url, metrics_token)
+    rng = random.Random(seed)
+    tokens = Tokens(client, concurrency)
+    jobs = SCENARIOS[name](client, tokens, users, population, rng)
+
+    queries_before = client.db_queries()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(lambda job: job(), jobs))
+    wall = time.perf_counter() - started
+    queries_after = client.db_queries()
+
+    statements = queries_after[0] - queries_before[0]
+    requests = queries_after[1] - queries_before[1]
+    result = {"wall_seconds": round(wall, 2),
+              "queries_per_request": round(statements / requests, 2) if requests else None,
+              "requests": {}}
+    for label, samples in sorted(client.samples.items()):
+        ordered = sorted(samples)
+        result["requests"][label] = {
+            "n": len(ordered),
+            "errors": client.errors[label],
+            "p50": round(percentile(ordered, 50), 1),
+            "p95": round(percentile(ordered, 95), 1),
+            "p99": round(percentile(ordered, 99), 1),
+            "mean": round(statistics.fmean(ordered), 1),
+            "rps": round(len(ordered) / wall, 1),
+        }
+    return result
+
+
+def print_scenario(name, result, baseline=None, tolerance=0.15):
+    regressions = []
+    total = sum(r["n"] for r in result["requests"].values())
+    print(f"\n== {name}: {total} requests in {result['wall_seconds']}s "
+          f"({total / result['wall_seconds']:.1f} req/s), "
+          f"{result['queries_per_request']} DB statements/request")
+    print(f"{'request':<34} {'n':>6} {'err':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>7}  vs baseline")
+
+    base_requests = (baseline or {}).get("requests", {})
+    for label, r in result["requests"].items():
+        note = ""
+        base = base_requests.get(label)
+        if base and base["p95"]:
+            change = (r["p95"] - base["p95"]) / base["p95"]
+            note = f"p95 {change:+.0%}"
+            if change > tolerance:
+                note += "  REGRESSION"
+                regressions.append(f"{name} {label} p95 {base['p95']} -> {r['p95']} ms")
+        print(f"{label:<34} {r['n']:>6} {r['errors']:>5} {r['p50']:>8} {r['p95']:>8} {r['p99']:>8} {r['rps']:>7}  {note}")
+
+    base_qpr = (baseline or {}).get("queries_per_request")
+    if base_qpr is not None and result["queries_per_request"] is not None \
+            and result["queries_per_request"] > base_qpr * (1 + tolerance):
+        regressions.append(f"{name} statements/request {base_qpr} -> {result['queries_per_request']}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--metrics-token", default="")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--learners", type=int, default=3000, help="learners seeded")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", help="compare against this stored run")
+    parser.add_argument("--save-baseline", help="write this run here")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed p95 slowdown (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["scenarios"]
+
+    results, regressions = {}, []
+    for name in args.scenarios.split(","):
+        results[name] = run_scenario(name, args.base_url, args.metrics_token,
+                                     args.users, args.learners, args.concurrency, args.seed)
+        regressions += print_scenario(name, results[name], baseline.get(name), args.tolerance)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"users": args.users, "concurrency": args.concurrency, "scenarios": results}, f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if regressions:
+        print("\nRegressions against baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        raise SystemExit(1)
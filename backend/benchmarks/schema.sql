@@ -0,0 +1,188 @@
+-- benchmarks/schema.sql
+-- Base tables the app expects before "added dql.sql" is applied, inferred
+-- from the queries in app/. Only used to build a scratch benchmark
+-- database; production schema lives in the live database.
+-- Load order: this file, then "added dql.sql" (see benchmarks/seed.py).
+
+CREATE TABLE IF NOT EXISTS `roles` (
+  `id` INT PRIMARY KEY,
+  `name` VARCHAR(50) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS `admins` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `admin_number` VARCHAR(20) UNIQUE NOT NULL,
+  `name` VARCHAR(255) NOT NULL,
+  `email` VARCHAR(255) UNIQUE,
+  `password_hash` VARCHAR(255) NOT NULL,
+  `role_id` INT NOT NULL,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS `users` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `bokamoso_number` VARCHAR(20) UNIQUE NOT NULL,
+  `full_names` VARCHAR(255) NOT NULL,
+  `surname` VARCHAR(255) NULL,
+  `email` VARCHAR(255) UNIQUE,
+  `password_hash` VARCHAR(255) NOT NULL,
+  `role_id` INT NOT NULL,
+  `grade` INT NULL,
+  `school` VARCHAR(255) NULL,
+  `cell_number` VARCHAR(20) NULL,
+  `whatsapp_number` VARCHAR(20) NULL,
+  `enrolled` VARCHAR(10) NULL,
+  `southdeep` VARCHAR(10) NULL,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  INDEX `idx_users_grade` (`grade`)
+);
+
+CREATE TABLE IF NOT EXISTS `parents` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `user_id` INT NOT NULL,
+  `parent_first_name` VARCHAR(100) NOT NULL,
+  `parent_surname` VARCHAR(100) NOT NULL,
+  `parent_email` VARCHAR(255) NULL,
+  `parent_cell` VARCHAR(20) NULL,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (`user_id`) REFERENCES `users`(`id`) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS `staff` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `staff_number` VARCHAR(20) UNIQUE NOT NULL,
+  `names` VARCHAR(255) NOT NULL,
+  `surname` VARCHAR(255) NOT NULL,
+  `nickname` VARCHAR(100) NULL,
+  `email` VARCHAR(255) UNIQUE,
+  `password` VARCHAR(255) NOT NULL,
+  `role` ENUM('Admin', 'Teacher', 'Tutor') NOT NULL,
+  `subjects` VARCHAR(255) NULL,
+  `cell` VARCHAR(20) NULL,
+  `whatsapp` VARCHAR(20) NULL,
+  `tax_number` VARCHAR(30) NULL,
+  `status` VARCHAR(20) NOT NULL DEFAULT 'Active',
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS `applications` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `app_id` VARCHAR(20) UNIQUE NOT NULL,
+  `user_id` INT NOT NULL,
+  `year` INT NOT NULL,
+  `status` VARCHAR(20) NOT NULL DEFAULT 'Submitted',
+  `math_type` VARCHAR(50) NULL,
+  `grade` INT NOT NULL,
+  `data` JSON NULL,
+  `notifications` TEXT NULL,
+  `first_mail` VARCHAR(3) NOT NULL DEFAULT 'No',
+  `Decision_mail` VARCHAR(3) NOT NULL DEFAULT 'No',
+  `date_submitted` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  INDEX `idx_applications_user` (`user_id`),
+  INDEX `idx_applications_grade_status` (`grade`, `status`),
+  FOREIGN KEY (`user_id`) REFERENCES `users`(`id`) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS `learner_documents` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `user_id` INT NOT NULL,
+  `file_type` VARCHAR(50) NOT NULL,
+  `file_path` VARCHAR(500) NOT NULL,
+  `uploaded_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE KEY `uq_learner_document` (`user_id`, `file_type`),
+  FOREIGN KEY (`user_id`) REFERENCES `users`(`id`) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS `assessments` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `name` VARCHAR(255) NOT NULL,
+  `grade` INT NOT NULL,
+  `subject` VARCHAR(100) NOT NULL,
+  `total_mark` INT NULL,
+  `date_written` DATE NOT NULL,
+  `average` DECIMAL(5,2) NULL,
+  `created_by` INT NULL,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  INDEX `idx_assessments_grade_subject_date` (`grade`, `subject`, `date_written`)
+);
+
+CREATE TABLE IF NOT EXISTS `assessment_marks` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `assessment_id` INT NOT NULL,
+  `learner_id` INT NOT NULL,
+  `percentage` DECIMAL(5,2) NULL,
+  UNIQUE KEY `uq_assessment_learner` (`assessment_id`, `learner_id`),
+  INDEX `idx_marks_learner` (`learner_id`),
+  FOREIGN KEY (`assessment_id`) REFERENCES `assessments`(`id`) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS `attendance_classes` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `user_id` INT NOT NULL,
+  `grade` INT NOT NULL,
+  `class_date` DATE NOT NULL,
+  `status` VARCHAR(20) NOT NULL,
+  `apology_message` TEXT NULL,
+  `recorded_at` DATETIME NULL,
+  `recorded_by` VARCHAR(255) NULL,
+  UNIQUE KEY `uq_attendance_learner_date` (`user_id`, `class_date`),
+  INDEX `idx_attendance_grade_date` (`grade`, `class_date`)
+);
+
+CREATE TABLE IF NOT EXISTS `notifications` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `title` VARCHAR(255) NOT NULL,
+  `content` TEXT NOT NULL,
+  `sender_name` VARCHAR(255) NULL,
+  `sender_type` VARCHAR(50) NULL,
+  `target_user_id` INT NULL,
+  `target_grade` INT NULL,
+  `target_grades` VARCHAR(50) NULL,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  INDEX `idx_notifications_user` (`target_user_id`),
+  INDEX `idx_notifications_grade` (`target_grade`)
+);
+
+CREATE TABLE IF NOT EXISTS `notification_reads` (
+  `notification_id` INT NOT NULL,
+  `user_id` INT NOT NULL,
+  `is_read` BOOLEAN NOT NULL DEFAULT FALSE,
+  `read_at` DATETIME NULL,
+  PRIMARY KEY (`notification_id`, `user_id`)
+);
+
+CREATE TABLE IF NOT EXISTS `staff_time_logs` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `staff_id` INT NOT NULL,
+  `attendance_date` DATE NOT NULL,
+  `time_in` DATETIME NULL,
+  `time_out` DATETIME NULL,
+  `status` VARCHAR(20) NULL,
+  `disputed` TINYINT(1) NOT NULL DEFAULT 0,
+  INDEX `idx_time_logs_staff_date` (`staff_id`, `attendance_date`)
+);
+
+CREATE TABLE IF NOT EXISTS `staff_session_reports` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `staff_id` INT NOT NULL,
+  `class_name` VARCHAR(100) NOT NULL,
+  `session_date` DATE NOT NULL,
+  `subject` VARCHAR(100) NOT NULL,
+  `topic` VARCHAR(255) NOT NULL,
+  `description` TEXT NOT NULL,
+  `positives` TEXT NULL,
+  `negatives` TEXT NULL,
+  `comments` TEXT NULL,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  INDEX `idx_session_reports_staff` (`staff_id`, `session_date`)
+);
+
+CREATE TABLE IF NOT EXISTS `staff_availability` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY,
+  `staff_id` INT NOT NULL,
+  `unavailable_date` DATE NOT NULL,
+  `reason` TEXT NULL,
+  `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -1,5 +1,9 @@
 import smtplib
 import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
@@ -11,6 +15,10 @@ SMTP_SERVER = os.getenv("BREVO_SMTP_SERVER")
 SMTP_PORT = int(os.getenv("BREVO_SMTP_PORT"))
 SMTP_USER = os.getenv("BREVO_SMTP_USER")
 SMTP_PASS = os.getenv("BREVO_SMTP_PASS")
+# Set to 0 for a local stand-in (e.g. aiosmtpd) without TLS
+SMTP_STARTTLS = os.getenv("BREVO_SMTP_STARTTLS", "1") == "1"
+SMTP_TIMEOUT = int(os.getenv("BREVO_SMTP_TIMEOUT", "30"))
+SMTP_CONNECTIONS = int(os.getenv("BREVO_SMTP_CONNECTIONS", "2"))
 
 FROM_EMAIL = os.getenv("FROM_EMAIL")
 FROM_NAME = os.getenv("FROM_NAME")
@@ -27,25 +35,115 @@ def log_message(msg):
         f.write(f"[{datetime.now()}] {msg}\n")
 
 
-def send_brevo_email(to_email, subject, html_body, name="", reference=""):
-
-    try:
-
-        msg = MIMEMultipart()
-        msg["From"] = f"{FROM_NAME} <{FROM_EMAIL}>"
-        msg["To"] = to_email
-        msg["Subject"] = subject
+def build_message(to_email, subject, html_body):
+    msg = MIMEMultipart()
+    msg["From"] = f"{FROM_NAME} <{FROM_EMAIL}>"
+    msg["To"] = to_email
+    msg["Subject"] = subject
+
+    msg.attach(MIMEText(html_body, "html"))
+    return msg
+
+
+class SMTPConnectionPool:
+    """
+    Keeps up to `size` logged-in SMTP connections open so each email
+    doesn't pay for connect + STARTTLS + login. Connections idle for longer
+    than `idle_check` seconds get a NOOP before reuse; broken ones are
+    dropped and replaced.
+    """
+
+    def __init__(self, size=SMTP_CONNECTIONS, idle_check=30):
+        self.size = size
+        self.idle_check = idle_check
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        if SMTP_STARTTLS:
+            server.starttls()
+        if SMTP_USER:
+            server.login(SMTP_USER, SMTP_PASS)
+        return server
+
+    def _checkout(self):
+        while True:
+            try:
+                server, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+
+            if time.monotonic() - last_used < self.idle_check:
+                return server
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._discard(server)
+
+    @staticmethod
+    def _discard(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        server = None
+        try:
+            server = self._checkout()
+            yield server
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError):
+            if server is not None:
+                self._discard(server)
+                server = None
+            raise
+        finally:
+            if server is not None:
+                self._idle.put((server, time.monotonic()))
+            self._slots.release()
+
+    def send(self, to_email, subject, html_body):
+        """
+        Send one email; retries once on a dropped connection.
+        Raises smtplib/OS errors for the caller to record.
+        """
+        msg = build_message(to_email, subject, html_body).as_string()
+        for attempt in (1, 2):
+            try:
+                with self.connection() as server:
+                    server.sendmail(FROM_EMAIL, to_email, msg)
+                return
+            except smtplib.SMTPServerDisconnected:
+                if attempt == 2:
+                    raise
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(server)
+
+
+smtp_pool = SMTPConnectionPool()
 
-        msg.attach(MIMEText(html_body, "html"))
 
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-
-        server.login(SMTP_USER, SMTP_PASS)
+def send_brevo_email(to_email, subject, html_body, name="", reference=""):
 
-        server.sendmail(FROM_EMAIL, to_email, msg.as_string())
+    try:
 
-        server.quit()
+        smtp_pool.send(to_email, subject, html_body)
 
         log_message(f"SUCCESS: Email sent to {to_email} | Ref: {reference} | Name: {name}")
 
@@ -55,4 +153,4 @@ def send_brevo_email(to_email, subject, html_body, name="", reference=""):
 
         log_message(f"ERROR sending to {to_email} | {str(e)}")
 
-        return False
\ No newline at end of file
+        return False
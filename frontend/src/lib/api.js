@@ -8,13 +8,75 @@ const api = axios.create({
   },
 });
 
+// Writes carry an Idempotency-Key so a retried submit is applied once.
+// The key belongs to the submit: it is reused while the same request
+// (method, url, body) keeps failing without an answer, and dropped once
+// the server has answered it.
+const IDEMPOTENT_METHODS = ['post', 'put', 'patch'];
+const NO_IDEMPOTENCY = ['/api/login'];
+const RETRY_STATUSES = [502, 503, 504];
+const MAX_RETRIES = 2;
+const pendingKeys = new Map(); // submit fingerprint -> key
+
+const newKey = () =>
+  (crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(16).slice(2)}`);
+
+const bodyFingerprint = (data) => {
+  if (data instanceof FormData) {
+    return JSON.stringify(
+      [...data.entries()].map(([k, v]) => [k, v instanceof File ? `${v.name}:${v.size}:${v.lastModified}` : v])
+    );
+  }
+  return typeof data === 'string' ? data : JSON.stringify(data ?? null);
+};
+
 // Add JWT to every request if logged in
 api.interceptors.request.use((config) => {
   const token = localStorage.getItem('nkatekoToken');
   if (token) {
     config.headers.Authorization = `Bearer ${token}`;
   }
+
+  const method = (config.method || 'get').toLowerCase();
+  if (IDEMPOTENT_METHODS.includes(method) && !NO_IDEMPOTENCY.includes(config.url)
+      && !config.headers['Idempotency-Key']) {
+    const fingerprint = `${method} ${config.url} ${bodyFingerprint(config.data)}`;
+    if (!pendingKeys.has(fingerprint)) pendingKeys.set(fingerprint, newKey());
+    config.headers['Idempotency-Key'] = pendingKeys.get(fingerprint);
+    config.idempotencyFingerprint = fingerprint;
+  }
   return config;
 });
 
-export default api;
\ No newline at end of file
+const settle = (config) => {
+  if (config?.idempotencyFingerprint) pendingKeys.delete(config.idempotencyFingerprint);
+};
+
+api.interceptors.response.use(
+  (response) => {
+    settle(response.config);
+    return response;
+  },
+  async (error) => {
+    const { config, response } = error;
+    const retryable = config?.idempotencyFingerprint
+      && (!response || RETRY_STATUSES.includes(response.status)
+          // 409 + Retry-After: the first attempt with this key is still running
+          || (response.status === 409 && response.headers?.['retry-after']));
+    if (!retryable) {
+      settle(config);
+      return Promise.reject(error);
+    }
+    // No answer (network drop, gateway, first attempt still running):
+    // resend with the same key; the server replays or finishes it once
+    config.idempotencyRetries = (config.idempotencyRetries || 0) + 1;
+    if (config.idempotencyRetries > MAX_RETRIES) {
+      return Promise.reject(error); // key kept for the user's next try
+    }
+    const retryAfter = Number(response?.headers?.['retry-after']) || config.idempotencyRetries;
+    await new Promise((resolve) => setTimeout(resolve, Math.min(retryAfter, 10) * 1000));
+    return api(config);
+  }
+);
+
+export default api;
@@ -0,0 +1,22 @@
+// src/lib/events.js
+// Server push (SSE) from /api/events/stream. EventSource can't send an
+// Authorization header, so the JWT goes in the query string.
+
+const baseURL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
+
+// handlers: { notification: fn, warning: fn, term_settings: fn, ... }
+// Returns a function that closes the stream.
+export const subscribeEvents = (handlers) => {
+  const token = localStorage.getItem('nkatekoToken');
+  if (!token) return () => {};
+
+  const source = new EventSource(
+    `${baseURL}/api/events/stream?token=${encodeURIComponent(token)}`
+  );
+
+  Object.entries(handlers).forEach(([event, handler]) => {
+    source.addEventListener(event, (e) => handler(JSON.parse(e.data)));
+  });
+
+  return () => source.close();
+};
@@ -90,7 +90,7 @@ const CaptureAttendance = () => {
       setError(null);
 
       try {
-        const res = await api.get(`/api/staff/learners/${selectedLearnerId}`);
+        const res = await api.get(`/api/staff/learners/${selectedLearnerId}/360`);
         setLearnerData(res.data);
       } catch (err) {
         setError('Failed to load attendance history');
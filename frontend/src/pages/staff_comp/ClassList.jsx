@@ -91,7 +91,7 @@ const ClassList = () => {
       setError(null);
 
       try {
-        const res = await api.get(`/api/staff/learners/${selectedLearnerId}`);
+        const res = await api.get(`/api/staff/learners/${selectedLearnerId}/360`);
         setLearnerData(res.data);
 
         // Auto-select current month